@@ -0,0 +1,126 @@
+"""
+Benchmark: chunk insertion with executemany vs. binary COPY.
+
+Inserts synthetic chunks into a temporary table that mirrors the chunks
+table, so the benchmark only needs a Postgres database with the pgvector
+extension and does not touch any real data.
+
+Usage (from apps/document-processor):
+    DATABASE_HOST=localhost:5432 DATABASE_PASSWORD=... \
+        python benchmarks/bench_chunk_insert.py --rows 2000 --repeat 3
+"""
+
+import argparse
+import os
+import sys
+import time
+from statistics import median
+from typing import List
+from uuid import uuid4
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from db.postgres import (  # noqa: E402
+    ChunkBatch,
+    _build_chunk_copy_rows,
+    _build_chunk_rows,
+    copy_chunk_rows,
+    get_connection,
+    insert_chunk_rows,
+    register_vector_type,
+)
+
+
+def _create_temp_chunks_table(conn, dimensions: int) -> None:
+    """Create a temporary table shadowing chunks (pg_temp comes first in the search path)."""
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+            CREATE TEMP TABLE chunks (
+                id uuid NOT NULL,
+                file_id uuid NOT NULL,
+                file_name varchar(128) NOT NULL,
+                course_id uuid NOT NULL,
+                course_name varchar(128) NOT NULL,
+                embedding vector({dimensions}) NOT NULL,
+                page_index integer NOT NULL,
+                page_number smallint,
+                content text NOT NULL,
+                bbox json,
+                fts tsvector GENERATED ALWAYS AS (to_tsvector('english', content)) STORED NOT NULL,
+                PRIMARY KEY (id, course_id)
+            )
+        """)
+    conn.commit()
+
+
+def _make_batches(rows: int, dimensions: int, batch_size: int) -> List[ChunkBatch]:
+    """Generate synthetic embedded chunks in batches."""
+    rng = np.random.default_rng(42)
+    embeddings = rng.standard_normal((rows, dimensions), dtype=np.float32)
+    contents = [f"Synthetic chunk {idx} " + "lorem ipsum dolor sit amet " * 40 for idx in range(rows)]
+    page_indexes = np.arange(rows, dtype=np.int32) // 5
+    bboxes = np.tile([10.0, 20.0, 300.0, 400.0], (rows, 1))
+
+    return [
+        ChunkBatch(
+            contents[start:start + batch_size],
+            embeddings[start:start + batch_size],
+            page_indexes[start:start + batch_size],
+            bboxes[start:start + batch_size],
+        )
+        for start in range(0, rows, batch_size)
+    ]
+
+
+def _run(conn, method: str, batches: List[ChunkBatch]) -> float:
+    """Insert all batches with the given method and return the elapsed seconds."""
+    task_id, course_id = str(uuid4()), str(uuid4())
+    started = time.perf_counter()
+
+    with conn.cursor() as cursor:
+        for batch in batches:
+            if method == "copy":
+                rows = _build_chunk_copy_rows(task_id, course_id, "Benchmark course", "bench.pdf", batch, 0)
+                copy_chunk_rows(cursor, rows)
+            else:
+                rows = _build_chunk_rows(task_id, course_id, "Benchmark course", "bench.pdf", batch, 0)
+                insert_chunk_rows(cursor, rows)
+    conn.commit()
+
+    elapsed = time.perf_counter() - started
+
+    with conn.cursor() as cursor:
+        cursor.execute("TRUNCATE chunks")
+    conn.commit()
+
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000, help="Chunks inserted per run")
+    parser.add_argument("--dimensions", type=int, default=768, help="Embedding dimensions")
+    parser.add_argument("--batch-size", type=int, default=30, help="Chunks per insert batch")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per method")
+    args = parser.parse_args()
+
+    batches = _make_batches(args.rows, args.dimensions, args.batch_size)
+
+    with get_connection() as conn:
+        conn.prepare_threshold = 0
+        register_vector_type(conn)
+        _create_temp_chunks_table(conn, args.dimensions)
+
+        results = {}
+        for method in ("executemany", "copy"):
+            timings = [_run(conn, method, batches) for _ in range(args.repeat)]
+            results[method] = median(timings)
+            print(f"{method:>12}: {results[method]:.3f}s median, {args.rows / results[method]:.0f} rows/s")
+
+    print(f"{'speedup':>12}: {results['executemany'] / results['copy']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
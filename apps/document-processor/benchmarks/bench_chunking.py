@@ -0,0 +1,135 @@
+"""
+Benchmark: HybridChunker throughput with the per-document vs. the shared tokenizer.
+
+Converts the non-PDF documents of the synthetic corpus (see corpus.py; add
+--pdf to include the PDFs, which need the Docling models) once, then chunks
+them with each tokenizer setup:
+- per-document: a new HuggingFaceTokenizer (transformers) per document, as
+  HybridChunker() created before the chunkers shared a tokenizer
+- shared: one FastTokenizer (utils.tokenizer) without the memo cache
+- shared+memo: one FastTokenizer with the token-count memo cache, cleared
+  before every run
+
+It also times counting the tokens of the resulting chunks one by one and
+with count_tokens_batch, as embeddings.batching does.
+
+All setups load the same tokenizer.json (default: TOKENIZER_PATH), so the
+chunks are identical and no Hugging Face Hub access is needed.
+
+Usage (from apps/document-processor):
+    python benchmarks/bench_chunking.py --tokenizer-json /path/to/tokenizer.json --repeat 3
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from statistics import median
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+os.environ.setdefault("ENCRYPTION_KEY", "benchmark")
+
+from corpus import generate_corpus  # noqa: E402
+
+
+def _measure(run: Callable[[], None], repeat: int) -> float:
+    """Median wall time of repeat runs."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    return median(timings)
+
+
+def _convert_corpus(corpus_dir: str, include_pdf: bool) -> Dict[str, object]:
+    from app_state import convert_document_file, get_converter
+
+    converted = {}
+    for document in generate_corpus(corpus_dir):
+        if document.kind == "pdf":
+            if include_pdf:
+                converted[document.name] = get_converter().convert(document.path).document
+        else:
+            converted[document.name] = convert_document_file(document.path).document
+    return converted
+
+
+def _chunk_all(converted: Dict[str, object], make_tokenizer: Callable[[], object]) -> List[str]:
+    """Chunk every document like the processors do; returns the contextualized texts."""
+    from docling_core.transforms.chunker.hybrid_chunker import HybridChunker
+
+    texts = []
+    for dl_doc in converted.values():
+        chunker = HybridChunker(tokenizer=make_tokenizer())
+        texts.extend(
+            text for text in (chunker.contextualize(chunk=chunk) for chunk in chunker.chunk(dl_doc=dl_doc))
+            if text.strip()
+        )
+    return texts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokenizer-json", help="Pre-serialized tokenizer.json (default: TOKENIZER_PATH)")
+    parser.add_argument("--pdf", action="store_true", help="Also chunk the corpus PDFs")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per setup")
+    args = parser.parse_args()
+
+    if args.tokenizer_json:
+        os.environ["TOKENIZER_PATH"] = args.tokenizer_json
+
+    from docling_core.transforms.chunker.tokenizer.huggingface import HuggingFaceTokenizer
+    from transformers import PreTrainedTokenizerFast
+    from utils.chunker_tokenizer import ChunkerTokenizer
+    from utils.tokenizer import get_max_tokens, get_tokenizer_path, load_fast_tokenizer
+
+    tokenizer_path = get_tokenizer_path()
+    if not tokenizer_path.exists():
+        parser.error(f"{tokenizer_path} not found; pass --tokenizer-json")
+
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        converted = _convert_corpus(corpus_dir, args.pdf)
+
+    def per_document() -> HuggingFaceTokenizer:
+        return HuggingFaceTokenizer(
+            tokenizer=PreTrainedTokenizerFast(tokenizer_file=str(tokenizer_path)),
+            max_tokens=get_max_tokens(),
+        )
+
+    unmemoized = load_fast_tokenizer(Path(tokenizer_path))
+    unmemoized.cache_size = 0
+    memoized = load_fast_tokenizer(Path(tokenizer_path))
+
+    setups = {
+        "per-document": per_document,
+        "shared": lambda: ChunkerTokenizer(tokenizer=unmemoized),
+        "shared+memo": lambda: ChunkerTokenizer(tokenizer=memoized),
+    }
+
+    results, chunks = {}, {}
+    for name, make_tokenizer in setups.items():
+        def run() -> None:
+            memoized._cache.clear()
+            chunks[name] = _chunk_all(converted, make_tokenizer)
+
+        results[name] = _measure(run, args.repeat)
+        print(f"{name:>14}: {results[name]:.3f}s median, {len(chunks[name]) / results[name]:.0f} chunks/s")
+
+    print(f"{'speedup':>14}: {results['per-document'] / results['shared+memo']:.2f}x")
+    if any(texts != chunks["per-document"] for texts in chunks.values()):
+        print("WARNING: the setups produced different chunks")
+
+    texts = chunks["per-document"]
+    single = _measure(lambda: [unmemoized.count_tokens(text) for text in texts], args.repeat)
+    batched = _measure(lambda: unmemoized.count_tokens_batch(texts), args.repeat)
+    print(f"\nCounting the tokens of {len(texts)} chunks:")
+    print(f"{'one by one':>14}: {single:.3f}s median, {len(texts) / single:.0f} chunks/s")
+    print(f"{'batched':>14}: {batched:.3f}s median, {len(texts) / batched:.0f} chunks/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark: single-stream vs. parallel ranged object downloads.
+
+Uploads a random object to a local MinIO (or any S3-compatible stand-in),
+downloads it with one GET and with concurrent ranged requests, and checks
+that both copies match the uploaded bytes.
+
+Usage (from apps/document-processor):
+    MINIO_ENDPOINT=http://localhost:9000 MINIO_ROOT_USER=... MINIO_ROOT_PASSWORD=... \
+        python benchmarks/bench_download.py --size-mb 200 --part-size-mb 8 --concurrency 8
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from statistics import median
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from access_clients.storage.local_storage_client import LocalStorageClient  # noqa: E402
+
+
+def _upload_random_object(client, bucket: str, key: str, size: int) -> str:
+    """Upload size random bytes and return their SHA-256."""
+    s3 = client._get_client()
+    existing = [b["Name"] for b in s3.list_buckets().get("Buckets", [])]
+    if bucket not in existing:
+        s3.create_bucket(Bucket=bucket)
+
+    with tempfile.TemporaryFile() as f:
+        digest = hashlib.sha256()
+        remaining = size
+        while remaining:
+            block = os.urandom(min(remaining, 4 * 1024 * 1024))
+            digest.update(block)
+            f.write(block)
+            remaining -= len(block)
+        f.seek(0)
+        s3.upload_fileobj(f, bucket, key)
+
+    return digest.hexdigest()
+
+
+def _time_download(client, bucket: str, key: str, concurrency: int) -> tuple:
+    """Download the object once; returns (seconds, sha256)."""
+    os.environ["DOWNLOAD_MAX_CONCURRENCY"] = str(concurrency)
+
+    with tempfile.TemporaryFile() as f:
+        start = time.perf_counter()
+        client.download_to_file(bucket, key, f)
+        elapsed = time.perf_counter() - start
+
+        f.seek(0)
+        digest = hashlib.sha256()
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+
+    return elapsed, digest.hexdigest()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bucket", default="bench-downloads")
+    parser.add_argument("--size-mb", type=int, default=200)
+    parser.add_argument("--part-size-mb", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ["DOWNLOAD_PART_SIZE_MB"] = str(args.part_size_mb)
+    # The client's connection pool is sized from the concurrency when it is created
+    os.environ["DOWNLOAD_MAX_CONCURRENCY"] = str(args.concurrency)
+    client = LocalStorageClient()
+
+    key = f"bench-{args.size_mb}mb.bin"
+    size = args.size_mb * 1024 * 1024
+    print(f"Uploading {args.size_mb} MB to {args.bucket}/{key}")
+    expected = _upload_random_object(client, args.bucket, key, size)
+
+    results = {}
+    for label, concurrency in (("single stream", 1), (f"ranged x{args.concurrency}", args.concurrency)):
+        timings = []
+        for _ in range(args.repeat):
+            elapsed, digest = _time_download(client, args.bucket, key, concurrency)
+            if digest != expected:
+                raise SystemExit(f"{label}: downloaded bytes do not match the upload")
+            timings.append(elapsed)
+
+        results[label] = median(timings)
+        print(f"{label:>16}: {results[label]:.2f}s ({args.size_mb / results[label]:.1f} MB/s)")
+
+    single, ranged = results.values()
+    print(f"Speedup: {single / ranged:.2f}x")
+
+    client._get_client().delete_object(Bucket=args.bucket, Key=key)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark: embeddings client under injected faults.
+
+Runs a series of simulated jobs (one embed_content call each) against the
+fake embeddings server with injected errors, dropped connections and slow
+responses, once without tail-latency controls (single attempt, no hedging)
+and once with the defaults of embeddings.resilience. Reports failed jobs and
+the p50/p99 job time of each mode.
+
+Usage (from apps/document-processor):
+    python benchmarks/bench_embedding_faults.py --jobs 50 --error-rate 0.03 --slow-rate 0.02
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from fake_embeddings_server import FakeEmbeddingsServer  # noqa: E402
+
+MODES: Dict[str, Dict[str, str]] = {
+    "no-controls": {
+        "EMBEDDINGS_RETRY_MAX_ATTEMPTS": "1",
+        "EMBEDDINGS_HEDGING_ENABLED": "false",
+        "EMBEDDINGS_BREAKER_MAX_WAIT_SECONDS": "0",
+    },
+    "controls": {
+        "EMBEDDINGS_RETRY_MAX_ATTEMPTS": "3",
+        "EMBEDDINGS_HEDGING_ENABLED": "true",
+        "EMBEDDINGS_BREAKER_MAX_WAIT_SECONDS": "120",
+    },
+}
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+
+def _run_jobs(args: argparse.Namespace, texts: List[str]) -> dict:
+    """Run the jobs against a fresh faulty server; returns timings and failures."""
+    from embeddings.embeddings_client import close_client, embed_content, reset_retry_budget
+
+    server = FakeEmbeddingsServer(
+        latency_ms=args.latency_ms,
+        dimensions=args.dimensions,
+        error_rate=args.error_rate,
+        slow_rate=args.slow_rate,
+        slow_latency_ms=args.slow_latency_ms,
+        drop_rate=args.drop_rate,
+        seed=args.seed,
+    )
+    timings, failures = [], 0
+    with server:
+        os.environ["API_URL"] = server.url
+        for _ in range(args.jobs):
+            reset_retry_budget()
+            started = time.perf_counter()
+            try:
+                embed_content(texts)
+            except Exception:
+                failures += 1
+            timings.append(time.perf_counter() - started)
+        close_client()
+
+    return {
+        "failed_jobs": failures,
+        "p50_s": round(_percentile(timings, 50), 3),
+        "p99_s": round(_percentile(timings, 99), 3),
+        "requests": server.requests,
+        "injected": f"{server.injected_errors} errors, {server.injected_drops} drops, {server.injected_slow} slow",
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=50)
+    parser.add_argument("--texts", type=int, default=120, help="Texts embedded per job")
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--dimensions", type=int, default=384)
+    parser.add_argument("--error-rate", type=float, default=0.03)
+    parser.add_argument("--drop-rate", type=float, default=0.01)
+    parser.add_argument("--slow-rate", type=float, default=0.02)
+    parser.add_argument("--slow-latency-ms", type=float, default=3000.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    os.environ.setdefault("ENCRYPTION_KEY", "benchmark")
+    # Measure the API path, not the cache
+    os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+    os.environ.setdefault("EMBEDDINGS_RETRY_BACKOFF_MS", "50")
+
+    texts = [f"benchmark text {i} " * 40 for i in range(args.texts)]
+    for mode, settings in MODES.items():
+        os.environ.update(settings)
+        result = _run_jobs(args, texts)
+        print(
+            f"{mode:12s} failed jobs: {result['failed_jobs']}/{args.jobs}  "
+            f"p50: {result['p50_s']:.3f}s  p99: {result['p99_s']:.3f}s  "
+            f"requests: {result['requests']} ({result['injected']})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Benchmark: cold-start time of processing jobs.
+
+Each measurement runs in a fresh interpreter, like a job container does:
+- eager: imports both processors up front, as job_runner did before the job
+  type was used to select the imports
+- process-document / process-pdf: imports job_runner and loads the
+  processor of the job type (job_runner.load_processor)
+- eager+convert / process-document+convert: additionally convert a small
+  Markdown file, with the default DocumentConverter (as before) or with
+  app_state.convert_document_file, which imports only the format's backend
+- process-document+chunk: chunks the Markdown file like a job does; with
+  the text fast path (see processors.text_chunker) Docling is not imported
+
+The profile command prints an import-time report (python -X importtime) of
+a job type's startup path, aggregated by top-level package and listing the
+slowest modules by cumulative import time.
+
+Usage (from apps/document-processor):
+    python benchmarks/bench_startup.py run --repeat 5
+    python benchmarks/bench_startup.py profile process-document --top 20
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from statistics import median
+from typing import Dict, List, Tuple
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+MARKDOWN_SAMPLE = "# Startup\n\nA short paragraph.\n\n## Section\n\n- one\n- two\n"
+
+# Code run in the fresh interpreter for each startup path
+STARTUP_PATHS: Dict[str, str] = {
+    "eager": "import processors.process_pdf, processors.process_document",
+    "eager+convert": (
+        "import processors.process_pdf, processors.process_document; "
+        "from app_state import get_converter; get_converter().convert({path!r})"
+    ),
+    "process-document": "import job_runner; job_runner.load_processor('process-document')",
+    "process-pdf": "import job_runner; job_runner.load_processor('process-pdf')",
+    "process-document+convert": (
+        "import job_runner; job_runner.load_processor('process-document'); "
+        "from app_state import convert_document_file; convert_document_file({path!r})"
+    ),
+    "process-document+chunk": (
+        "import job_runner; job_runner.load_processor('process-document'); "
+        "from processors.process_document import _create_document_chunk_generator; "
+        "list(_create_document_chunk_generator({path!r}, 'sample.md'))"
+    ),
+}
+
+
+def _environment() -> Dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = SRC_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    env.setdefault("ENCRYPTION_KEY", "benchmark")
+    # Never wait for the Hugging Face Hub during a startup measurement
+    env.setdefault("HF_HUB_OFFLINE", "1")
+    return env
+
+
+def _time_startup(code: str) -> float:
+    """Wall time of a fresh interpreter running code."""
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", code], cwd=SRC_DIR, env=_environment(),
+        check=True, stdout=subprocess.DEVNULL
+    )
+    return time.perf_counter() - started
+
+
+def _import_profile(code: str) -> List[Tuple[str, int, int]]:
+    """(module, self µs, cumulative µs) of every module imported by code."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], cwd=SRC_DIR, env=_environment(),
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def run(args: argparse.Namespace) -> None:
+    with tempfile.NamedTemporaryFile("w", suffix=".md", delete=False) as f:
+        f.write(MARKDOWN_SAMPLE)
+    try:
+        # Warm the OS file cache so the first path is not penalized
+        _time_startup(STARTUP_PATHS["eager"])
+        for name, code in STARTUP_PATHS.items():
+            timings = [_time_startup(code.format(path=f.name)) for _ in range(args.repeat)]
+            print(f"{name:26s} median: {median(timings):.2f}s  min: {min(timings):.2f}s")
+    finally:
+        os.unlink(f.name)
+
+
+def profile(args: argparse.Namespace) -> None:
+    modules = _import_profile(STARTUP_PATHS[args.job_type].format(path="unused"))
+
+    by_package: Dict[str, int] = defaultdict(int)
+    for name, self_us, _ in modules:
+        by_package[name.split(".")[0]] += self_us
+    total_us = sum(by_package.values())
+
+    print(f"Import time of {args.job_type}: {total_us / 1e6:.2f}s in {len(modules)} modules\n")
+    print("By top-level package (self time):")
+    for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {package:32s} {self_us / 1e6:6.2f}s  {100 * self_us / total_us:5.1f}%")
+
+    print("\nSlowest modules (cumulative time):")
+    for name, _, cumulative_us in sorted(modules, key=lambda module: -module[2])[:args.top]:
+        print(f"  {name:60s} {cumulative_us / 1e6:6.2f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Measure the startup time of each path")
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.set_defaults(handler=run)
+
+    profile_parser = commands.add_parser("profile", help="Import-time report of a startup path")
+    profile_parser.add_argument("job_type", choices=[name for name in STARTUP_PATHS if "+" not in name])
+    profile_parser.add_argument("--top", type=int, default=15)
+    profile_parser.set_defaults(handler=profile)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
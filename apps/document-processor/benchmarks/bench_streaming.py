@@ -0,0 +1,86 @@
+"""
+Benchmark: whole-document vs. streaming PDF conversion.
+
+Chunks the 50-page corpus PDF (see corpus.py) with _create_pdf_chunk_generator,
+once converting the whole document and once with PDF_STREAMING_CONVERSION,
+and reports the time to the first chunk, the total time and the peak RSS.
+Each mode runs in a fresh interpreter, so the peak RSS of one mode does not
+hide the other's.
+
+Usage (from apps/document-processor):
+    python benchmarks/bench_streaming.py --pages 50 --window-size 5
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, SRC_DIR)
+
+from corpus import _TextGenerator, write_pdf  # noqa: E402
+
+
+def _run_mode(pdf_path: str) -> dict:
+    """Chunk pdf_path in this interpreter and return the measurements."""
+    from processors.process_pdf import _create_pdf_chunk_generator
+    from utils.memory import get_peak_rss_bytes
+
+    started = time.perf_counter()
+    first_chunk_seconds = None
+    chunks = 0
+
+    generator, _ = _create_pdf_chunk_generator(pdf_path)
+    for _ in generator:
+        if first_chunk_seconds is None:
+            first_chunk_seconds = time.perf_counter() - started
+        chunks += 1
+
+    return {
+        "first_chunk_seconds": first_chunk_seconds,
+        "total_seconds": time.perf_counter() - started,
+        "chunks": chunks,
+        "peak_rss_mb": get_peak_rss_bytes() / (1024 * 1024),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=50, help="Pages of the generated PDF")
+    parser.add_argument("--window-size", type=int, default=5, help="PDF_PAGE_WINDOW_SIZE of the streaming mode")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_run_mode(args.child)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = os.path.join(tmp_dir, f"bench-{args.pages}p.pdf")
+        write_pdf(pdf_path, _TextGenerator(f"0:pdf-{args.pages}p.pdf"), args.pages)
+
+        for mode, streaming in (("whole", "false"), ("streaming", "true")):
+            env = dict(os.environ)
+            env.setdefault("ENCRYPTION_KEY", "benchmark")
+            env["PDF_CONVERSION_WORKERS"] = "1"
+            env["PDF_STREAMING_CONVERSION"] = streaming
+            env["PDF_PAGE_WINDOW_SIZE"] = str(args.window_size)
+
+            output = subprocess.run(
+                [sys.executable, __file__, "--child", pdf_path], cwd=SRC_DIR, env=env,
+                check=True, stdout=subprocess.PIPE, text=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(
+                f"{mode:>10}: first chunk {result['first_chunk_seconds']:.2f}s, "
+                f"total {result['total_seconds']:.2f}s, {result['chunks']} chunks, "
+                f"peak RSS {result['peak_rss_mb']:.0f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
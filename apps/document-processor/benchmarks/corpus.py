@@ -0,0 +1,223 @@
+"""
+Reproducible synthetic corpus for the benchmarks.
+
+Generates born-digital PDFs of varying page counts plus DOCX, PPTX, HTML and
+Markdown documents from a seeded random generator, so the same seed always
+produces the same content (DOCX and PPTX archives differ only in their zip
+timestamps). PDFs are written by a minimal PDF writer (text only, standard
+Helvetica fonts); DOCX and PPTX use python-docx and python-pptx, which are
+installed with Docling.
+
+Usage (from apps/document-processor):
+    python benchmarks/corpus.py /tmp/bench-corpus --seed 0
+"""
+
+import argparse
+import os
+import random
+from typing import List, Tuple
+
+# PDF page counts of the generated corpus
+PDF_PAGE_COUNTS = (1, 10, 50)
+
+_SYLLABLES = (
+    "ta", "ro", "mi", "sen", "lo", "ve", "na", "qua", "tri", "dor", "pel", "es",
+    "um", "ca", "lis", "ber", "fo", "ni", "gra", "tum", "ex", "vol", "ra", "min",
+)
+
+
+class CorpusDocument:
+    """A generated document and the amount of content it holds."""
+
+    def __init__(self, name: str, kind: str, path: str, pages: int):
+        self.name = name
+        self.kind = kind
+        self.path = path
+        self.pages = pages
+
+
+class _TextGenerator:
+    """Seeded generator of pseudo-words, sentences and paragraphs."""
+
+    def __init__(self, seed: str):
+        self._random = random.Random(seed)
+        self._words = sorted({
+            "".join(self._random.choice(_SYLLABLES) for _ in range(self._random.randint(1, 4)))
+            for _ in range(2000)
+        })
+
+    def sentence(self) -> str:
+        words = [self._random.choice(self._words) for _ in range(self._random.randint(6, 18))]
+        return " ".join(words).capitalize() + "."
+
+    def paragraph(self) -> str:
+        return " ".join(self.sentence() for _ in range(self._random.randint(3, 7)))
+
+    def heading(self) -> str:
+        return " ".join(self._random.choice(self._words) for _ in range(self._random.randint(2, 5))).title()
+
+
+def _wrap(text: str, width: int) -> List[str]:
+    """Wrap text into lines of at most width characters."""
+    lines: List[str] = []
+    current = ""
+    for word in text.split():
+        if current and len(current) + 1 + len(word) > width:
+            lines.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        lines.append(current)
+    return lines
+
+
+def _escape_pdf_text(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _page_content(text: _TextGenerator, page: int) -> bytes:
+    """Content stream of one page: a heading followed by wrapped paragraphs."""
+    commands = [f"BT /F2 16 Tf 72 740 Td ({_escape_pdf_text(f'{page}. ' + text.heading())}) Tj ET"]
+    commands.append("BT /F1 11 Tf 14 TL 72 710 Td")
+
+    y = 710
+    while y > 90:
+        for line in _wrap(text.paragraph(), 90):
+            if y <= 90:
+                break
+            commands.append(f"({_escape_pdf_text(line)}) Tj T*")
+            y -= 14
+        commands.append("T*")
+        y -= 14
+
+    commands.append("ET")
+    return "\n".join(commands).encode("latin-1")
+
+
+def write_pdf(path: str, text: _TextGenerator, pages: int) -> None:
+    """Write a text-only PDF with the given number of pages."""
+    objects: List[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",  # Pages object, filled in below
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold >>",
+    ]
+
+    page_ids = []
+    for page in range(1, pages + 1):
+        content = _page_content(text, page)
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode("ascii")
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+
+    with open(path, "wb") as f:
+        f.write(output)
+
+
+def _sections(text: _TextGenerator, count: int) -> List[Tuple[str, List[str]]]:
+    return [(text.heading(), [text.paragraph() for _ in range(3)]) for _ in range(count)]
+
+
+def write_docx(path: str, text: _TextGenerator, sections: int) -> None:
+    from docx import Document
+
+    document = Document()
+    document.add_heading(text.heading(), level=0)
+    for heading, paragraphs in _sections(text, sections):
+        document.add_heading(heading, level=1)
+        for paragraph in paragraphs:
+            document.add_paragraph(paragraph)
+    document.save(path)
+
+
+def write_pptx(path: str, text: _TextGenerator, slides: int) -> None:
+    from pptx import Presentation
+
+    presentation = Presentation()
+    layout = presentation.slide_layouts[1]  # Title and content
+    for heading, paragraphs in _sections(text, slides):
+        slide = presentation.slides.add_slide(layout)
+        slide.shapes.title.text = heading
+        body = slide.placeholders[1].text_frame
+        body.text = paragraphs[0]
+        for paragraph in paragraphs[1:]:
+            body.add_paragraph().text = paragraph
+    presentation.save(path)
+
+
+def write_html(path: str, text: _TextGenerator, sections: int) -> None:
+    parts = [f"<!DOCTYPE html>\n<html><head><title>{text.heading()}</title></head><body>"]
+    for heading, paragraphs in _sections(text, sections):
+        parts.append(f"<h2>{heading}</h2>")
+        parts.extend(f"<p>{paragraph}</p>" for paragraph in paragraphs)
+    parts.append("</body></html>")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(parts))
+
+
+def write_markdown(path: str, text: _TextGenerator, sections: int) -> None:
+    parts = [f"# {text.heading()}"]
+    for heading, paragraphs in _sections(text, sections):
+        parts.append(f"## {heading}")
+        parts.extend(paragraphs)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n\n".join(parts) + "\n")
+
+
+def generate_corpus(corpus_dir: str, seed: int = 0) -> List[CorpusDocument]:
+    """
+    Generate the benchmark corpus into corpus_dir.
+
+    Every document gets its own generator derived from seed, so adding a
+    document to the corpus does not change the others.
+    """
+    os.makedirs(corpus_dir, exist_ok=True)
+    documents: List[CorpusDocument] = []
+
+    def add(name: str, kind: str, pages: int, writer, size: int) -> None:
+        path = os.path.join(corpus_dir, name)
+        writer(path, _TextGenerator(f"{seed}:{name}"), size)
+        documents.append(CorpusDocument(name.rsplit(".", 1)[0], kind, path, pages))
+
+    for pages in PDF_PAGE_COUNTS:
+        add(f"pdf-{pages}p.pdf", "pdf", pages, write_pdf, pages)
+    add("docx.docx", "docx", 1, write_docx, 40)
+    add("pptx.pptx", "pptx", 20, write_pptx, 20)
+    add("html.html", "html", 1, write_html, 40)
+    add("md.md", "md", 1, write_markdown, 40)
+
+    return documents
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate the benchmark corpus")
+    parser.add_argument("corpus_dir")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for document in generate_corpus(args.corpus_dir, args.seed):
+        print(f"{document.path} ({document.kind}, {os.path.getsize(document.path)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Local stand-in for the internal embeddings API.
+
+Serves POST /api/internal/embeddings/batch like the real route and returns
+deterministic unit vectors derived from each text, after a configurable
+delay that simulates the embedding provider's latency. Requests with
+"encoding": "base64" get the float32 matrix as a base64 string, like the
+real route.
+
+Faults can be injected to exercise the client's retries, hedging and
+circuit breaker (see embeddings.resilience):
+- error_rate: share of requests answered with 503
+- fail_first: number of initial requests answered with 503
+- slow_rate / slow_latency_ms: share of requests delayed by slow_latency_ms
+  instead of latency_ms (tail latency)
+- drop_rate: share of requests whose connection is closed without a response
+Faults are drawn from a seeded generator, so runs are reproducible.
+
+Usage (from apps/document-processor):
+    python benchmarks/fake_embeddings_server.py --port 8765 --latency-ms 80
+    python benchmarks/fake_embeddings_server.py --error-rate 0.05 --slow-rate 0.02 --slow-latency-ms 5000
+    API_URL=http://127.0.0.1:8765 ENCRYPTION_KEY=bench python -m job_runner ...
+
+Or in-process:
+    with FakeEmbeddingsServer(latency_ms=80) as server:
+        os.environ["API_URL"] = server.url
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+import numpy as np
+
+
+def fake_embedding_vector(text: str, dimensions: int) -> np.ndarray:
+    """Deterministic float32 unit vector for a text."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+    vector /= np.linalg.norm(vector)
+    return vector
+
+
+def fake_embedding(text: str, dimensions: int) -> List[float]:
+    """Deterministic unit vector for a text."""
+    return fake_embedding_vector(text, dimensions).tolist()
+
+
+class FakeEmbeddingsServer:
+    """Threaded HTTP server answering embedding batch requests."""
+
+    def __init__(
+        self,
+        latency_ms: float = 50.0,
+        dimensions: int = 768,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        max_texts: int = 100,
+        error_rate: float = 0.0,
+        fail_first: int = 0,
+        slow_rate: float = 0.0,
+        slow_latency_ms: float = 5000.0,
+        drop_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.latency_ms = latency_ms
+        self.dimensions = dimensions
+        self.max_texts = max_texts
+        self.error_rate = error_rate
+        self.fail_first = fail_first
+        self.slow_rate = slow_rate
+        self.slow_latency_ms = slow_latency_ms
+        self.drop_rate = drop_rate
+
+        self.requests = 0
+        self.texts = 0
+        self.injected_errors = 0
+        self.injected_slow = 0
+        self.injected_drops = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        """Base URL to use as API_URL."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeEmbeddingsServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeEmbeddingsServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    def _draw_fault(self) -> Optional[str]:
+        """Pick the fault injected into the current request, if any."""
+        with self._lock:
+            self.requests += 1
+            if self.requests <= self.fail_first or self._random.random() < self.error_rate:
+                self.injected_errors += 1
+                return "error"
+            if self._random.random() < self.drop_rate:
+                self.injected_drops += 1
+                return "drop"
+            if self._random.random() < self.slow_rate:
+                self.injected_slow += 1
+                return "slow"
+        return None
+
+    def handle_batch(self, payload: dict) -> tuple:
+        """Return (status, response body) for a batch request; status None drops the connection."""
+        texts = payload.get("texts")
+        encoding = payload.get("encoding", "float")
+        if not isinstance(texts, list) or not texts or len(texts) > self.max_texts:
+            return 400, {"error": f"texts must be a list of 1 to {self.max_texts} strings"}
+        if encoding not in ("float", "base64") or set(payload) - {"texts", "encoding"}:
+            return 400, {"error": "BAD_REQUEST"}
+
+        fault = self._draw_fault()
+        if fault == "error":
+            return 503, {"error": "Injected failure"}
+        if fault == "drop":
+            return None, None
+
+        with self._lock:
+            self.texts += len(texts)
+
+        latency_ms = self.slow_latency_ms if fault == "slow" else self.latency_ms
+        if latency_ms:
+            time.sleep(latency_ms / 1000.0)
+
+        if encoding == "base64":
+            matrix = np.stack([fake_embedding_vector(text, self.dimensions) for text in texts])
+            return 200, {
+                "encoding": "base64",
+                "dimensions": self.dimensions,
+                "embeddings": base64.b64encode(matrix.astype("<f4").tobytes()).decode("ascii"),
+            }
+
+        return 200, {"embeddings": [fake_embedding(text, self.dimensions) for text in texts]}
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", "0")))
+                if self.path != "/api/internal/embeddings/batch":
+                    status, response = 404, {"error": "Not found"}
+                elif not self.headers.get("x-internal-secret"):
+                    status, response = 401, {"error": "Unauthorized"}
+                else:
+                    try:
+                        status, response = server.handle_batch(json.loads(body or b"{}"))
+                    except json.JSONDecodeError:
+                        status, response = 400, {"error": "Invalid JSON"}
+
+                if status is None:
+                    self.close_connection = True
+                    return
+
+                data = json.dumps(response).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake embeddings API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--dimensions", type=int, default=768)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument("--fail-first", type=int, default=0, help="Initial requests answered with 503")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Share of requests delayed")
+    parser.add_argument("--slow-latency-ms", type=float, default=5000.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Share of connections closed unanswered")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = FakeEmbeddingsServer(
+        args.latency_ms, args.dimensions, args.host, args.port,
+        error_rate=args.error_rate, fail_first=args.fail_first, slow_rate=args.slow_rate,
+        slow_latency_ms=args.slow_latency_ms, drop_rate=args.drop_rate, seed=args.seed,
+    )
+    print(f"Serving fake embeddings on {server.url} (latency {args.latency_ms} ms)")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+"""
+Per-stage ingestion benchmark suite.
+
+Runs every document of the synthetic corpus (see corpus.py) through the
+stages of a processing job and reports the throughput of each stage:
+- download: download_to_temp_file from a MinIO stand-in (MB/s), only if
+  MINIO_ENDPOINT, MINIO_ROOT_USER and MINIO_ROOT_PASSWORD are set
+- convert: DocumentConverter.convert (pages/s)
+- chunk: HybridChunker chunking and contextualization (chunks/s)
+- embed: embed_content against the fake embeddings server (chunks/s);
+  set EMBEDDINGS_TRANSPORT=base64 to measure the base64 float32 transport
+- upload: binary COPY of the embedded chunks into a temporary chunks table
+  (chunks/s) if DATABASE_HOST is set, otherwise a stub that only builds
+  and encodes the rows
+
+Results are written as JSON and can be stored as named baselines in
+benchmarks/baselines/. The compare command flags stages whose throughput
+dropped by more than the threshold and exits with status 1 if any did.
+
+Usage (from apps/document-processor):
+    python benchmarks/run_benchmarks.py run --output results.json --save-baseline main
+    python benchmarks/run_benchmarks.py compare results.json --baseline main --threshold 0.15
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from statistics import median
+from typing import Callable, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from corpus import CorpusDocument, generate_corpus  # noqa: E402
+from fake_embeddings_server import FakeEmbeddingsServer  # noqa: E402
+
+BASELINES_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+# Chunks per insert batch
+BATCH_SIZE = 30
+
+STAGES = ("download", "convert", "chunk", "embed", "upload")
+
+
+def _measure(run: Callable[[], None], repeat: int) -> float:
+    """Median wall time of repeat runs."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    return median(timings)
+
+
+def _result(seconds: float, items: float, unit: str) -> dict:
+    return {
+        "seconds": round(seconds, 6),
+        "items": items,
+        "unit": unit,
+        "throughput": round(items / seconds, 3) if seconds > 0 else None,
+    }
+
+
+def _bench_download(documents: List[CorpusDocument], repeat: int) -> Dict[str, dict]:
+    """Time downloads from MinIO into temporary files."""
+    if not all(os.getenv(var) for var in ("MINIO_ENDPOINT", "MINIO_ROOT_USER", "MINIO_ROOT_PASSWORD")):
+        print("download: skipped (MINIO_ENDPOINT, MINIO_ROOT_USER and MINIO_ROOT_PASSWORD not set)")
+        return {}
+
+    os.environ["USE_LOCAL_FILE_STORAGE"] = "true"
+    from access_clients import download_to_temp_file
+    from access_clients.storage.local_storage_client import LocalStorageClient
+
+    bucket = os.getenv("BENCH_BUCKET", "bench-corpus")
+    s3 = LocalStorageClient()._get_client()
+    if bucket not in [b["Name"] for b in s3.list_buckets().get("Buckets", [])]:
+        s3.create_bucket(Bucket=bucket)
+
+    results = {}
+    for document in documents:
+        key = os.path.basename(document.path)
+        s3.upload_file(document.path, bucket, key)
+
+        def run() -> None:
+            with download_to_temp_file(bucket, key):
+                pass
+
+        size_mb = os.path.getsize(document.path) / (1024 * 1024)
+        results[document.name] = _result(_measure(run, repeat), round(size_mb, 3), "MB")
+        s3.delete_object(Bucket=bucket, Key=key)
+
+    return results
+
+
+def _bench_convert(documents: List[CorpusDocument], repeat: int) -> Tuple[Dict[str, dict], dict]:
+    """Time document conversion; returns results and the converted documents."""
+    from app_state import get_converter
+
+    converter = get_converter()
+    # Load the conversion models outside of the measurements
+    converter.convert(documents[0].path)
+
+    results, converted = {}, {}
+    for document in documents:
+        def run() -> None:
+            converted[document.name] = converter.convert(document.path).document
+
+        seconds = _measure(run, repeat)
+        pages = converted[document.name].num_pages() or document.pages
+        results[document.name] = _result(seconds, pages, "pages")
+
+    return results, converted
+
+
+def _bench_chunk(converted: dict, repeat: int) -> Tuple[Dict[str, dict], Dict[str, List[str]]]:
+    """Time HybridChunker chunking; returns results and the contextualized texts."""
+    from docling_core.transforms.chunker.hybrid_chunker import HybridChunker
+    from utils.tokenizer import get_tokenizer
+
+    # The shared tokenizer of the processors (see utils.tokenizer)
+    chunker = HybridChunker(tokenizer=get_tokenizer())
+    results, texts = {}, {}
+    for name, dl_doc in converted.items():
+        def run() -> None:
+            texts[name] = [
+                text for text in (chunker.contextualize(chunk=chunk) for chunk in chunker.chunk(dl_doc=dl_doc))
+                if text.strip()
+            ]
+
+        seconds = _measure(run, repeat)
+        results[name] = _result(seconds, len(texts[name]), "chunks")
+
+    return results, texts
+
+
+def _bench_embed(
+    texts: Dict[str, List[str]],
+    repeat: int,
+    latency_ms: float,
+    dimensions: int,
+) -> Tuple[Dict[str, dict], Dict[str, np.ndarray]]:
+    """Time embed_content against the fake embeddings server."""
+    from embeddings.batching import iter_processing_batches
+    from embeddings.embeddings_client import close_client, embed_content
+
+    results, embeddings = {}, {}
+    with FakeEmbeddingsServer(latency_ms=latency_ms, dimensions=dimensions) as server:
+        os.environ["API_URL"] = server.url
+        os.environ.setdefault("ENCRYPTION_KEY", "benchmark")
+        # Measure the API path, not the cache
+        os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+
+        for name, contents in texts.items():
+            def run() -> None:
+                # Token-sized batches, as in the processors
+                embeddings[name] = np.concatenate([
+                    embed_content(batch) for batch in iter_processing_batches(contents, lambda text: text)
+                ])
+
+            results[name] = _result(_measure(run, repeat), len(contents), "chunks")
+
+        close_client()
+
+    return results, embeddings
+
+
+def _bench_upload(
+    texts: Dict[str, List[str]],
+    embeddings: Dict[str, np.ndarray],
+    repeat: int,
+    dimensions: int,
+) -> Dict[str, dict]:
+    """Time chunk inserts with binary COPY, or only row encoding without a database."""
+    from db.postgres import (
+        ChunkBatch,
+        _build_chunk_copy_rows,
+        copy_chunk_rows,
+        get_connection,
+        register_vector_type,
+    )
+
+    use_database = bool(os.getenv("DATABASE_HOST"))
+    if not use_database:
+        print("upload: DATABASE_HOST not set, measuring row encoding only (stub)")
+
+    conn = None
+    if use_database:
+        from bench_chunk_insert import _create_temp_chunks_table
+
+        conn = get_connection()
+        conn.prepare_threshold = 0
+        register_vector_type(conn)
+        _create_temp_chunks_table(conn, dimensions)
+
+    results = {}
+    try:
+        for name, contents in texts.items():
+            page_indexes = np.arange(len(contents), dtype=np.int32) // 5
+            bboxes = np.tile([10.0, 20.0, 300.0, 400.0], (len(contents), 1))
+            task_id, course_id = str(uuid4()), str(uuid4())
+
+            def run() -> None:
+                for start in range(0, len(contents), BATCH_SIZE):
+                    end = start + BATCH_SIZE
+                    batch = ChunkBatch(
+                        contents[start:end], embeddings[name][start:end], page_indexes[start:end], bboxes[start:end]
+                    )
+                    # Building the rows encodes ids and embeddings
+                    rows = _build_chunk_copy_rows(task_id, course_id, "Benchmark course", name, batch, 0)
+                    if conn is not None:
+                        with conn.cursor() as cursor:
+                            copy_chunk_rows(cursor, rows)
+
+                if conn is not None:
+                    conn.commit()
+                    with conn.cursor() as cursor:
+                        cursor.execute("TRUNCATE chunks")
+                    conn.commit()
+
+            results[name] = _result(_measure(run, repeat), len(contents), "chunks")
+    finally:
+        if conn is not None:
+            conn.close()
+
+    return results
+
+
+def run_suite(args: argparse.Namespace) -> dict:
+    """Run all stages and return the results document."""
+    corpus_dir = args.corpus_dir or tempfile.mkdtemp(prefix="bench-corpus-")
+    documents = generate_corpus(corpus_dir, args.seed)
+    print(f"Corpus: {len(documents)} documents in {corpus_dir}")
+
+    results: Dict[str, Dict[str, dict]] = {}
+    results["download"] = _bench_download(documents, args.repeat)
+    results["convert"], converted = _bench_convert(documents, args.repeat)
+    results["chunk"], texts = _bench_chunk(converted, args.repeat)
+    results["embed"], embeddings = _bench_embed(texts, args.repeat, args.latency_ms, args.dimensions)
+    results["upload"] = _bench_upload(texts, embeddings, args.repeat, args.dimensions)
+
+    return {
+        "metadata": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "docling": _package_version("docling"),
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "embeddings_latency_ms": args.latency_ms,
+            "upload": "postgres" if os.getenv("DATABASE_HOST") else "stub",
+        },
+        "results": {
+            f"{stage}/{name}": result
+            for stage in STAGES
+            for name, result in results.get(stage, {}).items()
+        },
+    }
+
+
+def _package_version(name: str) -> Optional[str]:
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return None
+
+
+def _print_results(document: dict) -> None:
+    for key, result in document["results"].items():
+        print(f"{key:>24}: {result['seconds']:.3f}s, {result['throughput']} {result['unit']}/s")
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> List[str]:
+    """
+    Compare results with a baseline.
+
+    Returns:
+        Keys whose throughput dropped by more than threshold (e.g. 0.1 for 10%)
+    """
+    regressions = []
+    for key, base in baseline["results"].items():
+        result = current["results"].get(key)
+        if result is None or not result.get("throughput") or not base.get("throughput"):
+            print(f"{key:>24}: missing")
+            continue
+
+        change = result["throughput"] / base["throughput"] - 1
+        status = ""
+        if change < -threshold:
+            status = "REGRESSION"
+            regressions.append(key)
+        elif change > threshold:
+            status = "improved"
+        print(f"{key:>24}: {base['throughput']:>10} -> {result['throughput']:>10} {result['unit']}/s ({change:+.1%}) {status}")
+
+    return regressions
+
+
+def _baseline_path(name: str) -> str:
+    return os.path.join(BASELINES_DIR, f"{name}.json")
+
+
+def _write_json(path: str, document: dict) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+        f.write("\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmark suite")
+    run_parser.add_argument("--output", help="Write results to this JSON file")
+    run_parser.add_argument("--save-baseline", metavar="NAME", help="Store results as benchmarks/baselines/NAME.json")
+    run_parser.add_argument("--corpus-dir", help="Directory for the generated corpus (default: temp dir)")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--latency-ms", type=float, default=50.0, help="Fake embeddings API latency")
+    run_parser.add_argument("--dimensions", type=int, default=768)
+
+    compare_parser = subparsers.add_parser("compare", help="Compare results with a baseline")
+    compare_parser.add_argument("results", help="Results JSON written by run --output")
+    compare_parser.add_argument("--baseline", default="main", help="Baseline name or path to a results file")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="Allowed throughput drop (default: 0.1)")
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        document = run_suite(args)
+        _print_results(document)
+        if args.output:
+            _write_json(args.output, document)
+        if args.save_baseline:
+            _write_json(_baseline_path(args.save_baseline), document)
+            print(f"Saved baseline {args.save_baseline}")
+        return
+
+    baseline_path = args.baseline if os.path.exists(args.baseline) else _baseline_path(args.baseline)
+    with open(args.results) as f:
+        current = json.load(f)
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    regressions = compare(current, baseline, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print("No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,10 @@ Provides unified interface for storage and embeddings operations across differen
 """
 
 from .storage_client_factory import get_storage_client
+from .downloads import DownloadedFile, download_to_temp_file
 
 __all__ = [
     "get_storage_client",
+    "DownloadedFile",
+    "download_to_temp_file",
 ]
@@ -0,0 +1,62 @@
+"""
+Downloads of stored objects into temporary files.
+
+Objects are streamed to disk instead of being held in memory, so peak
+memory does not depend on the upload size. Docling and pypdfium2 then
+read the document by path. Temporary files are created in
+DOWNLOAD_TEMP_DIR (default: the system temp directory).
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator
+
+from .storage_client_factory import get_storage_client
+
+from utils.instrumentation import span
+from logger import setup_logger
+
+# Configure logger
+logger = setup_logger(__name__)
+
+
+class DownloadedFile:
+    """A stored object downloaded into a local temporary file."""
+
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self.size = size
+
+
+@contextmanager
+def download_to_temp_file(bucket: str, key: str) -> Iterator[DownloadedFile]:
+    """
+    Download an object into a temporary file that is deleted on exit.
+
+    The file keeps the extension of the key so converters can detect the
+    document format from the path.
+
+    Args:
+        bucket: Storage bucket name
+        key: Object key (path) in the bucket
+
+    Yields:
+        DownloadedFile: Path and size of the downloaded file
+    """
+    suffix = os.path.splitext(key)[1].lower()
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=os.getenv("DOWNLOAD_TEMP_DIR") or None)
+
+    try:
+        logger.debug(f"Downloading from storage: bucket={bucket}, key={key}")
+        with span("fetch") as fetch_span, os.fdopen(fd, "wb") as file:
+            size = get_storage_client().download_to_file(bucket, key, file)
+            fetch_span.add_items(size)
+        logger.debug(f"Downloaded {size} bytes to {path}")
+
+        yield DownloadedFile(path, size)
+    finally:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
@@ -3,7 +3,7 @@ Base interface for storage clients.
 All storage implementations must implement this protocol.
 """
 
-from typing import Protocol
+from typing import BinaryIO, Protocol
 
 
 class IStorageClient(Protocol):
@@ -25,6 +25,26 @@ class IStorageClient(Protocol):
         """
         ...
 
+    def download_to_file(self, bucket: str, key: str, file: BinaryIO) -> int:
+        """
+        Stream an object into a writable binary file.
+
+        The object is written in bounded pieces and never held in memory
+        as a whole.
+
+        Args:
+            bucket: Storage bucket name
+            key: Object key (path) in the bucket
+            file: Writable binary file object, positioned at the start
+
+        Returns:
+            int: Number of bytes written
+
+        Raises:
+            Exception: If the storage operation fails
+        """
+        ...
+
     def delete_file(self, bucket: str, key: str) -> None:
         """
         Delete a file from storage.
@@ -1,11 +1,21 @@
-"""Storage client implementations."""
+"""Storage client implementations, imported on first access (each pulls in its provider SDK)."""
 
-from .cloudflare_storage_client import CloudflareStorageClient
-from .google_storage_client import GoogleStorageClient
-from .aws_storage_client import AwsStorageClient
+import importlib
+
+_CLIENTS = {
+    "CloudflareStorageClient": ".cloudflare_storage_client",
+    "GoogleStorageClient": ".google_storage_client",
+    "AwsStorageClient": ".aws_storage_client",
+}
 
 __all__ = [
     "CloudflareStorageClient",
     "GoogleStorageClient",
     "AwsStorageClient",
 ]
+
+
+def __getattr__(name: str):
+    if name in _CLIENTS:
+        return getattr(importlib.import_module(_CLIENTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
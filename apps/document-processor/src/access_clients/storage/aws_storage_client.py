@@ -6,10 +6,12 @@ Thread-safe using double-checked locking pattern.
 
 import os
 import threading
-from typing import Optional, Any
+from typing import Optional, Any, BinaryIO
 
 import boto3
+from botocore.client import Config
 from ..interfaces.storage_client import IStorageClient
+from .streaming import download_s3_object, get_max_pool_connections
 
 
 class AwsStorageClient(IStorageClient):
@@ -32,6 +34,9 @@ class AwsStorageClient(IStorageClient):
             with self._client_lock:
                 # Double-check after acquiring lock
                 if self._client is None:
+                    # Keep enough connections for concurrent ranged downloads
+                    config = Config(max_pool_connections=get_max_pool_connections())
+
                     # Use explicit credentials if provided
                     if os.getenv("AWS_ACCESS_KEY_ID") and os.getenv("AWS_SECRET_ACCESS_KEY"):
                         self._client = boto3.client(
@@ -40,10 +45,11 @@ class AwsStorageClient(IStorageClient):
                             aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
                             aws_secret_access_key=os.getenv(
                                 "AWS_SECRET_ACCESS_KEY"),
+                            config=config,
                         )
                     else:
                         # Let boto3 use its default provider chain
-                        self._client = boto3.client("s3")
+                        self._client = boto3.client("s3", config=config)
 
         return self._client
 
@@ -71,6 +77,30 @@ class AwsStorageClient(IStorageClient):
         response = client.get_object(Bucket=f"{bucket_prefix}-{bucket}", Key=key)
         return response["Body"].read()
 
+    def download_to_file(self, bucket: str, key: str, file: BinaryIO) -> int:
+        """
+        Stream an object from S3 into a file without loading it into memory.
+
+        Args:
+            bucket: S3 bucket name
+            key: Object key (path) in the bucket
+            file: Writable binary file object
+
+        Returns:
+            int: Number of bytes written
+
+        Raises:
+            ClientError: If the S3 operation fails
+        """
+        bucket_prefix = os.getenv("AWS_PROJECT_NAME")
+
+        if not bucket_prefix:
+            raise ValueError(
+                "Environment variable 'AWS_PROJECT_NAME' is not set.")
+
+        client = self._get_client()
+        return download_s3_object(client, f"{bucket_prefix}-{bucket}", key, file)
+
     def delete_file(self, bucket: str, key: str) -> None:
         """
         Delete a file from S3 storage.
@@ -6,10 +6,12 @@ Thread-safe using double-checked locking pattern.
 
 import os
 import threading
-from typing import Optional, Any
+from typing import Optional, Any, BinaryIO
 
 import boto3
+from botocore.client import Config
 from ..interfaces.storage_client import IStorageClient
+from .streaming import download_s3_object, get_max_pool_connections
 
 
 class CloudflareStorageClient(IStorageClient):
@@ -51,6 +53,8 @@ class CloudflareStorageClient(IStorageClient):
                         aws_access_key_id=aws_access_key_id,
                         aws_secret_access_key=aws_secret_access_key,
                         region_name="auto",
+                        # Keep enough connections for concurrent ranged downloads
+                        config=Config(max_pool_connections=get_max_pool_connections()),
                     )
 
         return self._client
@@ -73,6 +77,24 @@ class CloudflareStorageClient(IStorageClient):
         response = client.get_object(Bucket=bucket, Key=key)
         return response["Body"].read()
 
+    def download_to_file(self, bucket: str, key: str, file: BinaryIO) -> int:
+        """
+        Stream an object from R2 into a file without loading it into memory.
+
+        Args:
+            bucket: R2 bucket name
+            key: Object key (path) in the bucket
+            file: Writable binary file object
+
+        Returns:
+            int: Number of bytes written
+
+        Raises:
+            ClientError: If the R2 operation fails
+        """
+        client = self._get_client()
+        return download_s3_object(client, bucket, key, file)
+
     def delete_file(self, bucket: str, key: str) -> None:
         """
         Delete a file from R2 storage.
@@ -6,11 +6,12 @@ Thread-safe using double-checked locking pattern.
 
 import os
 import threading
-from typing import Optional, Any
+from typing import Optional, Any, BinaryIO
 
 import boto3
 from botocore.client import Config
 from ..interfaces.storage_client import IStorageClient
+from .streaming import download_s3_object, get_max_pool_connections
 
 
 class LocalStorageClient(IStorageClient):
@@ -53,7 +54,9 @@ class LocalStorageClient(IStorageClient):
                         region_name="us-east-1",  # MinIO uses this as default
                         config=Config(
                             # Required for MinIO
-                            s3={'addressing_style': 'path'}
+                            s3={'addressing_style': 'path'},
+                            # Keep enough connections for concurrent ranged downloads
+                            max_pool_connections=get_max_pool_connections(),
                         )
                     )
 
@@ -78,6 +81,25 @@ class LocalStorageClient(IStorageClient):
         response = client.get_object(Bucket=bucket, Key=key)
         return response["Body"].read()
 
+    def download_to_file(self, bucket: str, key: str, file: BinaryIO) -> int:
+        """
+        Stream an object from MinIO into a file without loading it into memory.
+
+        Args:
+            bucket: MinIO bucket name
+            key: Object key (path) in the bucket
+            file: Writable binary file object
+
+        Returns:
+            int: Number of bytes written
+
+        Raises:
+            ClientError: If the S3 operation fails
+            ValueError: If required environment variables are not set
+        """
+        client = self._get_client()
+        return download_s3_object(client, bucket, key, file)
+
     def delete_file(self, bucket: str, key: str) -> None:
         """
         Delete a file from MinIO storage.
@@ -0,0 +1,214 @@
+"""
+Streaming download helpers shared by the storage clients.
+
+Large objects are downloaded as concurrent byte-range requests written into
+the target file at their offsets, so the download time is bounded by
+bandwidth rather than single-stream latency. Objects smaller than one part
+are downloaded with a single request.
+
+Environment Variables:
+    DOWNLOAD_CHUNK_SIZE_KB: Bytes read from a response stream at a time (default: 1024)
+    DOWNLOAD_PART_SIZE_MB: Size of each ranged request (default: 8)
+    DOWNLOAD_MAX_CONCURRENCY: Ranged requests in flight (default: 8, 1 disables ranged downloads)
+"""
+
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+# Total size in a Content-Range header, e.g. "bytes 0-8388607/52428800"
+_CONTENT_RANGE_TOTAL = re.compile(r"/(\d+)$")
+
+
+def get_download_chunk_size() -> int:
+    """Bytes read from the response stream at a time (DOWNLOAD_CHUNK_SIZE_KB, default: 1024)."""
+    return max(64, int(os.getenv("DOWNLOAD_CHUNK_SIZE_KB", "1024"))) * 1024
+
+
+def get_download_part_size() -> int:
+    """Bytes fetched per ranged request (DOWNLOAD_PART_SIZE_MB, default: 8)."""
+    return max(1, int(os.getenv("DOWNLOAD_PART_SIZE_MB", "8"))) * 1024 * 1024
+
+
+def get_download_max_concurrency() -> int:
+    """Ranged requests in flight per download (DOWNLOAD_MAX_CONCURRENCY, default: 8)."""
+    return max(1, int(os.getenv("DOWNLOAD_MAX_CONCURRENCY", "8")))
+
+
+def get_max_pool_connections() -> int:
+    """HTTP connections kept by a storage client, enough for one ranged download."""
+    return max(10, get_download_max_concurrency())
+
+
+def get_part_ranges(start: int, size: int, part_size: int) -> List[Tuple[int, int]]:
+    """
+    Split the bytes [start, size) into inclusive (first, last) byte ranges.
+
+    Example:
+        get_part_ranges(0, 10, 4) -> [(0, 3), (4, 7), (8, 9)]
+    """
+    return [
+        (offset, min(offset + part_size, size) - 1)
+        for offset in range(start, size, part_size)
+    ]
+
+
+def download_ranges(
+    fetch_range: Callable[[int, int], bytes],
+    ranges: List[Tuple[int, int]],
+    file: BinaryIO,
+    max_concurrency: int,
+    file_offset: int = 0,
+) -> int:
+    """
+    Fetch byte ranges concurrently and write each at its offset in file.
+
+    At most max_concurrency parts are held in memory at once. The file is
+    left positioned at the end of the last range.
+
+    Args:
+        fetch_range: Function returning the bytes of an inclusive (first, last) range
+        ranges: Inclusive byte ranges of the object to fetch
+        file: Writable, seekable binary file object
+        max_concurrency: Maximum number of ranged requests in flight
+        file_offset: Position in file of the object's first byte
+
+    Returns:
+        int: Number of bytes written
+    """
+    if not ranges:
+        return 0
+
+    write_lock = threading.Lock()
+
+    def fetch_and_write(byte_range: Tuple[int, int]) -> int:
+        first, last = byte_range
+        data = fetch_range(first, last)
+        if len(data) != last - first + 1:
+            raise IOError(f"Expected {last - first + 1} bytes for range {first}-{last}, got {len(data)}")
+
+        with write_lock:
+            file.seek(file_offset + first)
+            file.write(data)
+        return len(data)
+
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="download") as executor:
+        futures = []
+        written = 0
+        try:
+            for byte_range in ranges:
+                # Keep at most max_concurrency parts in flight
+                if len(futures) >= max_concurrency:
+                    written += futures.pop(0).result()
+                futures.append(executor.submit(fetch_and_write, byte_range))
+
+            for future in futures:
+                written += future.result()
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
+
+    file.seek(file_offset + ranges[-1][1] + 1)
+    return written
+
+
+def _get_total_size(response: dict) -> Optional[int]:
+    """Total object size from the Content-Range of a ranged GetObject response."""
+    match = _CONTENT_RANGE_TOTAL.search(response.get("ContentRange") or "")
+    return int(match.group(1)) if match else None
+
+
+def stream_s3_object(client: Any, bucket: str, key: str, file: BinaryIO) -> int:
+    """
+    Stream an S3 object into a file with a single GET request.
+
+    Args:
+        client: boto3 S3 client
+        bucket: Full bucket name
+        key: Object key (path) in the bucket
+        file: Writable binary file object
+
+    Returns:
+        int: Number of bytes written
+
+    Raises:
+        ClientError: If the S3 operation fails
+    """
+    response = client.get_object(Bucket=bucket, Key=key)
+    return _write_body(response["Body"], file)
+
+
+def download_s3_object(client: Any, bucket: str, key: str, file: BinaryIO) -> int:
+    """
+    Download an S3 object into a file using concurrent ranged requests.
+
+    The first part is requested directly; its Content-Range reveals the
+    object size, so small objects need a single request and no HEAD. The
+    remaining parts are fetched with If-Match on the first part's ETag,
+    so an object replaced mid-download fails instead of mixing versions.
+
+    Args:
+        client: boto3 S3 client
+        bucket: Full bucket name
+        key: Object key (path) in the bucket
+        file: Writable, seekable binary file object
+
+    Returns:
+        int: Number of bytes written
+
+    Raises:
+        ClientError: If the S3 operation fails
+    """
+    max_concurrency = get_download_max_concurrency()
+    if max_concurrency <= 1:
+        return stream_s3_object(client, bucket, key, file)
+
+    part_size = get_download_part_size()
+    start = file.tell()
+
+    try:
+        response = client.get_object(Bucket=bucket, Key=key, Range=f"bytes=0-{part_size - 1}")
+    except ClientError as e:
+        # Empty objects cannot satisfy a range request
+        if e.response.get("Error", {}).get("Code") == "InvalidRange":
+            return stream_s3_object(client, bucket, key, file)
+        raise
+
+    written = _write_body(response["Body"], file)
+    total_size = _get_total_size(response)
+
+    if total_size is None or total_size <= written:
+        # The first part already contained the whole object
+        return written
+
+    etag = response.get("ETag")
+
+    def fetch_range(first: int, last: int) -> bytes:
+        extra = {"IfMatch": etag} if etag else {}
+        part = client.get_object(Bucket=bucket, Key=key, Range=f"bytes={first}-{last}", **extra)
+        body = part["Body"]
+        try:
+            return body.read()
+        finally:
+            body.close()
+
+    ranges = get_part_ranges(written, total_size, part_size)
+    return written + download_ranges(fetch_range, ranges, file, max_concurrency, file_offset=start)
+
+
+def _write_body(body: Any, file: BinaryIO) -> int:
+    """Copy a botocore streaming body into file in bounded chunks."""
+    written = 0
+    try:
+        for chunk in body.iter_chunks(chunk_size=get_download_chunk_size()):
+            file.write(chunk)
+            written += len(chunk)
+    finally:
+        body.close()
+
+    return written
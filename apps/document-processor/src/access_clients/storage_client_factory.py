@@ -1,15 +1,12 @@
 """
 Storage client factory.
 Provides a singleton storage client based on environment configuration.
+Only the SDK of the selected provider is imported.
 """
 
 import os
 from typing import Optional
 from .interfaces.storage_client import IStorageClient
-from .storage.google_storage_client import GoogleStorageClient
-from .storage.aws_storage_client import AwsStorageClient
-from .storage.cloudflare_storage_client import CloudflareStorageClient
-from .storage.local_storage_client import LocalStorageClient
 
 from logger import setup_logger
 
@@ -46,12 +43,14 @@ def get_storage_client() -> IStorageClient:
     # Check for local storage first
     if os.getenv("USE_LOCAL_FILE_STORAGE", "").lower() == "true":
         logger.info("Using Local MinIO storage")
+        from .storage.local_storage_client import LocalStorageClient
         _storage_client_instance = LocalStorageClient()
         return _storage_client_instance
 
     # Check for Cloudflare R2
     if os.getenv("USE_CLOUDFLARE_R2", "").lower() == "true":
         logger.info("Using Cloudflare R2 storage")
+        from .storage.cloudflare_storage_client import CloudflareStorageClient
         _storage_client_instance = CloudflareStorageClient()
         return _storage_client_instance
 
@@ -60,13 +59,16 @@ def get_storage_client() -> IStorageClient:
 
     if cloud_provider == "aws":
         logger.info("Using AWS S3 Storage")
+        from .storage.aws_storage_client import AwsStorageClient
         _storage_client_instance = AwsStorageClient()
     elif cloud_provider == "azure":
         logger.warning("Azure is currently not supported, defaulting to Local MinIO storage")
+        from .storage.local_storage_client import LocalStorageClient
         _storage_client_instance = LocalStorageClient()
     elif cloud_provider == "gcloud":
         # Default to Google Cloud Storage
         logger.info("Using Google Cloud Storage")
+        from .storage.google_storage_client import GoogleStorageClient
         _storage_client_instance = GoogleStorageClient()
     else:
         logger.error(f"Invalid CLOUD_PROVIDER '{cloud_provider}' specified")
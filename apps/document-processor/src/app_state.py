@@ -2,61 +2,255 @@
 Shared application state and dependencies.
 This module provides singleton instances that are shared across the application.
 Uses lazy initialization to avoid creating clients at import time.
+
+Docling is imported on first use as well. Non-PDF documents with a
+declarative format are converted through convert_document_file, by a
+converter restricted to these formats that never builds the PDF pipeline
+and its models.
 """
 
-from typing import Optional
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
 
+import os
 import threading
-from docling.document_converter import DocumentConverter, PdfFormatOption
-from docling.datamodel.base_models import InputFormat
-from docling.datamodel.pipeline_options import PdfPipelineOptions
 
-from utils.tokenizer import get_tokenizer
+from utils.memory import get_rss_bytes
 from logger import setup_logger
 
+if TYPE_CHECKING:
+    from docling.datamodel.document import ConversionResult
+    from docling.document_converter import DocumentConverter
+
 # Configure logger
 logger = setup_logger(__name__)
 
+# Pipeline options that select a converter, in cache key order
+PIPELINE_OPTION_ATTRS = (
+    "do_ocr",
+    "do_table_structure",
+    "do_formula_enrichment",
+    "do_code_enrichment",
+    "do_picture_description",
+)
+
+ConverterKey = Tuple[bool, bool, bool, bool, bool]
+
+# Key of the converter with all optional pipeline stages disabled
+DEFAULT_CONVERTER_KEY: ConverterKey = (False, False, False, False, False)
+
+
+def normalize_pipeline_options(pipeline_options: Optional[object]) -> ConverterKey:
+    """
+    Normalize pipeline options into a converter cache key.
+
+    Missing options default to False, so None and an all-defaults options
+    object map to the same converter.
+    """
+    if not pipeline_options:
+        return DEFAULT_CONVERTER_KEY
+
+    return tuple(
+        bool(getattr(pipeline_options, attr, False)) for attr in PIPELINE_OPTION_ATTRS
+    )
+
+
+def _build_converter(key: ConverterKey, initialize_pipeline: bool) -> "DocumentConverter":
+    """Create a DocumentConverter, optionally loading its PDF pipeline models."""
+    from docling.document_converter import DocumentConverter, PdfFormatOption
+    from docling.datamodel.base_models import InputFormat
+    from docling.datamodel.pipeline_options import PdfPipelineOptions
+
+    pipeline_options = PdfPipelineOptions()
+    for attr, value in zip(PIPELINE_OPTION_ATTRS, key):
+        setattr(pipeline_options, attr, value)
+
+    logger.debug("Pipeline options: %s", dict(zip(PIPELINE_OPTION_ATTRS, key)))
+
+    converter = DocumentConverter(
+        format_options={
+            InputFormat.PDF: PdfFormatOption(
+                pipeline_options=pipeline_options)
+        }
+    )
+    if initialize_pipeline:
+        converter.initialize_pipeline(InputFormat.PDF)
+    return converter
+
+
+class ConverterCache:
+    """
+    Bounded, thread-safe LRU cache of DocumentConverter instances.
+
+    Converters are keyed by their normalized pipeline options. Least
+    recently used converters are evicted once the cache holds more than
+    max_entries converters or exceeds max_memory_bytes. The most recently
+    used converter is never evicted.
+
+    With a memory limit, the PDF pipeline models are loaded when a converter
+    is created, and the entry's footprint is estimated from the RSS growth
+    while they were loaded. Without a limit, models load lazily on the first
+    conversion, so non-PDF jobs never pay for the PDF models.
+    """
+
+    def __init__(self, max_entries: int, max_memory_bytes: int = 0):
+        self.max_entries = max(1, max_entries)
+        self.max_memory_bytes = max_memory_bytes
+        self._entries: "OrderedDict[ConverterKey, Tuple['DocumentConverter', int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: ConverterKey) -> "DocumentConverter":
+        """Get the converter for key, creating it on a cache miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry[0]
+
+            logger.info(f"Initializing Docling document converter for pipeline options {key}")
+            rss_before = get_rss_bytes()
+            converter = _build_converter(key, initialize_pipeline=bool(self.max_memory_bytes))
+            estimated_bytes = max(0, get_rss_bytes() - rss_before)
+            logger.info(f"Docling document converter initialized (~{estimated_bytes // (1024 * 1024)} MB)")
+
+            self._entries[key] = (converter, estimated_bytes)
+            self._evict()
+            return converter
+
+    def memory_bytes(self) -> int:
+        """Estimated memory held by all cached converters."""
+        return sum(estimated for _, estimated in self._entries.values())
+
+    def clear(self) -> None:
+        """Drop all cached converters."""
+        with self._lock:
+            self._entries.clear()
+
+    def _evict(self) -> None:
+        """Evict least recently used converters until within the limits."""
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries
+            or (self.max_memory_bytes and self.memory_bytes() > self.max_memory_bytes)
+        ):
+            key, (_, estimated_bytes) = self._entries.popitem(last=False)
+            logger.info(f"Evicted converter for pipeline options {key} (~{estimated_bytes // (1024 * 1024)} MB)")
+
+
 # Singleton storage for lazy initialization
-_converter: Optional[DocumentConverter] = None
-_converter_lock = threading.Lock()
+_converter_cache: Optional[ConverterCache] = None
+_converter_cache_lock = threading.Lock()
 
 
-def get_converter() -> DocumentConverter:
+def _get_converter_cache() -> ConverterCache:
+    """
+    Get or create the converter cache singleton.
+
+    Sized by CONVERTER_CACHE_MAX_ENTRIES (default: 4) and
+    CONVERTER_CACHE_MAX_MB (default: 0, no memory limit).
     """
-    Get or create the Docling converter singleton.
+    global _converter_cache
+    if _converter_cache is None:
+        with _converter_cache_lock:
+            # Double-check after acquiring lock
+            if _converter_cache is None:
+                _converter_cache = ConverterCache(
+                    max_entries=int(os.getenv("CONVERTER_CACHE_MAX_ENTRIES", "4")),
+                    max_memory_bytes=int(os.getenv("CONVERTER_CACHE_MAX_MB", "0")) * 1024 * 1024,
+                )
+    return _converter_cache
+
+
+def get_converter_for_options(pipeline_options: Optional[object]) -> "DocumentConverter":
+    """
+    Get a cached Docling converter for the given pipeline options.
+    Lazily initializes the converter on first access (thread-safe).
+
+    Args:
+        pipeline_options: Object with do_* attributes, or None for the defaults
+
+    Returns:
+        DocumentConverter: Initialized Docling converter for these options
+    """
+    return _get_converter_cache().get(normalize_pipeline_options(pipeline_options))
+
+
+def get_converter() -> "DocumentConverter":
+    """
+    Get or create the Docling converter with default options.
     Lazily initializes the converter on first access (thread-safe).
 
     Returns:
         DocumentConverter: Initialized Docling converter with default options
     """
-    global _converter
-    if _converter is None:
-        with _converter_lock:
+    return _get_converter_cache().get(DEFAULT_CONVERTER_KEY)
+
+
+# Formats Docling converts with its SimplePipeline, by file extension.
+# Extensions shared by several formats (xml, txt, json) are left to the
+# default converter, which inspects the content.
+_DECLARATIVE_FORMATS: Dict[str, str] = {
+    **dict.fromkeys(("docx", "dotx", "docm", "dotm"), "DOCX"),
+    **dict.fromkeys(("pptx", "potx", "ppsx", "pptm", "potm", "ppsm"), "PPTX"),
+    **dict.fromkeys(("xlsx", "xlsm"), "XLSX"),
+    **dict.fromkeys(("html", "htm", "xhtml"), "HTML"),
+    **dict.fromkeys(("adoc", "asciidoc", "asc"), "ASCIIDOC"),
+    "md": "MD",
+    "csv": "CSV",
+    "vtt": "VTT",
+}
+
+_declarative_converter: Optional["DocumentConverter"] = None
+_declarative_converter_lock = threading.Lock()
+
+
+def _get_declarative_converter() -> "DocumentConverter":
+    """
+    Get or create the shared converter for the declarative formats.
+
+    Only these formats are allowed, so the converter builds the
+    SimplePipeline of their default format options and never the PDF
+    pipeline or its models.
+    """
+    global _declarative_converter
+    if _declarative_converter is None:
+        with _declarative_converter_lock:
             # Double-check after acquiring lock
-            if _converter is None:
-                logger.info("Initializing Docling document converter with default pipeline options")
-                # Initialize with default pipeline options
-                pipeline_options = PdfPipelineOptions()
-                pipeline_options.do_ocr = False
-                pipeline_options.do_formula_enrichment = False
-                pipeline_options.do_code_enrichment = False
-                pipeline_options.do_table_structure = False
-                pipeline_options.do_picture_description = False
-
-                logger.debug("Pipeline options: OCR=False, Formula=False, Code=False, Table=False, Picture=False")
-
-                _converter = DocumentConverter(
-                    format_options={
-                        InputFormat.PDF: PdfFormatOption(
-                            pipeline_options=pipeline_options)
-                    }
+            if _declarative_converter is None:
+                from docling.datamodel.base_models import InputFormat
+                from docling.document_converter import DocumentConverter
+
+                formats = sorted(set(_DECLARATIVE_FORMATS.values()))
+                logger.info(f"Initializing Docling converter for declarative formats: {', '.join(formats)}")
+                _declarative_converter = DocumentConverter(
+                    allowed_formats=[InputFormat[name] for name in formats]
                 )
-                logger.info("Docling document converter initialized successfully")
-    else:
-        logger.debug("Returning existing Docling converter instance")
-    return _converter
+    return _declarative_converter
+
+
+def convert_document_file(file_path: str) -> "ConversionResult":
+    """
+    Convert a non-PDF document with the pipeline of its format.
+
+    Declarative formats (Office, HTML, Markdown, CSV, ...) are converted by
+    a cached converter restricted to these formats, which does not build
+    the PDF pipeline. Other formats go through the default DocumentConverter.
+
+    Raises:
+        ConversionError: If the document cannot be converted
+    """
+    extension = Path(file_path).suffix.lower().lstrip(".")
+    if extension in _DECLARATIVE_FORMATS:
+        return _get_declarative_converter().convert(file_path)
+    return get_converter().convert(file_path)
+
+
+def get_tokenizer():
+    """Get the shared HybridChunker tokenizer (see utils.tokenizer); loaded on first use."""
+    from utils.tokenizer import get_tokenizer as get_shared_tokenizer
+
+    return get_shared_tokenizer()
 
 
 # Export functions and tokenizer utility
-__all__ = ['get_converter', 'get_tokenizer']
+__all__ = ['get_converter', 'get_converter_for_options', 'convert_document_file', 'get_tokenizer']
@@ -0,0 +1,407 @@
+"""
+Bulk Ingestion from a Manifest
+
+Processes many uploads in one run instead of one job per file: a manifest
+lists DocumentUploadEvents (one JSON object per line, as built by the API),
+and the files are processed across a pool of worker processes. Every worker
+keeps warm converters and its own database connection pool across files,
+so Docling and the database connections are set up once per worker rather
+than once per file.
+
+Files are processed longest job first (by file size), so a large file does
+not start last and hold up the end of the run. Failures are isolated per
+file: a failed file is marked failed like a single job. A worker that
+crashes (e.g. killed for running out of memory) breaks the pool; the pool is
+replaced and the files that were in flight are retried one at a time, so
+only the file that crashes on its own is marked failed. At the end, a summary
+with the throughput and the result of every file is logged as one JSON line.
+
+Usage:
+    python -m job_runner --manifest files.jsonl [--summary summary.json]
+
+Environment Variables:
+    BULK_WORKERS: Worker processes (default: CPU count / OMP_NUM_THREADS)
+    BULK_DB_POOL_SIZE: Database connections per worker (default: 2)
+    BULK_MAX_ATTEMPTS: Runs of a file on its own that may crash its worker (default: 2)
+    BULK_MAX_TASKS_PER_WORKER: Files after which a worker is replaced (default: 0, never)
+
+Events without pipelineOptions use the pipeline options of the environment
+(DO_OCR, ... environment variables). PDF_CONVERSION_WORKERS is set to 1 in
+the workers, as the files already use all cores.
+
+SIGTERM and SIGINT drain the run: files in progress are completed and no
+new file is started.
+"""
+
+import os
+import json
+import time
+import signal
+import threading
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from models.requests import DocumentUploadEvent, PipelineOptions
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+_summary_logger = setup_logger("bulk_summary", level=20)  # logging.INFO
+
+_PDF_CONTENT_TYPE = "application/pdf"
+
+
+@dataclass
+class FileResult:
+    """Result of one manifest entry."""
+    line: int
+    task_id: Optional[str]
+    name: Optional[str]
+    size: int
+    status: str = "pending"
+    chunks: int = 0
+    seconds: float = 0.0
+    attempts: int = 0
+    error: Optional[str] = None
+
+
+@dataclass
+class ManifestEntry:
+    """A manifest line with its event, or the reason it could not be read."""
+    line: int
+    event: Optional[DocumentUploadEvent] = None
+    error: Optional[str] = None
+    result: FileResult = field(init=False)
+    # Runs of the file on its own that crashed the worker
+    crashes: int = 0
+
+    def __post_init__(self):
+        self.result = FileResult(
+            line=self.line,
+            task_id=self.event.taskId if self.event else None,
+            name=self.event.name if self.event else None,
+            size=get_event_size(self.event) if self.event else 0,
+        )
+
+
+def get_bulk_workers(file_count: int) -> int:
+    """Get the worker processes of a run: BULK_WORKERS or one per OMP_NUM_THREADS cores."""
+    configured = int(os.getenv("BULK_WORKERS", "0"))
+    if configured <= 0:
+        threads_per_worker = max(1, int(os.getenv("OMP_NUM_THREADS", "1")))
+        configured = (os.cpu_count() or 1) // threads_per_worker
+    return max(1, min(configured, file_count))
+
+
+def get_event_size(event: DocumentUploadEvent) -> int:
+    """Get the file size of an event in bytes, or 0 if it is not a number."""
+    try:
+        return int(event.size)
+    except ValueError:
+        return 0
+
+
+def is_pdf_event(event: DocumentUploadEvent) -> bool:
+    """Check whether an event is processed as a PDF job."""
+    return event.contentType == _PDF_CONTENT_TYPE or event.name.lower().endswith(".pdf")
+
+
+def read_manifest(path: str, pipeline_options: Optional[PipelineOptions] = None) -> List[ManifestEntry]:
+    """
+    Read a manifest of DocumentUploadEvents, one JSON object per line.
+
+    Blank lines are skipped; lines that are not valid events are returned
+    with their error, so they are reported without stopping the run.
+
+    Args:
+        path: Path to the manifest
+        pipeline_options: Pipeline options of events without their own
+
+    Returns:
+        Manifest entries in file order
+    """
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                event = DocumentUploadEvent.model_validate_json(line)
+            except ValueError as e:
+                entries.append(ManifestEntry(line=line_number, error=f"Invalid manifest line: {e}"))
+                continue
+            if event.pipelineOptions is None and pipeline_options is not None:
+                event.pipelineOptions = pipeline_options
+            entries.append(ManifestEntry(line=line_number, event=event))
+    return entries
+
+
+def _init_bulk_worker(pdf_pipeline_options: List[Optional[PipelineOptions]], db_pool_size: int) -> None:
+    """Pool initializer: open the database pool and warm the PDF converters once per worker."""
+    from db.postgres import open_connection_pool
+    from logger import configure_library_logging
+
+    # The parent drains the run; workers complete their current file
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    configure_library_logging()
+    os.environ["PDF_CONVERSION_WORKERS"] = "1"
+
+    open_connection_pool(db_pool_size)
+
+    if not pdf_pipeline_options:
+        return
+
+    from docling.datamodel.base_models import InputFormat
+    from processors.process_pdf import _create_converter_with_options
+
+    for pipeline_options in pdf_pipeline_options:
+        try:
+            _create_converter_with_options(pipeline_options).initialize_pipeline(InputFormat.PDF)
+        except Exception as e:
+            # The first file with these options loads the models instead
+            logger.warning(f"Failed to warm up converter for {pipeline_options}: {str(e)}")
+
+
+def _process_file(event: DocumentUploadEvent) -> dict:
+    """Process one file in a worker; failures are returned, not raised."""
+    from job_runner import load_processor
+
+    job_type = "process-pdf" if is_pdf_event(event) else "process-document"
+    started = time.perf_counter()
+    try:
+        result = load_processor(job_type)(event)
+        if not result.success:
+            # Another job or worker processes the task
+            return {"status": "skipped", "error": result.message, "seconds": time.perf_counter() - started}
+        return {
+            "status": "finished",
+            "chunks": result.chunks_processed,
+            "seconds": time.perf_counter() - started,
+        }
+    except Exception as e:
+        # The processor already marked the task as failed
+        return {"status": "failed", "error": str(e), "seconds": time.perf_counter() - started}
+
+
+def _mark_failed(event: DocumentUploadEvent, error: str) -> None:
+    """Mark the task of a file that no worker could complete as failed."""
+    from db.postgres import update_status_to_failed
+
+    try:
+        update_status_to_failed(event.taskId, event.bucketId, error)
+    except Exception as e:
+        logger.error(f"Failed to mark task {event.taskId} as failed: {str(e)}")
+
+
+class BulkRunner:
+    """Processes the entries of a manifest in a process pool, longest job first."""
+
+    def __init__(
+        self,
+        entries: List[ManifestEntry],
+        process_file: Callable[[DocumentUploadEvent], dict] = _process_file,
+        mark_failed: Callable[[DocumentUploadEvent, str], None] = _mark_failed,
+    ):
+        self.entries = entries
+        self.process_file = process_file
+        self.mark_failed = mark_failed
+        self.workers = get_bulk_workers(len(entries))
+        self.db_pool_size = int(os.getenv("BULK_DB_POOL_SIZE", "2"))
+        self.max_attempts = max(1, int(os.getenv("BULK_MAX_ATTEMPTS", "2")))
+        self.max_tasks_per_worker = int(os.getenv("BULK_MAX_TASKS_PER_WORKER", "0"))
+
+        self._draining = threading.Event()
+        self.wall_seconds = 0.0
+
+    def drain(self, signum: Optional[int] = None, frame=None) -> None:
+        """Stop starting new files; files in progress are completed."""
+        if not self._draining.is_set():
+            logger.warning(f"Draining bulk run (signal={signum}), finishing files in progress")
+        self._draining.set()
+
+    def install_signal_handlers(self) -> None:
+        """Drain the run on SIGTERM and SIGINT."""
+        signal.signal(signal.SIGTERM, self.drain)
+        signal.signal(signal.SIGINT, self.drain)
+
+    def _create_executor(self, queue: List[ManifestEntry]) -> ProcessPoolExecutor:
+        """Create the worker pool, warming the converters of the PDF pipeline options in the queue."""
+        pdf_pipeline_options: List[Optional[PipelineOptions]] = []
+        for entry in queue:
+            if is_pdf_event(entry.event) and entry.event.pipelineOptions not in pdf_pipeline_options:
+                pdf_pipeline_options.append(entry.event.pipelineOptions)
+
+        # Spawn instead of fork: every worker initializes its own models and connections
+        kwargs = {}
+        if self.max_tasks_per_worker > 0:
+            kwargs["max_tasks_per_child"] = self.max_tasks_per_worker
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_bulk_worker,
+            initargs=(pdf_pipeline_options, self.db_pool_size),
+            **kwargs,
+        )
+
+    def _complete(self, entry: ManifestEntry, outcome: dict) -> None:
+        result = entry.result
+        result.status = outcome["status"]
+        result.chunks = outcome.get("chunks", 0)
+        result.seconds = outcome.get("seconds", 0.0)
+        result.error = outcome.get("error")
+
+        if result.status == "finished":
+            logger.info(f"Task {result.task_id} completed: {result.chunks} chunks in {result.seconds:.1f}s")
+        elif result.status == "skipped":
+            logger.warning(f"Task {result.task_id} skipped: {result.error}")
+        else:
+            logger.error(f"Task {result.task_id} failed: {result.error}")
+
+    def run(self) -> List[FileResult]:
+        """Process all entries until done or drained; returns the results in manifest order."""
+        started = time.perf_counter()
+
+        for entry in self.entries:
+            if entry.error:
+                entry.result.status = "failed"
+                entry.result.error = entry.error
+                logger.error(f"Manifest line {entry.line}: {entry.error}")
+
+        # Longest job first: files are popped from the end, so the largest
+        # start first and small ones fill the gaps at the end of the run
+        queue = sorted(
+            (entry for entry in self.entries if entry.event is not None),
+            key=lambda entry: entry.result.size,
+        )
+
+        logger.info(f"Processing {len(queue)} files with {self.workers} worker processes")
+        executor = self._create_executor(queue) if queue else None
+        in_flight: Dict[Future, ManifestEntry] = {}
+        # Files in flight when a worker crashed, retried one at a time
+        suspects: List[ManifestEntry] = []
+
+        try:
+            while queue or suspects or in_flight:
+                if not self._draining.is_set():
+                    if suspects:
+                        if not in_flight:
+                            entry = suspects.pop()
+                            entry.result.attempts += 1
+                            in_flight[executor.submit(self.process_file, entry.event)] = entry
+                    else:
+                        # At most two files per worker are submitted, so
+                        # draining stops the run after the files in progress
+                        while queue and len(in_flight) < self.workers * 2:
+                            entry = queue.pop()
+                            entry.result.attempts += 1
+                            in_flight[executor.submit(self.process_file, entry.event)] = entry
+
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                crashed = []
+                for future in done:
+                    entry = in_flight.pop(future)
+                    try:
+                        self._complete(entry, future.result())
+                    except BrokenProcessPool:
+                        crashed.append(entry)
+                    except Exception as e:
+                        self._complete(entry, {"status": "failed", "error": str(e)})
+
+                if not crashed:
+                    continue
+
+                # A crashed worker breaks the pool and fails every file in
+                # flight; the culprit is only known if it ran on its own
+                crashed.extend(in_flight.values())
+                in_flight.clear()
+                executor.shutdown(wait=False, cancel_futures=True)
+
+                if len(crashed) > 1:
+                    logger.warning(f"Worker crashed, retrying {len(crashed)} files one at a time")
+                    suspects.extend(crashed)
+                else:
+                    entry = crashed[0]
+                    entry.crashes += 1
+                    if entry.crashes < self.max_attempts:
+                        logger.warning(f"Worker crashed, retrying task {entry.result.task_id}")
+                        suspects.append(entry)
+                    else:
+                        error = f"Worker process crashed {entry.crashes} times"
+                        self._complete(entry, {"status": "failed", "error": error})
+                        self.mark_failed(entry.event, error)
+                executor = self._create_executor(suspects + queue)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+            self.wall_seconds = time.perf_counter() - started
+
+        for entry in suspects + queue:
+            entry.result.status = "skipped"
+
+        return [entry.result for entry in self.entries]
+
+    def summary(self) -> dict:
+        """Throughput and per-file results of the run."""
+        results = [entry.result for entry in self.entries]
+        finished = [result for result in results if result.status == "finished"]
+        wall_seconds = self.wall_seconds or 1e-9
+        processed_bytes = sum(result.size for result in finished)
+        chunks = sum(result.chunks for result in finished)
+
+        return {
+            "files": len(results),
+            "finished": len(finished),
+            "failed": sum(1 for result in results if result.status == "failed"),
+            "skipped": sum(1 for result in results if result.status == "skipped"),
+            "workers": self.workers,
+            "wall_s": round(self.wall_seconds, 3),
+            "bytes": processed_bytes,
+            "chunks": chunks,
+            "files_per_min": round(len(finished) * 60 / wall_seconds, 2),
+            "mb_per_s": round(processed_bytes / (1024 * 1024) / wall_seconds, 3),
+            "chunks_per_s": round(chunks / wall_seconds, 2),
+            "results": [asdict(result) for result in results],
+        }
+
+
+def run_bulk(
+    manifest_path: str,
+    pipeline_options: Optional[PipelineOptions] = None,
+    summary_path: Optional[str] = None,
+) -> int:
+    """
+    Process the files of a manifest and log the run summary.
+
+    Args:
+        manifest_path: Path to the JSONL manifest of DocumentUploadEvents
+        pipeline_options: Pipeline options of events without their own
+        summary_path: File the summary is also written to, if given
+
+    Returns:
+        Number of files that failed or were skipped
+    """
+    from db.postgres import _get_connection_string
+
+    # Fail before starting workers whose initializer would fail for every file
+    _get_connection_string()
+
+    runner = BulkRunner(read_manifest(manifest_path, pipeline_options))
+    runner.install_signal_handlers()
+    runner.run()
+
+    summary = runner.summary()
+    _summary_logger.info(json.dumps(summary), extra={"fields": summary})
+    if summary_path:
+        with open(summary_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+    logger.info(
+        f"Bulk run finished: {summary['finished']}/{summary['files']} files in {summary['wall_s']:.1f}s "
+        f"({summary['files_per_min']} files/min, {summary['mb_per_s']} MB/s)"
+    )
+    return summary["failed"] + summary["skipped"]
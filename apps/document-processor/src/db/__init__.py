@@ -4,18 +4,30 @@ Database utilities for PostgreSQL operations
 
 from .postgres import (
     get_connection,
-    EmbeddedChunk,
+    ChunkBatch,
+    IngestionSession,
     upload_to_postgres_db,
     update_status_to_processing,
     update_status_to_finished,
     update_status_to_failed,
+    ClaimedTask,
+    TaskAlreadyClaimedError,
+    claim_next_task,
+    fail_abandoned_tasks,
+    insert_task_metrics,
 )
 
 __all__ = [
     "get_connection",
-    "EmbeddedChunk",
+    "ChunkBatch",
+    "IngestionSession",
     "upload_to_postgres_db",
     "update_status_to_processing",
     "update_status_to_finished",
     "update_status_to_failed",
+    "ClaimedTask",
+    "TaskAlreadyClaimedError",
+    "claim_next_task",
+    "fail_abandoned_tasks",
+    "insert_task_metrics",
 ]
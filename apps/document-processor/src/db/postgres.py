@@ -3,20 +3,31 @@ PostgreSQL database operations for storing processed documents and chunks
 
 Optimized for job-based execution - uses direct synchronous connections
 since each job runs as a single process and terminates after completion.
+Processes that run many jobs (bulk mode, see bulk.py) open a connection
+pool with open_connection_pool(); connections are then taken from it.
 """
 
 import os
 import json
+import struct
+import threading
+from uuid import UUID, uuid5
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
 from contextlib import contextmanager
+import numpy as np
 import psycopg
+from psycopg.adapt import Dumper
+from psycopg.pq import Format
+from psycopg.types import TypeInfo
 
 from logger import setup_logger
 
 # Configure logger
 logger = setup_logger(__name__)
 
+T = TypeVar("T")
+
 
 def _log_sql_statement(query: str, params: tuple) -> None:
     """
@@ -86,6 +97,46 @@ def _get_connection_string() -> str:
     return f"postgresql://postgres:{database_password}@{database_host}/postgres?connect_timeout=10"
 
 
+# Connection pool of a process running many jobs; None for single jobs
+_connection_pool = None
+
+
+def _configure_pooled_connection(conn: psycopg.Connection) -> None:
+    """Prepare a new pooled connection like IngestionSession prepares its own."""
+    conn.prepare_threshold = 0
+    if _get_chunk_insert_method() == "copy":
+        register_vector_type(conn)
+    # Pooled connections must be returned idle
+    conn.commit()
+
+
+def open_connection_pool(max_size: int = 2) -> None:
+    """
+    Open the connection pool of this process.
+
+    For processes that run many jobs one after another; the connections
+    stay open across jobs. Single jobs connect directly instead.
+
+    Args:
+        max_size: Maximum connections; a job uses one for its
+            IngestionSession and one for status updates
+    """
+    global _connection_pool
+    if _connection_pool is not None:
+        return
+
+    from psycopg_pool import ConnectionPool
+
+    _connection_pool = ConnectionPool(
+        _get_connection_string(),
+        min_size=1,
+        max_size=max(1, max_size),
+        kwargs={"options": "-c statement_timeout=60000"},  # 60 second query timeout
+        configure=_configure_pooled_connection,
+        open=True,
+    )
+
+
 @contextmanager
 def get_connection():
     """
@@ -94,7 +145,14 @@ def get_connection():
     For job-based execution, we use direct connections instead of a pool
     since each job runs as a single process and terminates after completion.
     This is more efficient than maintaining a pool for short-lived jobs.
+    If open_connection_pool() was called, the connection is borrowed from
+    the pool instead.
     """
+    if _connection_pool is not None:
+        with _connection_pool.connection() as conn:
+            yield conn
+        return
+
     conn = psycopg.connect(
         _get_connection_string(),
         options="-c statement_timeout=60000"  # 60 second query timeout
@@ -105,22 +163,363 @@ def get_connection():
         conn.close()
 
 
-class EmbeddedChunk:
-    """Represents a document chunk with embedding"""
+class ChunkBatch:
+    """
+    Columnar batch of embedded chunks, written to the chunks table as a whole.
+
+    Columns are stored as contiguous arrays instead of one object per chunk:
+    - ids: (n, 16) uint8 array of UUIDs, derived from the task id and chunk
+      index (see chunk_id_array) or random (version 4)
+    - chunk_indexes: (n,) int32 array of chunk positions in the document
+    - page_indexes: (n,) int32 array
+    - bboxes: (n, 4) float64 array, NaN rows for chunks without a bbox
+    - embeddings: (n, dimensions) float32 matrix
+    - contents: list of n strings
+    """
+
+    __slots__ = ("ids", "chunk_indexes", "page_indexes", "bboxes", "embeddings", "contents")
 
     def __init__(
         self,
-        page_id: str,
-        page_index: int,
-        embedding: List[float],
-        content: str,
-        bbox: Optional[tuple[float, float, float, float]] = None,
+        contents: List[str],
+        embeddings: np.ndarray,
+        page_indexes: Optional[np.ndarray] = None,
+        bboxes: Optional[np.ndarray] = None,
+        ids: Optional[np.ndarray] = None,
+        chunk_indexes: Optional[np.ndarray] = None,
     ):
-        self.page_id = page_id
-        self.page_index = page_index
-        self.embedding = embedding
-        self.content = content
-        self.bbox = bbox
+        count = len(contents)
+        self.contents = contents
+        self.embeddings = np.ascontiguousarray(embeddings, dtype=np.float32).reshape(count, -1)
+        self.page_indexes = (
+            np.zeros(count, dtype=np.int32) if page_indexes is None
+            else np.asarray(page_indexes, dtype=np.int32)
+        )
+        self.bboxes = (
+            np.full((count, 4), np.nan) if bboxes is None
+            else np.asarray(bboxes, dtype=np.float64).reshape(count, 4)
+        )
+        self.chunk_indexes = (
+            np.arange(count, dtype=np.int32) if chunk_indexes is None
+            else np.asarray(chunk_indexes, dtype=np.int32)
+        )
+        self.ids = _random_uuid_array(count) if ids is None else ids
+
+    @classmethod
+    def from_chunks(
+        cls,
+        chunks: Sequence,
+        embeddings: np.ndarray,
+        task_id: Optional[str] = None,
+    ) -> "ChunkBatch":
+        """
+        Build a batch from chunk models (PdfChunkData or DocumentChunkData).
+
+        Args:
+            chunks: Chunks with contextualized_content, chunk_index and
+                optionally page_index and bbox
+            embeddings: float32 matrix with one embedding per chunk
+            task_id: Task the chunks belong to; if given, chunk ids are
+                derived from it and the chunk indexes, so a re-run of the
+                task produces the same ids. Random ids are used otherwise.
+        """
+        count = len(chunks)
+        chunk_indexes = np.fromiter((chunk.chunk_index for chunk in chunks), dtype=np.int32, count=count)
+        page_indexes = np.fromiter(
+            (getattr(chunk, "page_index", 0) for chunk in chunks), dtype=np.int32, count=count
+        )
+        bboxes = np.full((count, 4), np.nan)
+        for row, chunk in enumerate(chunks):
+            bbox = getattr(chunk, "bbox", None)
+            if bbox:
+                bboxes[row] = bbox
+
+        ids = chunk_id_array(task_id, chunk_indexes) if task_id else None
+        return cls(
+            [chunk.contextualized_content for chunk in chunks], embeddings,
+            page_indexes, bboxes, ids, chunk_indexes
+        )
+
+    def __len__(self) -> int:
+        return len(self.contents)
+
+    def page_numbers(self, page_number_offset: int) -> np.ndarray:
+        """Page numbers shown to users: page_index + 1 - offset, at least 0."""
+        return np.maximum(self.page_indexes + 1 - page_number_offset, 0)
+
+    def id_bytes(self) -> List[bytes]:
+        """The ids as 16-byte values."""
+        raw = self.ids.tobytes()
+        return [raw[offset:offset + 16] for offset in range(0, len(raw), 16)]
+
+    def id_strings(self) -> List[str]:
+        """The ids as canonical UUID strings."""
+        return [str(UUID(bytes=value)) for value in self.id_bytes()]
+
+    def bbox_lists(self) -> List[Optional[List[float]]]:
+        """The bboxes as [x0, y0, x1, y1] lists, None for chunks without one."""
+        missing = np.isnan(self.bboxes[:, 0]).tolist()
+        return [None if absent else bbox for absent, bbox in zip(missing, self.bboxes.tolist())]
+
+    def encoded_embeddings(self) -> List[bytes]:
+        """The embeddings in the pgvector binary wire format (see encode_vector_binary)."""
+        count, dimensions = self.embeddings.shape
+        row_size = 4 + 4 * dimensions
+        encoded = np.empty((count, row_size), dtype=np.uint8)
+        encoded[:, :4] = np.frombuffer(struct.pack(">HH", dimensions, 0), dtype=np.uint8)
+        encoded[:, 4:] = self.embeddings.astype(">f4").view(np.uint8).reshape(count, -1)
+        raw = encoded.tobytes()
+        return [raw[offset:offset + row_size] for offset in range(0, len(raw), row_size)]
+
+
+def _random_uuid_array(count: int) -> np.ndarray:
+    """(count, 16) array of random version 4 UUIDs."""
+    ids = np.frombuffer(os.urandom(16 * count), dtype=np.uint8).reshape(count, 16).copy()
+    ids[:, 6] = (ids[:, 6] & 0x0F) | 0x40  # version 4
+    ids[:, 8] = (ids[:, 8] & 0x3F) | 0x80  # RFC 4122 variant
+    return ids
+
+
+# Namespace of the name-based chunk ids, must never change
+_CHUNK_ID_NAMESPACE = UUID("3f6c2a1e-8d4b-5e7a-9c0f-2b1d4e6a8c3f")
+
+
+def chunk_id_array(task_id: str, chunk_indexes: np.ndarray) -> np.ndarray:
+    """(n, 16) array of name-based (version 5) UUIDs of "<task_id>/<chunk_index>"."""
+    raw = b"".join(
+        uuid5(_CHUNK_ID_NAMESPACE, f"{task_id}/{chunk_index}").bytes
+        for chunk_index in chunk_indexes.tolist()
+    )
+    return np.frombuffer(raw, dtype=np.uint8).reshape(len(chunk_indexes), 16).copy()
+
+
+_CHUNK_INSERT_QUERY = """
+    INSERT INTO chunks
+    (id, file_id, file_name, course_id, course_name, embedding, content,
+        page_index, page_number, bbox)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON CONFLICT (id, course_id) DO NOTHING
+    """
+
+_FILE_INSERT_QUERY = """
+    INSERT INTO files (id, course_id, name, size, page_count)
+    VALUES (%s, %s, %s, %s, %s)
+    """
+
+# Copies the chunks of a processed file, keeping contents and embeddings
+_CHUNK_CLONE_QUERY = """
+    INSERT INTO chunks (id, file_id, file_name, course_id, course_name, embedding, content, page_index, page_number, bbox)
+    SELECT gen_random_uuid(), %s, %s, %s, %s, embedding, content, page_index,
+        GREATEST(0, page_index + 1 - %s), bbox
+    FROM chunks
+    WHERE file_id = %s
+    """
+
+
+def _build_chunk_rows(
+    task_id: str,
+    course_id: str,
+    course_name: str,
+    filename: str,
+    batch: ChunkBatch,
+    page_number_offset: int,
+) -> List[tuple]:
+    """Build the parameter tuples for inserting chunks into the chunks table."""
+    count = len(batch)
+    bbox_json = [json.dumps(bbox) if bbox else None for bbox in batch.bbox_lists()]
+
+    return list(zip(
+        batch.id_strings(),
+        [task_id] * count,
+        [filename] * count,
+        [course_id] * count,
+        [course_name] * count,
+        batch.embeddings.tolist(),
+        batch.contents,
+        batch.page_indexes.tolist(),
+        batch.page_numbers(page_number_offset).tolist(),
+        bbox_json,
+    ))
+
+
+_CHUNK_COPY_QUERY = """
+    COPY chunks
+    (id, file_id, file_name, course_id, course_name, embedding, content,
+        page_index, page_number, bbox)
+    FROM STDIN (FORMAT BINARY)
+    """
+
+# Postgres types of the columns listed in _CHUNK_COPY_QUERY
+_CHUNK_COPY_TYPES = [
+    "uuid", "uuid", "varchar", "uuid", "varchar", "vector", "text",
+    "int4", "int2", "json",
+]
+
+
+def encode_vector_binary(embedding: Sequence[float]) -> bytes:
+    """
+    Encode an embedding in the pgvector binary wire format.
+
+    The format is a big-endian int16 dimension count, an unused int16 and
+    the values as big-endian float32.
+    """
+    values = np.asarray(embedding, dtype=">f4")
+    return struct.pack(">HH", values.shape[0], 0) + values.tobytes()
+
+
+class _VectorBinaryDumper(Dumper):
+    """Dumps embeddings (lists, float32 arrays or pre-encoded bytes) as binary pgvector values."""
+
+    format = Format.BINARY
+
+    def dump(self, obj) -> bytes:
+        if isinstance(obj, bytes):
+            return obj
+        return encode_vector_binary(obj)
+
+
+class _UuidBinaryDumper(Dumper):
+    """Dumps UUIDs given as UUID objects or 16-byte values in binary format."""
+
+    format = Format.BINARY
+
+    def dump(self, obj) -> bytes:
+        if isinstance(obj, bytes):
+            return obj
+        return obj.bytes
+
+
+def register_vector_type(conn: psycopg.Connection) -> None:
+    """
+    Register the pgvector type on a connection for binary COPY.
+
+    Also lets uuid columns of a COPY take 16-byte values (see ChunkBatch).
+
+    Raises:
+        ValueError: If the vector extension is not installed
+    """
+    info = TypeInfo.fetch(conn, "vector")
+    if info is None:
+        raise ValueError("The pgvector 'vector' type is not available in the database")
+
+    info.register(conn)
+    dumper = type("VectorBinaryDumper", (_VectorBinaryDumper,), {"oid": info.oid})
+    # Registered by oid only: used for columns declared as vector in set_types()
+    conn.adapters.register_dumper(None, dumper)
+
+    uuid_oid = conn.adapters.types["uuid"].oid
+    conn.adapters.register_dumper(None, type("UuidBinaryDumper", (_UuidBinaryDumper,), {"oid": uuid_oid}))
+
+
+def _build_chunk_copy_rows(
+    task_id: str,
+    course_id: str,
+    course_name: str,
+    filename: str,
+    batch: ChunkBatch,
+    page_number_offset: int,
+) -> List[tuple]:
+    """
+    Build rows for copying chunks into the chunks table in binary format.
+
+    Ids and embeddings are encoded for the whole batch at once and passed as
+    bytes (see register_vector_type).
+    """
+    count = len(batch)
+
+    return list(zip(
+        batch.id_bytes(),
+        [UUID(task_id).bytes] * count,
+        [filename] * count,
+        [UUID(course_id).bytes] * count,
+        [course_name] * count,
+        batch.encoded_embeddings(),
+        batch.contents,
+        batch.page_indexes.tolist(),
+        batch.page_numbers(page_number_offset).tolist(),
+        batch.bbox_lists(),
+    ))
+
+
+def insert_chunk_rows(cursor: psycopg.Cursor, rows: List[tuple]) -> None:
+    """Insert rows built by _build_chunk_rows using executemany."""
+    cursor.executemany(_CHUNK_INSERT_QUERY, rows)
+
+
+def copy_chunk_rows(cursor: psycopg.Cursor, rows: List[tuple]) -> None:
+    """
+    Stream rows built by _build_chunk_copy_rows with a binary COPY.
+
+    The connection must have the vector type registered (see register_vector_type).
+    """
+    with cursor.copy(_CHUNK_COPY_QUERY) as copy:
+        copy.set_types(_CHUNK_COPY_TYPES)
+        for row in rows:
+            copy.write_row(row)
+
+
+def _get_chunk_insert_method() -> str:
+    """
+    Get the method used to insert chunks: 'copy' (default) or 'executemany'.
+
+    SQL statement logging (SQL_LOG_FILE) only supports INSERT statements,
+    so executemany is used whenever it is enabled.
+    """
+    if os.getenv("SQL_LOG_FILE"):
+        return "executemany"
+
+    method = os.getenv("CHUNK_INSERT_METHOD", "copy").lower()
+    if method not in ("copy", "executemany"):
+        raise ValueError(f"Invalid CHUNK_INSERT_METHOD '{method}'. Must be 'copy' or 'executemany'")
+    return method
+
+
+def is_resumable_ingestion_enabled() -> bool:
+    """Check whether ingestion commits and checkpoints every batch (RESUMABLE_INGESTION)."""
+    return os.getenv("RESUMABLE_INGESTION", "").lower() == "true"
+
+
+class TaskAlreadyClaimedError(Exception):
+    """The task is processed by another job or worker, or is no longer pending."""
+
+
+# Advisory lock key of a task; the lock is held by the session of the job
+# processing the task and released when its connection closes, so a task
+# left 'processing' by a killed job can be claimed again
+_TASK_LOCK_KEY = "hashtextextended({}::text, 0)"
+
+# Marks a scheduled task, or one whose job died, as 'processing'. The lock is
+# only tried for tasks in these states (functions are evaluated after the
+# cheaper status comparison)
+_CLAIM_TASK_QUERY = f"""
+    UPDATE tasks SET status = 'processing'
+    WHERE id = %(task_id)s
+    AND status IN ('scheduled', 'processing')
+    AND pg_try_advisory_lock({_TASK_LOCK_KEY.format("%(task_id)s")})
+    RETURNING id
+    """
+
+_COURSE_QUERY = "SELECT name, NULL, NULL, NULL, NULL FROM courses WHERE id = %s LIMIT 1"
+
+# Looks up the course name and the checkpoint of an interrupted earlier run
+_COURSE_AND_CHECKPOINT_QUERY = """
+    SELECT c.name, cp.last_chunk_index, cp.chunk_count, cp.chunking_signature, cp.window_ends
+    FROM courses c
+    LEFT JOIN task_checkpoints cp ON cp.task_id = %s
+    WHERE c.id = %s
+    LIMIT 1
+    """
+
+_CHECKPOINT_UPSERT_QUERY = """
+    INSERT INTO task_checkpoints (task_id, last_chunk_index, chunk_count, chunking_signature, window_ends)
+    VALUES (%s, %s, %s, %s, %s)
+    ON CONFLICT (task_id) DO UPDATE
+    SET last_chunk_index = EXCLUDED.last_chunk_index,
+        chunk_count = EXCLUDED.chunk_count,
+        chunking_signature = EXCLUDED.chunking_signature,
+        window_ends = EXCLUDED.window_ends,
+        updated_at = now()
+    """
 
 
 def upload_to_postgres_db(
@@ -128,7 +527,7 @@ def upload_to_postgres_db(
     course_id: str,
     filename: str,
     file_size: int,
-    processed_chunks: List[EmbeddedChunk],
+    batch: ChunkBatch,
     page_number_offset: int,
     page_count: Optional[int] = None,
     is_first_batch: bool = True,
@@ -138,13 +537,15 @@ def upload_to_postgres_db(
 
     Creates file record (on first batch) and associated chunk records.
     Supports incremental batch uploads for memory efficiency.
+    Opens a new connection per call; use IngestionSession to process a
+    whole job over a single connection.
 
     Args:
         task_id: Unique task identifier (used as file ID)
         course_id: Course UUID the file belongs to
         filename: Name of the file
         file_size: Size of the file in bytes
-        processed_chunks: List of embedded chunks to store
+        batch: Embedded chunks to store
         page_number_offset: Offset for page numbering
         page_count: Optional total number of pages in the document (only available for PDFs)
         is_first_batch: Whether this is the first batch (creates file record)
@@ -166,48 +567,22 @@ def upload_to_postgres_db(
 
                 # Insert file record only on first batch
                 if is_first_batch:
-                    file_query = """
-                        INSERT INTO files (id, course_id, name, size, page_count)
-                        VALUES (%s, %s, %s, %s, %s)
-                        """
                     file_params = (task_id, course_id, filename, file_size, page_count)
-                    _log_sql_statement(file_query, file_params)
-                    cursor.execute(file_query, file_params)
+                    _log_sql_statement(_FILE_INSERT_QUERY, file_params)
+                    cursor.execute(_FILE_INSERT_QUERY, file_params)
 
                 # Prepare chunks data for batch insert
-                chunks_to_insert = []
-                for chunk_data in processed_chunks:
-                    # Convert bbox tuple to JSON-compatible list
-                    bbox_json = json.dumps(list(chunk_data.bbox)) if chunk_data.bbox else None
-
-                    row = (
-                        chunk_data.page_id,
-                        task_id,
-                        filename,
-                        course_id,
-                        course_name,
-                        chunk_data.embedding,
-                        chunk_data.content,
-                        chunk_data.page_index,
-                        max(0, chunk_data.page_index +
-                            1 - page_number_offset),
-                        bbox_json
-                    )
-                    chunks_to_insert.append(row)
+                chunks_to_insert = _build_chunk_rows(
+                    task_id, course_id, course_name, filename,
+                    batch, page_number_offset
+                )
 
-                # Batch insert chunks using executemany
-                chunk_query = """
-                    INSERT INTO chunks
-                    (id, file_id, file_name, course_id, course_name, embedding, content,
-                        page_index, page_number, bbox)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    """
-                
                 # Log each chunk insert statement
                 for chunk_row in chunks_to_insert:
-                    _log_sql_statement(chunk_query, chunk_row)
-                
-                cursor.executemany(chunk_query, chunks_to_insert)
+                    _log_sql_statement(_CHUNK_INSERT_QUERY, chunk_row)
+
+                # Batch insert chunks using executemany
+                cursor.executemany(_CHUNK_INSERT_QUERY, chunks_to_insert)
                 conn.commit()
 
             except Exception as e:
@@ -225,12 +600,430 @@ def upload_to_postgres_db(
                     )
                     conn.commit()
                 except Exception as cleanup_error:
-                    print(
-                        f"Failed to cleanup after error: {cleanup_error}")
+                    logger.error(f"Failed to cleanup after error: {cleanup_error}")
 
                 raise e
 
 
+class IngestionSession:
+    """
+    Database session for ingesting a single document.
+
+    Holds one connection for the lifetime of a job instead of opening a new
+    connection per batch:
+    - start() claims the task, marking it as 'processing', and looks up the
+      course name once in a single round trip. A task is claimed by one job
+      only: the claim holds an advisory lock on the task until the session
+      is closed, and fails with TaskAlreadyClaimedError if another job
+      holds it or the task is finished or failed.
+    - insert_chunks() creates the file record with the first batch and
+      streams chunks with a binary COPY (or, with CHUNK_INSERT_METHOD=executemany,
+      through a server-prepared INSERT statement).
+    - finish() marks the task as 'finished' and commits the file record,
+      all chunks and the status change as one transaction.
+    - fail() marks the task as 'failed' before the task lock is released.
+
+    If the job fails before finish(), the transaction is rolled back when the
+    session is closed, so no partial file or chunk rows remain.
+
+    With RESUMABLE_INGESTION=true, every batch is instead committed together
+    with a checkpoint of its last chunk index (task_checkpoints table), so a
+    job killed mid-way (OOM, timeout, preemption) loses at most one batch.
+    When the task is run again, start() picks up the checkpoint and
+    pending_chunks() skips the chunks that are already stored; chunk ids are
+    derived from the task id and chunk index (see ChunkBatch.from_chunks),
+    so re-inserted chunks keep their ids. Skipping by index is only correct
+    if the re-run chunks the file the same way: the checkpoint stores the
+    chunking signature of the processor (variant and chunking settings),
+    and an earlier run with another signature is discarded and the file
+    ingested from the start. Page windows whose size depends on the memory
+    at runtime are stored with each batch as well (window_ends of
+    insert_chunks()) and replayed by the re-run. If the job fails with an
+    exception, the committed rows and the checkpoint are deleted when the
+    session is closed. finish() removes the checkpoint.
+
+    Usage:
+        with IngestionSession(task_id, course_id, filename, file_size, offset) as session:
+            session.start()
+            session.insert_chunks(batch, page_count)
+            session.finish()
+    """
+
+    def __init__(
+        self,
+        task_id: str,
+        course_id: str,
+        filename: str,
+        file_size: int,
+        page_number_offset: int,
+        chunking_signature: str = "",
+    ):
+        self.task_id = task_id
+        self.course_id = course_id
+        self.filename = filename
+        self.file_size = file_size
+        self.page_number_offset = page_number_offset
+        # Identifies how the processor chunks the file, see start()
+        self.chunking_signature = chunking_signature
+
+        self.resumable = is_resumable_ingestion_enabled()
+        # Last chunk index and number of chunks stored by an earlier run
+        self.resume_after_chunk: Optional[int] = None
+        self.resumed_chunk_count = 0
+        # Last pages of the page windows converted by an earlier run, to be
+        # replayed (see processors.streaming_pdf)
+        self.window_ends: List[int] = []
+
+        self._conn: Optional[psycopg.Connection] = None
+        self._pool = None
+        self._insert_method = _get_chunk_insert_method()
+        self._course_name: Optional[str] = None
+        self._file_created = False
+        self._finished = False
+        self._claimed = False
+        self._stored_chunk_count = 0
+
+    def __enter__(self) -> "IngestionSession":
+        if _connection_pool is not None:
+            # Pooled connections are prepared once (see _configure_pooled_connection)
+            self._pool = _connection_pool
+            self._conn = self._pool.getconn()
+            return self
+
+        self._conn = psycopg.connect(
+            _get_connection_string(),
+            options="-c statement_timeout=60000"  # 60 second query timeout
+        )
+        # Prepare statements server-side on first use; the chunk insert is
+        # executed for every batch of the job
+        self._conn.prepare_threshold = 0
+        if self._insert_method == "copy":
+            register_vector_type(self._conn)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        try:
+            if self.resumable and exc_type is not None and issubclass(exc_type, Exception):
+                self.discard()
+        finally:
+            self.close()
+
+    @property
+    def connection(self) -> psycopg.Connection:
+        """The session connection; only valid inside the context manager."""
+        if self._conn is None:
+            raise RuntimeError("IngestionSession is not open")
+        return self._conn
+
+    def close(self) -> None:
+        """Roll back any uncommitted work and close the connection (or return it to the pool)."""
+        if self._conn is None:
+            return
+
+        try:
+            if not self._finished:
+                self._conn.rollback()
+            if self._pool is not None:
+                # Closing a connection releases its task lock; pooled ones stay open
+                self._conn.execute("SELECT pg_advisory_unlock_all()")
+                self._conn.commit()
+        finally:
+            if self._pool is not None:
+                self._pool.putconn(self._conn)
+            else:
+                self._conn.close()
+            self._conn = None
+
+    def start(self) -> None:
+        """
+        Claim the task, updating its status to 'processing', and cache the course name.
+
+        Raises:
+            TaskAlreadyClaimedError: If another job processes the task, or it is finished or failed
+            ValueError: If the course does not exist
+        """
+        conn = self.connection
+        # Both statements are sent in a single round trip; results are only
+        # fetched once both are queued, a fetch in between would sync the pipeline
+        with conn.pipeline() as pipeline, conn.cursor() as claim_cursor, conn.cursor() as course_cursor:
+            claim_cursor.execute(_CLAIM_TASK_QUERY, {"task_id": self.task_id})
+            if self.resumable:
+                course_cursor.execute(_COURSE_AND_CHECKPOINT_QUERY, (self.task_id, self.course_id))
+            else:
+                course_cursor.execute(_COURSE_QUERY, (self.course_id,))
+            pipeline.sync()
+            claim_result = claim_cursor.fetchone()
+            course_result = course_cursor.fetchone()
+
+        if not claim_result:
+            conn.rollback()
+            raise TaskAlreadyClaimedError(f"Task {self.task_id} is claimed by another job or no longer pending")
+        self._claimed = True
+
+        if not course_result:
+            conn.rollback()
+            raise ValueError(f"Course not found: {self.course_id}")
+
+        self._course_name, last_chunk_index, chunk_count, chunking_signature, window_ends = course_result
+
+        if last_chunk_index is not None and chunking_signature != self.chunking_signature:
+            # Chunk indexes of the earlier run do not match this run's chunks
+            logger.warning(
+                f"Discarding {chunk_count} chunks of an earlier run of task_id={self.task_id}: "
+                f"chunked with '{chunking_signature}', now '{self.chunking_signature}'"
+            )
+            self._delete_stored_rows()
+            last_chunk_index = None
+        conn.commit()
+
+        if last_chunk_index is not None:
+            # The file record was committed with the first batch of the earlier run
+            self.resume_after_chunk = last_chunk_index
+            self.window_ends = list(window_ends or [])
+            self.resumed_chunk_count = self._stored_chunk_count = chunk_count
+            self._file_created = True
+            logger.info(
+                f"Resuming task_id={self.task_id} after chunk {last_chunk_index} "
+                f"({chunk_count} chunks already stored)"
+            )
+
+    def pending_chunks(self, chunks: Iterable[T]) -> Iterator[T]:
+        """
+        Skip the chunks stored by an earlier run of the task.
+
+        Chunks are expected in increasing chunk_index order, as yielded by
+        the chunk generators of the processors. The returned generator does
+        not access the session, so it may run in another thread.
+        """
+        if self.resume_after_chunk is None:
+            return iter(chunks)
+        return _skip_stored_chunks(chunks, self.resume_after_chunk)
+
+    def insert_chunks(
+        self,
+        batch: ChunkBatch,
+        page_count: Optional[int] = None,
+        window_ends: Optional[List[int]] = None,
+    ) -> None:
+        """
+        Insert a batch of embedded chunks within the session transaction.
+
+        The file record is created together with the first batch. In
+        resumable mode the batch is committed together with its checkpoint.
+
+        Args:
+            batch: Embedded chunks to store
+            page_count: Optional total number of pages in the document (only available for PDFs)
+            window_ends: Last pages of the page windows converted up to this
+                batch, stored with the checkpoint (streamed PDFs only)
+        """
+        if self._course_name is None:
+            raise RuntimeError("IngestionSession.start() must be called before inserting chunks")
+
+        with self.connection.cursor() as cursor:
+            if not self._file_created:
+                file_params = (self.task_id, self.course_id, self.filename, self.file_size, page_count)
+                _log_sql_statement(_FILE_INSERT_QUERY, file_params)
+                cursor.execute(_FILE_INSERT_QUERY, file_params)
+                self._file_created = True
+
+            if self._insert_method == "copy":
+                copy_rows = _build_chunk_copy_rows(
+                    self.task_id, self.course_id, self._course_name, self.filename,
+                    batch, self.page_number_offset
+                )
+                copy_chunk_rows(cursor, copy_rows)
+            else:
+                chunks_to_insert = _build_chunk_rows(
+                    self.task_id, self.course_id, self._course_name, self.filename,
+                    batch, self.page_number_offset
+                )
+
+                for chunk_row in chunks_to_insert:
+                    _log_sql_statement(_CHUNK_INSERT_QUERY, chunk_row)
+
+                insert_chunk_rows(cursor, chunks_to_insert)
+
+            self._stored_chunk_count += len(batch)
+            if self.resumable and len(batch):
+                cursor.execute(
+                    _CHECKPOINT_UPSERT_QUERY,
+                    (
+                        self.task_id, int(batch.chunk_indexes.max()), self._stored_chunk_count,
+                        self.chunking_signature, list(window_ends or []) or None,
+                    )
+                )
+
+        if self.resumable:
+            self.connection.commit()
+
+    def find_duplicate_file(self, fingerprint: str) -> Optional[Tuple[str, Optional[int]]]:
+        """
+        Find an already processed file with the same fingerprint.
+
+        Fingerprints are only stored by finish(), so any match has been
+        processed completely.
+
+        Returns:
+            Tuple of (file_id, page_count) of the most recent match, or None
+        """
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT id, page_count FROM files WHERE fingerprint = %s AND id <> %s "
+                "ORDER BY created_at DESC LIMIT 1",
+                (fingerprint, self.task_id)
+            )
+            result = cursor.fetchone()
+
+        if not result:
+            return None
+        return str(result[0]), result[1]
+
+    def clone_file(self, source_file_id: str, page_count: Optional[int] = None) -> int:
+        """
+        Copy the chunks of an already processed file into this file.
+
+        Chunks are copied server-side with new ids and this session's course
+        and file name; page numbers are recomputed with this session's page
+        number offset. Nothing is re-embedded.
+
+        Args:
+            source_file_id: Id of the processed file with identical content
+            page_count: Page count of the source file
+
+        Returns:
+            Number of chunks copied
+        """
+        if self._course_name is None:
+            raise RuntimeError("IngestionSession.start() must be called before cloning a file")
+
+        with self.connection.cursor() as cursor:
+            file_params = (self.task_id, self.course_id, self.filename, self.file_size, page_count)
+            _log_sql_statement(_FILE_INSERT_QUERY, file_params)
+            cursor.execute(_FILE_INSERT_QUERY, file_params)
+            self._file_created = True
+
+            cursor.execute(
+                _CHUNK_CLONE_QUERY,
+                (
+                    self.task_id, self.filename, self.course_id, self._course_name,
+                    self.page_number_offset, source_file_id
+                )
+            )
+            return cursor.rowcount
+
+    def reuse_duplicate_file(self, fingerprint: str) -> Optional[int]:
+        """
+        Copy the chunks of an already processed file with the same fingerprint.
+
+        Returns:
+            Number of chunks copied, or None if no such file exists or this
+            session resumes an earlier run that already stored chunks
+        """
+        if self._file_created:
+            return None
+
+        duplicate = self.find_duplicate_file(fingerprint)
+        if duplicate is None:
+            return None
+
+        source_file_id, page_count = duplicate
+        logger.info(f"Reusing chunks of identical file {source_file_id} for task_id={self.task_id}")
+        return self.clone_file(source_file_id, page_count)
+
+    def finish(self, fingerprint: Optional[str] = None) -> None:
+        """
+        Update the task status to 'finished' and commit the job's data.
+
+        Args:
+            fingerprint: Optional file fingerprint to store on the file record,
+                making it available for deduplicating later uploads
+        """
+        conn = self.connection
+        with conn.cursor() as cursor:
+            if fingerprint and self._file_created:
+                cursor.execute(
+                    "UPDATE files SET fingerprint = %s WHERE id = %s",
+                    (fingerprint, self.task_id)
+                )
+            cursor.execute(
+                "UPDATE tasks SET status = 'finished' WHERE id = %s",
+                (self.task_id,)
+            )
+            if self.resumable:
+                cursor.execute("DELETE FROM task_checkpoints WHERE task_id = %s", (self.task_id,))
+        conn.commit()
+        self._finished = True
+
+    def fail(self, bucket_id: str, error_message: str = "") -> bool:
+        """
+        Update the task status to 'failed' and subtract its file size from the bucket.
+
+        Runs on the session connection while it holds the task lock, so no
+        worker can reclaim the task until the session is closed. The task is
+        only failed if it is still 'processing'; in resumable mode, the rows
+        committed by this task are deleted in the same transaction.
+
+        Args:
+            bucket_id: Bucket of the task's course
+            error_message: Error message to store
+
+        Returns:
+            True if the task was marked as failed, False if this session did
+            not claim it or it is no longer 'processing'
+        """
+        if self._conn is None or self._finished or not self._claimed:
+            return False
+
+        conn = self._conn
+        conn.rollback()
+        with conn.cursor() as cursor:
+            if self.resumable:
+                self._delete_stored_rows()
+            failed = _fail_task(cursor, self.task_id, bucket_id, error_message, only_processing=True)
+        conn.commit()
+        # Nothing is left to roll back or discard
+        self._finished = True
+        return failed
+
+    def discard(self) -> None:
+        """
+        Delete the chunks, file record and checkpoint committed by this task.
+
+        Used in resumable mode when the job fails for good; failures are
+        logged so that the original error is not masked.
+        """
+        if self._conn is None or self._finished or not self._claimed:
+            # Rows of a task claimed by another job are left alone
+            return
+
+        conn = self._conn
+        try:
+            conn.rollback()
+            self._delete_stored_rows()
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Failed to discard partial ingestion of task_id={self.task_id}: {e}")
+
+    def _delete_stored_rows(self) -> None:
+        """Delete the chunks, file record and checkpoint of this task in the current transaction."""
+        with self.connection.cursor() as cursor:
+            cursor.execute("DELETE FROM chunks WHERE file_id = %s", (self.task_id,))
+            cursor.execute("DELETE FROM files WHERE id = %s", (self.task_id,))
+            cursor.execute("DELETE FROM task_checkpoints WHERE task_id = %s", (self.task_id,))
+
+
+def _skip_stored_chunks(chunks: Iterable[T], resume_after_chunk: int) -> Iterator[T]:
+    """Skip chunks up to and including resume_after_chunk."""
+    skipped = 0
+    for chunk in chunks:
+        if chunk.chunk_index <= resume_after_chunk:
+            skipped += 1
+            continue
+        yield chunk
+    logger.debug("Skipped %d chunks stored by an earlier run", skipped)
+
+
 def update_status_to_processing(task_id: str) -> None:
     """Update task status to 'processing'"""
     with get_connection() as conn:
@@ -253,7 +1046,12 @@ def update_status_to_finished(task_id: str) -> None:
             conn.commit()
 
 
-def update_status_to_failed(task_id: str, bucket_id: str, error_message: str = "") -> None:
+def update_status_to_failed(
+    task_id: str,
+    bucket_id: str,
+    error_message: str = "",
+    only_processing: bool = False,
+) -> bool:
     """
     Update task status to 'failed', set error message, and adjust bucket size.
     Performs atomic transaction.
@@ -262,27 +1060,317 @@ def update_status_to_failed(task_id: str, bucket_id: str, error_message: str = "
         task_id: Task identifier
         bucket_id: Bucket identifier
         error_message: Error message to store (defaults to empty string)
+        only_processing: Only fail the task if its status is 'processing'
+
+    Returns:
+        True if the task was marked as failed
+    """
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            try:
+                failed = _fail_task(cursor, task_id, bucket_id, error_message, only_processing)
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                raise e
+    return failed
+
+
+def _fail_task(
+    cursor: psycopg.Cursor,
+    task_id: str,
+    bucket_id: str,
+    error_message: str,
+    only_processing: bool,
+) -> bool:
+    """Mark a task as failed and subtract its file size from the bucket, in the current transaction."""
+    # Update task status to failed and set error message
+    cursor.execute(
+        f"""
+        UPDATE tasks SET status = 'failed', error_message = %s
+        WHERE id = %s {"AND status = 'processing'" if only_processing else ""}
+        RETURNING file_size
+        """,
+        (error_message, task_id)
+    )
+    row = cursor.fetchone()
+    if not row:
+        return False
+
+    # Update bucket size by subtracting the file size
+    cursor.execute(
+        "UPDATE buckets SET size = size - %s WHERE id = %s",
+        (row[0], bucket_id)
+    )
+    return True
+
+
+class ClaimedTask:
+    """A scheduled task claimed for processing by a worker"""
+
+    def __init__(
+        self,
+        task_id: str,
+        course_id: str,
+        bucket_id: str,
+        name: str,
+        file_size: int,
+        content_type: Optional[str] = None,
+        page_number_offset: int = 0,
+        pipeline_options: Optional[dict] = None,
+        attempts: int = 1,
+    ):
+        self.task_id = task_id
+        self.course_id = course_id
+        self.bucket_id = bucket_id
+        self.name = name
+        self.file_size = file_size
+        self.content_type = content_type
+        self.page_number_offset = page_number_offset
+        self.pipeline_options = pipeline_options
+        self.attempts = attempts
+
+
+# Tasks left 'processing' by a job that died: the task lock is not held
+_ABANDONED_TASK_CONDITION = """
+    status = 'processing'
+    AND NOT EXISTS (
+        SELECT 1 FROM pg_locks l
+        WHERE l.locktype = 'advisory'
+        AND l.database = (SELECT oid FROM pg_database WHERE datname = current_database())
+        AND l.objsubid = 1
+        AND l.classid::bigint = ({lock_key} >> 32) & 4294967295
+        AND l.objid::bigint = {lock_key} & 4294967295
+    )
+""".format(lock_key=_TASK_LOCK_KEY.format("tasks.id"))
+
+
+def claim_next_task(claim_delay_seconds: int = 70, max_attempts: int = 3) -> Optional[ClaimedTask]:
+    """
+    Claim the oldest due scheduled task and mark it as 'processing'.
+
+    Uses FOR UPDATE SKIP LOCKED so that concurrent workers never claim the
+    same task. A task is due once its pub_date has passed or, without a
+    pub_date, claim_delay_seconds after it was created (the API schedules
+    processing with a delay so that the upload can complete first). Tasks
+    left 'processing' by a job that died (its advisory lock is released,
+    see IngestionSession) are claimed again, until they were claimed
+    max_attempts times (see fail_abandoned_tasks).
+
+    The processor's IngestionSession.start() claims the task for the job;
+    if another job got there first, it raises TaskAlreadyClaimedError.
+
+    Args:
+        claim_delay_seconds: Delay after creation before a task without pub_date is due
+        max_attempts: Number of claims after which an abandoned task is no longer claimed
+
+    Returns:
+        The claimed task, or None if no task is due
     """
     with get_connection() as conn:
         with conn.cursor() as cursor:
             try:
-                # Update task status to failed and set error message
                 cursor.execute(
-                    "UPDATE tasks SET status = 'failed', error_message = %s WHERE id = %s",
-                    (error_message, task_id)
+                    f"""
+                    UPDATE tasks t
+                    SET status = 'processing', attempts = t.attempts + 1
+                    FROM courses c
+                    WHERE t.id = (
+                        SELECT id FROM tasks
+                        WHERE (
+                            status = 'scheduled'
+                            AND COALESCE(pub_date, created_at + make_interval(secs => %s)) <= now()
+                        ) OR (
+                            {_ABANDONED_TASK_CONDITION}
+                            AND attempts < %s
+                        )
+                        ORDER BY COALESCE(pub_date, created_at)
+                        LIMIT 1
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    AND c.id = t.course_id
+                    RETURNING t.id, t.course_id, c.bucket_id, t.name, t.file_size,
+                        t.content_type, t.page_number_offset, t.pipeline_options, t.attempts
+                    """,
+                    (claim_delay_seconds, max_attempts)
                 )
+                row = cursor.fetchone()
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                raise e
+
+    if not row:
+        return None
+
+    (task_id, course_id, bucket_id, name, file_size, content_type,
+     page_number_offset, pipeline_options, attempts) = row
+    return ClaimedTask(
+        str(task_id), str(course_id), str(bucket_id), name, file_size,
+        content_type, page_number_offset or 0, pipeline_options, attempts,
+    )
+
+
+def fail_abandoned_tasks(max_attempts: int = 3, error_message: str = "") -> List[ClaimedTask]:
+    """
+    Mark abandoned tasks that were claimed max_attempts times as 'failed'.
+
+    A file that crashes the worker processing it leaves its task
+    'processing' without a lock; instead of claiming it forever, the task
+    is failed and the file size is subtracted from its bucket, in one
+    transaction. Rows are locked with FOR UPDATE SKIP LOCKED, so a task is
+    failed by one worker only.
 
-                # Update bucket size by subtracting the file size
+    Args:
+        max_attempts: Number of claims after which an abandoned task is failed
+        error_message: Error message to store
+
+    Returns:
+        The failed tasks, whose source files can be deleted
+    """
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            try:
                 cursor.execute(
-                    """
-                    UPDATE buckets
-                    SET size = size - (SELECT file_size FROM tasks WHERE id = %s)
-                    WHERE id = %s
+                    f"""
+                    UPDATE tasks t
+                    SET status = 'failed', error_message = %s
+                    FROM courses c
+                    WHERE t.id IN (
+                        SELECT id FROM tasks
+                        WHERE {_ABANDONED_TASK_CONDITION}
+                        AND attempts >= %s
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    AND c.id = t.course_id
+                    RETURNING t.id, t.course_id, c.bucket_id, t.name, t.file_size, t.attempts
                     """,
-                    (task_id, bucket_id)
+                    (error_message, max_attempts)
                 )
+                rows = cursor.fetchall()
+
+                for _, _, bucket_id, _, file_size, _ in rows:
+                    cursor.execute(
+                        "UPDATE buckets SET size = size - %s WHERE id = %s",
+                        (file_size, bucket_id)
+                    )
 
                 conn.commit()
             except Exception as e:
                 conn.rollback()
                 raise e
+
+    return [
+        ClaimedTask(str(task_id), str(course_id), str(bucket_id), name, file_size, attempts=attempts)
+        for task_id, course_id, bucket_id, name, file_size, attempts in rows
+    ]
+
+
+def insert_task_metrics(task_id: str, summary: dict) -> None:
+    """
+    Store the metrics summary of a job.
+
+    A retried task replaces the summary of its previous attempt.
+
+    Args:
+        task_id: Task identifier
+        summary: JSON-serializable metrics summary
+    """
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO task_metrics (task_id, summary)
+                VALUES (%s, %s)
+                ON CONFLICT (task_id) DO UPDATE
+                SET summary = EXCLUDED.summary, created_at = now()
+                """,
+                (task_id, json.dumps(summary))
+            )
+            conn.commit()
+
+
+class EmbeddingCacheStore:
+    """
+    Shared embedding cache table, read and written by every batch of a job.
+
+    Instead of opening a connection per lookup and per store, one
+    connection is opened on first use and kept for the lifetime of the
+    process; with open_connection_pool(), connections are borrowed from the
+    pool instead. Calls on the kept connection are serialized, and it is
+    replaced after a failure.
+    """
+
+    def __init__(self):
+        self._conn: Optional[psycopg.Connection] = None
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: List[str]) -> List[Tuple[str, bytes]]:
+        """
+        Look up embeddings by cache key.
+
+        Args:
+            keys: Cache keys (hex SHA-256 digests)
+
+        Returns:
+            (key, little-endian float32 vector bytes) of the keys that were found
+        """
+        with self._connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "SELECT key, embedding FROM embedding_cache WHERE key = ANY(%s)",
+                    (keys,)
+                )
+                rows = cursor.fetchall()
+                conn.commit()
+        return [(key, bytes(embedding)) for key, embedding in rows]
+
+    def put_many(self, rows: List[Tuple[str, bytes]]) -> None:
+        """
+        Store embeddings by cache key.
+
+        Keys already present are left unchanged, since equal keys hold equal vectors.
+        Rows are inserted in key order so concurrent jobs cannot deadlock.
+
+        Args:
+            rows: (key, little-endian float32 vector bytes) pairs
+        """
+        with self._connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.executemany(
+                    "INSERT INTO embedding_cache (key, embedding) VALUES (%s, %s) ON CONFLICT (key) DO NOTHING",
+                    sorted(rows)
+                )
+                conn.commit()
+
+    def close(self) -> None:
+        """Close the kept connection."""
+        with self._lock:
+            self._close()
+
+    @contextmanager
+    def _connection(self):
+        """Borrow a pooled connection, or use the kept connection."""
+        if _connection_pool is not None:
+            with _connection_pool.connection() as conn:
+                yield conn
+            return
+
+        with self._lock:
+            if self._conn is None or self._conn.closed:
+                self._conn = psycopg.connect(
+                    _get_connection_string(),
+                    options="-c statement_timeout=60000"  # 60 second query timeout
+                )
+            try:
+                yield self._conn
+            except Exception:
+                # The connection may be broken or in a failed transaction
+                self._close()
+                raise
+
+    def _close(self) -> None:
+        """Close the kept connection; the caller holds the lock."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
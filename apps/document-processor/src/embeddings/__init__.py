@@ -2,6 +2,18 @@
 Embeddings client for generating text embeddings via internal API
 """
 
-from .embeddings_client import embed_content
+from .embeddings_client import (
+    embed_content,
+    close_client,
+    get_embedding_cache_stats,
+    reset_embedding_cache_stats,
+    reset_retry_budget,
+)
 
-__all__ = ["embed_content"]
+__all__ = [
+    "embed_content",
+    "close_client",
+    "get_embedding_cache_stats",
+    "reset_embedding_cache_stats",
+    "reset_retry_budget",
+]
@@ -0,0 +1,304 @@
+"""
+Token-budget adaptive batching for embedding requests and processing batches.
+
+Chunk sizes vary a lot, so a fixed number of texts per request produces
+requests of very different cost. Batches are therefore sized by token count
+(counted with the shared tokenizer, see utils.tokenizer) and payload size
+instead:
+
+- Embedding requests carry at most a token budget, EMBEDDINGS_BATCH_SIZE
+  texts and EMBEDDINGS_BATCH_MAX_BYTES of text. The token budget adapts to
+  the observed API latency: it follows the measured throughput (tokens per
+  second, smoothed) times EMBEDDINGS_TARGET_LATENCY_MS, within
+  EMBEDDINGS_BATCH_MIN_TOKENS and EMBEDDINGS_BATCH_MAX_TOKENS.
+- Processing batches (embed + insert, see processors.pipeline) carry the
+  tokens of one round of concurrent embedding requests, at most
+  PROCESSING_BATCH_MAX_CHUNKS chunks.
+
+A single text that exceeds the limits on its own is sent as a batch of one.
+Token counts of TOKEN_COUNT_LOOKAHEAD upcoming texts are encoded in one
+batch call. The chosen batch sizes are recorded as values of the active job metrics
+(see utils.instrumentation).
+"""
+
+import os
+import threading
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, TypeVar, Union
+
+from utils.instrumentation import record_value
+from utils.memory import get_memory_pressure
+from logger import setup_logger
+
+# Configure logger
+logger = setup_logger(__name__)
+
+T = TypeVar("T")
+
+# Weight of the latest throughput observation in the moving average
+_SMOOTHING = 0.3
+
+# Maximum factor the token budget may grow by per observation
+_MAX_GROWTH = 2.0
+
+# JSON overhead per text in a request payload (quotes and separator)
+_PAYLOAD_OVERHEAD_BYTES = 4
+
+# Texts whose tokens are counted in one batch call
+TOKEN_COUNT_LOOKAHEAD = 64
+
+# Fractions of MAX_RSS_MB from which processing batches are halved and quartered
+_MEMORY_PRESSURE = 0.7
+_HIGH_MEMORY_PRESSURE = 0.85
+
+_tokenizer_failed = False
+
+
+def _get_max_texts() -> int:
+    """Get the maximum number of texts per embeddings request (max 60)."""
+    return max(1, min(60, int(os.getenv("EMBEDDINGS_BATCH_SIZE", "60"))))
+
+
+def get_max_concurrency() -> int:
+    """Get the maximum number of embeddings requests in flight at once."""
+    return max(1, int(os.getenv("EMBEDDINGS_MAX_CONCURRENCY", "4")))
+
+
+def _get_memory_batch_scale() -> float:
+    """Factor applied to processing batch limits; below 1 once the RSS nears MAX_RSS_MB."""
+    pressure = get_memory_pressure()
+    if pressure >= _HIGH_MEMORY_PRESSURE:
+        return 0.25
+    if pressure >= _MEMORY_PRESSURE:
+        return 0.5
+    return 1.0
+
+
+def _tokenizer_unavailable(error: Exception) -> None:
+    global _tokenizer_failed
+    _tokenizer_failed = True
+    logger.warning(f"Tokenizer unavailable, estimating token counts from text length: {str(error)}")
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count the tokens of a text with the shared tokenizer.
+
+    Falls back to an estimate of four characters per token if the tokenizer
+    cannot be loaded, so batching never fails a job.
+    """
+    if not _tokenizer_failed:
+        try:
+            from utils.tokenizer import get_fast_tokenizer
+            return get_fast_tokenizer().count_tokens(text)
+        except Exception as e:
+            _tokenizer_unavailable(e)
+
+    return _estimate_tokens(text)
+
+
+def count_tokens_batch(texts: Sequence[str]) -> List[int]:
+    """Count the tokens of several texts in one tokenizer call; falls back like count_tokens."""
+    if not _tokenizer_failed:
+        try:
+            from utils.tokenizer import get_fast_tokenizer
+            return get_fast_tokenizer().count_tokens_batch(texts)
+        except Exception as e:
+            _tokenizer_unavailable(e)
+
+    return [_estimate_tokens(text) for text in texts]
+
+
+def _iter_counted(items: Iterable[T], text_of: Callable[[T], str]) -> Iterator[Tuple[T, str, int]]:
+    """Yield (item, text, tokens), counting TOKEN_COUNT_LOOKAHEAD items per tokenizer call."""
+    iterator = iter(items)
+    while group := list(islice(iterator, TOKEN_COUNT_LOOKAHEAD)):
+        texts = [text_of(item) for item in group]
+        yield from zip(group, texts, count_tokens_batch(texts))
+
+
+def payload_bytes(text: str) -> int:
+    """Approximate size of a text in a JSON request payload."""
+    return len(text.encode("utf-8")) + _PAYLOAD_OVERHEAD_BYTES
+
+
+class SizedBatch(NamedTuple):
+    """A batch together with its token count and payload size."""
+    items: list
+    tokens: int
+    payload_bytes: int
+
+
+def iter_token_batches(
+    items: Iterable[T],
+    text_of: Callable[[T], str],
+    max_items: Union[int, Callable[[], int]],
+    token_budget: Callable[[], int],
+    max_bytes: Optional[int] = None,
+) -> Iterator[SizedBatch]:
+    """
+    Group items into batches limited by item count, tokens and payload size.
+
+    Args:
+        items: Items to group, consumed lazily in groups of TOKEN_COUNT_LOOKAHEAD
+        text_of: Returns the text of an item
+        max_items: Maximum number of items per batch, or a callable returning
+            it; read when a batch is started
+        token_budget: Returns the token budget; read when a batch is started
+        max_bytes: Optional maximum payload size per batch
+
+    Yields:
+        SizedBatch of at least one item, in input order
+    """
+    item_limit = max_items if callable(max_items) else lambda: max_items
+    batch: list = []
+    tokens = size = 0
+    budget, limit = token_budget(), item_limit()
+
+    for item, text, item_tokens in _iter_counted(items, text_of):
+        item_bytes = payload_bytes(text)
+
+        if batch and (
+            len(batch) >= limit
+            or tokens + item_tokens > budget
+            or (max_bytes is not None and size + item_bytes > max_bytes)
+        ):
+            yield SizedBatch(batch, tokens, size)
+            batch = []  # Start a new list to free the previous batch
+            tokens = size = 0
+            budget, limit = token_budget(), item_limit()
+
+        batch.append(item)
+        tokens += item_tokens
+        size += item_bytes
+
+    if batch:
+        yield SizedBatch(batch, tokens, size)
+
+
+class AdaptiveBatcher:
+    """
+    Sizes embedding requests by a token budget that tracks observed latency.
+
+    The budget is the smoothed throughput of previous requests times the
+    target latency, so requests settle at roughly the target duration.
+    Thread-safe; observations may come from concurrent requests.
+    """
+
+    def __init__(
+        self,
+        max_items: int = 60,
+        min_tokens: int = 1024,
+        max_tokens: int = 16384,
+        max_bytes: int = 1024 * 1024,
+        target_latency_seconds: float = 3.0,
+    ):
+        self.max_items = max(1, max_items)
+        self.min_tokens = max(1, min_tokens)
+        self.max_tokens = max(self.min_tokens, max_tokens)
+        self.max_bytes = max(1, max_bytes)
+        self.target_latency_seconds = target_latency_seconds
+
+        # Start halfway and let the first responses move the budget
+        self._token_budget = max(self.min_tokens, self.max_tokens // 2)
+        self._tokens_per_second: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def token_budget(self) -> int:
+        """Current token budget of a request."""
+        return self._token_budget
+
+    def iter_batches(self, texts: Iterable[str]) -> Iterator[SizedBatch]:
+        """Split texts into request batches within the current limits."""
+        return iter_token_batches(
+            texts, lambda text: text, self.max_items, lambda: self._token_budget, self.max_bytes
+        )
+
+    def record(self, tokens: int, latency_seconds: float) -> None:
+        """
+        Adjust the token budget after a successful request.
+
+        Args:
+            tokens: Tokens sent in the request
+            latency_seconds: Duration of the request
+        """
+        if tokens <= 0 or latency_seconds <= 0:
+            return
+
+        with self._lock:
+            observed = tokens / latency_seconds
+            if self._tokens_per_second is None:
+                self._tokens_per_second = observed
+            else:
+                self._tokens_per_second += _SMOOTHING * (observed - self._tokens_per_second)
+
+            target = int(self._tokens_per_second * self.target_latency_seconds)
+            target = min(target, int(self._token_budget * _MAX_GROWTH))
+            self._token_budget = max(self.min_tokens, min(self.max_tokens, target))
+
+
+# Singleton batcher and lock for thread-safe initialization
+_request_batcher: Optional[AdaptiveBatcher] = None
+_request_batcher_lock = threading.Lock()
+
+
+def get_request_batcher() -> AdaptiveBatcher:
+    """
+    Get or create the embedding request batcher singleton.
+    The learned token budget is kept for the lifetime of the process.
+    Thread-safe using double-checked locking.
+
+    Returns:
+        AdaptiveBatcher configured from the environment
+    """
+    global _request_batcher
+
+    if _request_batcher is None:
+        with _request_batcher_lock:
+            # Double-check after acquiring lock
+            if _request_batcher is None:
+                _request_batcher = AdaptiveBatcher(
+                    max_items=_get_max_texts(),
+                    min_tokens=int(os.getenv("EMBEDDINGS_BATCH_MIN_TOKENS", "1024")),
+                    max_tokens=int(os.getenv("EMBEDDINGS_BATCH_MAX_TOKENS", "16384")),
+                    max_bytes=int(os.getenv("EMBEDDINGS_BATCH_MAX_BYTES", str(1024 * 1024))),
+                    target_latency_seconds=int(os.getenv("EMBEDDINGS_TARGET_LATENCY_MS", "3000")) / 1000,
+                )
+
+    return _request_batcher
+
+
+def iter_processing_batches(items: Iterable[T], text_of: Callable[[T], str]) -> Iterator[List[T]]:
+    """
+    Group chunks into processing batches of one round of embedding requests.
+
+    The token budget of a batch is the request budget times
+    EMBEDDINGS_MAX_CONCURRENCY, so a batch keeps all concurrent requests
+    busy once. Batches hold at most PROCESSING_BATCH_MAX_CHUNKS chunks.
+    Under a memory budget (MAX_RSS_MB), both limits shrink as the RSS
+    approaches the budget.
+
+    Args:
+        items: Chunks to group, consumed lazily
+        text_of: Returns the text of a chunk
+
+    Yields:
+        Lists of chunks, in input order
+    """
+    max_items = max(1, int(os.getenv("PROCESSING_BATCH_MAX_CHUNKS", "240")))
+    batcher = get_request_batcher()
+    concurrency = get_max_concurrency()
+
+    for batch in iter_token_batches(
+        items, text_of,
+        lambda: max(1, int(max_items * _get_memory_batch_scale())),
+        lambda: max(1, int(batcher.token_budget * concurrency * _get_memory_batch_scale())),
+    ):
+        record_value("batch_chunks", len(batch.items))
+        record_value("batch_tokens", batch.tokens)
+        yield batch.items
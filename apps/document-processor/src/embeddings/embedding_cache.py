@@ -0,0 +1,207 @@
+"""
+Content-addressed cache for text embeddings.
+
+Embeddings are keyed by the SHA-256 of the text (and a namespace), so
+identical chunk contents are only embedded once. Two tiers are used:
+- An in-process LRU (EMBEDDING_CACHE_MAX_ENTRIES entries, default 10000)
+- With EMBEDDING_CACHE_PERSISTENT=true, the embedding_cache table in
+  Postgres, shared by all jobs and workers
+
+The namespace is derived from EMBEDDINGS_MODEL and EMBEDDING_DIMENSIONS,
+the embedding model configured in the API, so changing the model never
+serves vectors of the previous one. Both are required for the persistent
+tier; vectors of another dimension are not cached. The persistent tier
+keeps one database connection for all batches (see
+db.postgres.EmbeddingCacheStore); its failures are logged and treated as
+misses.
+Set EMBEDDING_CACHE_ENABLED=false to disable the cache entirely.
+"""
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from logger import setup_logger
+
+# Configure logger
+logger = setup_logger(__name__)
+
+
+class EmbeddingCache:
+    """Two-tier (memory, Postgres) embedding cache keyed by content hash."""
+
+    def __init__(
+        self,
+        namespace: str = "default",
+        max_entries: int = 10000,
+        persistent: bool = False,
+        dimensions: Optional[int] = None,
+    ):
+        self.namespace = namespace
+        self.max_entries = max(1, max_entries)
+        self.persistent = persistent
+        self.dimensions = dimensions
+
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._store = None
+
+        self.memory_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def key(self, text: str) -> str:
+        """Compute the cache key of a text."""
+        digest = hashlib.sha256(self.namespace.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(text.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, np.ndarray]:
+        """Look up keys in the memory tier, then the persistent tier (float32 vectors)."""
+        found: Dict[str, bytes] = {}
+        missing: List[str] = []
+
+        with self._lock:
+            for key in keys:
+                value = self._memory.get(key)
+                if value is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = value
+                else:
+                    missing.append(key)
+            self.memory_hits += len(found)
+
+        if missing and self.persistent:
+            try:
+                rows = self._get_store().get_many(missing)
+            except Exception as e:
+                logger.warning(f"Embedding cache lookup failed, embedding {len(missing)} texts: {e}")
+                rows = []
+
+            with self._lock:
+                self.shared_hits += len(rows)
+                for key, value in rows:
+                    found[key] = value
+                    self._remember(key, value)
+
+        return {key: np.frombuffer(value, dtype="<f4") for key, value in found.items()}
+
+    def put_many(self, items: Iterable[Tuple[str, Sequence[float]]]) -> None:
+        """Store embeddings in both tiers."""
+        encoded = []
+        for key, embedding in items:
+            vector = np.asarray(embedding, dtype="<f4")
+            if self.dimensions and vector.size != self.dimensions:
+                logger.warning(
+                    f"Not caching an embedding with {vector.size} dimensions, "
+                    f"EMBEDDING_DIMENSIONS is {self.dimensions}"
+                )
+                continue
+            encoded.append((key, vector.tobytes()))
+
+        with self._lock:
+            for key, value in encoded:
+                self._remember(key, value)
+
+        if encoded and self.persistent:
+            try:
+                self._get_store().put_many(encoded)
+            except Exception as e:
+                logger.warning(f"Failed to store {len(encoded)} embeddings in the embedding cache: {e}")
+
+    def record_misses(self, count: int) -> None:
+        """Record texts that had to be embedded through the API."""
+        with self._lock:
+            self.misses += count
+
+    def stats(self) -> Dict[str, int]:
+        """Hit and miss counters since the last reset."""
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+            }
+
+    def reset_stats(self) -> None:
+        """Reset the hit and miss counters, e.g. at the start of a job."""
+        with self._lock:
+            self.memory_hits = 0
+            self.shared_hits = 0
+            self.misses = 0
+
+    def _get_store(self):
+        """Get the store of the persistent tier, created on first use."""
+        if self._store is None:
+            from db.postgres import EmbeddingCacheStore
+
+            with self._lock:
+                if self._store is None:
+                    self._store = EmbeddingCacheStore()
+        return self._store
+
+    def _remember(self, key: str, value: bytes) -> None:
+        """Insert into the memory tier, evicting the least recently used entry."""
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+
+# Singleton instance and lock for thread-safe initialization
+_cache_instance: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_namespace() -> Optional[str]:
+    """Get the cache namespace of the API's embedding model, or None if it is not configured."""
+    model = os.getenv("EMBEDDINGS_MODEL", "")
+    dimensions = os.getenv("EMBEDDING_DIMENSIONS", "")
+    if not model or not dimensions:
+        return None
+    return f"{model}:{int(dimensions)}"
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Get the embedding cache singleton, or None if caching is disabled.
+
+    Returns:
+        EmbeddingCache configured from environment variables
+
+    Raises:
+        ValueError: If the persistent tier is enabled without EMBEDDINGS_MODEL
+            and EMBEDDING_DIMENSIONS
+    """
+    global _cache_instance
+
+    if os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() != "true":
+        return None
+
+    if _cache_instance is None:
+        with _cache_lock:
+            # Double-check pattern to avoid unnecessary locking
+            if _cache_instance is None:
+                persistent = os.getenv("EMBEDDING_CACHE_PERSISTENT", "false").lower() == "true"
+                namespace = get_embedding_namespace()
+                if persistent and namespace is None:
+                    raise ValueError(
+                        "EMBEDDINGS_MODEL and EMBEDDING_DIMENSIONS must be set for the persistent embedding cache"
+                    )
+
+                logger.debug(f"Initializing embedding cache (namespace: {namespace}, persistent: {persistent})")
+                _cache_instance = EmbeddingCache(
+                    # Without a configured model, memory entries live only as
+                    # long as the process, which uses a single model
+                    namespace=namespace or "default",
+                    max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "10000")),
+                    persistent=persistent,
+                    dimensions=int(os.getenv("EMBEDDING_DIMENSIONS", "0")) or None,
+                )
+
+    return _cache_instance
@@ -1,33 +1,392 @@
 """
 Embeddings client for generating text embeddings via the internal API.
+
+Uses a long-lived, pooled HTTP client (keep-alive, HTTP/2 when the optional
+h2 package is installed) and can send several batch requests concurrently.
+Previously embedded texts are served from a content-addressed cache.
+Requests are sized by tokens and payload size (see embeddings.batching)
+and are retried, hedged and guarded by a circuit breaker (see
+embeddings.resilience).
+
+Embeddings are returned as contiguous float32 NumPy matrices (one row per
+text). With EMBEDDINGS_TRANSPORT=base64 the API is asked to send them as a
+single base64 string of float32 values instead of JSON number arrays,
+which is about five times smaller and decodes without creating a Python
+float per value. Servers that ignore the encoding still answer with JSON
+arrays, which are accepted as well.
 """
 
 import os
-from typing import List
+import time
+import base64
+import threading
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 import httpx
+import numpy as np
 
+from embeddings.batching import SizedBatch, get_max_concurrency, get_request_batcher
+from embeddings.embedding_cache import get_embedding_cache
+from embeddings.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyTracker,
+    RetryBudget,
+    backoff_delay,
+    get_max_attempts,
+    get_max_circuit_wait,
+    hedged_call,
+    is_retryable,
+)
+from utils.instrumentation import record_value
 from logger import setup_logger
 
 # Configure logger
 logger = setup_logger(__name__)
 
+# Singleton HTTP client and lock for thread-safe initialization
+_client: Optional[httpx.Client] = None
+_client_lock = threading.Lock()
+
+# Request controls shared by all requests of the process
+_retry_budget: Optional[RetryBudget] = None
+_circuit_breaker: Optional[CircuitBreaker] = None
+_latency_tracker: Optional[LatencyTracker] = None
+_hedge_executor: Optional[ThreadPoolExecutor] = None
+_controls_lock = threading.Lock()
+
+
+def _get_transport() -> str:
+    """Get the embedding encoding requested from the API: 'json' (default) or 'base64'."""
+    transport = os.getenv("EMBEDDINGS_TRANSPORT", "json").lower()
+    if transport not in ("json", "base64"):
+        raise ValueError(f"Invalid EMBEDDINGS_TRANSPORT '{transport}'. Must be 'json' or 'base64'")
+    return transport
+
+
+def _decode_embeddings(data: dict, count: int) -> np.ndarray:
+    """
+    Decode the embeddings of a batch response into a float32 matrix.
+
+    Raises:
+        ValueError: If the response has no embeddings or the wrong number of them
+    """
+    if data.get("encoding") == "base64":
+        raw = base64.b64decode(data["embeddings"])
+        matrix = np.frombuffer(raw, dtype="<f4").reshape(-1, int(data["dimensions"]))
+    else:
+        matrix = np.asarray(data["embeddings"], dtype=np.float32)
+
+    if matrix.ndim != 2 or matrix.shape[0] != count:
+        raise ValueError(f"Expected {count} embeddings from API, got {matrix.shape[0]}")
+    return matrix
+
+
+def _is_hedging_enabled() -> bool:
+    """Check whether slow requests are hedged with a duplicate request."""
+    return os.getenv("EMBEDDINGS_HEDGING_ENABLED", "true").lower() == "true"
+
+
+def _init_controls() -> None:
+    """Create the request controls once per process (double-checked locking)."""
+    global _retry_budget, _circuit_breaker, _latency_tracker, _hedge_executor
+
+    if _retry_budget is None:
+        with _controls_lock:
+            # Double-check after acquiring lock
+            if _retry_budget is None:
+                _circuit_breaker = CircuitBreaker(
+                    failure_threshold=int(os.getenv("EMBEDDINGS_BREAKER_FAILURES", "5")),
+                    reset_seconds=float(os.getenv("EMBEDDINGS_BREAKER_RESET_SECONDS", "30")),
+                )
+                _latency_tracker = LatencyTracker()
+                _hedge_executor = ThreadPoolExecutor(
+                    max_workers=2 * get_max_concurrency(), thread_name_prefix="embeddings-hedge"
+                )
+                _retry_budget = RetryBudget(
+                    min_retries=int(os.getenv("EMBEDDINGS_RETRY_BUDGET_MIN", "10")),
+                    ratio=float(os.getenv("EMBEDDINGS_RETRY_BUDGET_RATIO", "0.2")),
+                )
+
+
+def _get_retry_budget() -> RetryBudget:
+    _init_controls()
+    return _retry_budget
+
+
+def _get_circuit_breaker() -> CircuitBreaker:
+    _init_controls()
+    return _circuit_breaker
+
+
+def _get_latency_tracker() -> LatencyTracker:
+    _init_controls()
+    return _latency_tracker
+
 
-def embed_content(contents: List[str]) -> List[List[float]]:
+def _get_hedge_executor() -> ThreadPoolExecutor:
+    _init_controls()
+    return _hedge_executor
+
+
+def _get_hedge_delay() -> Optional[float]:
+    """Latency after which a request is hedged, or None to not hedge."""
+    if not _is_hedging_enabled():
+        return None
+    percentile = float(os.getenv("EMBEDDINGS_HEDGE_PERCENTILE", "95"))
+    return _get_latency_tracker().percentile(percentile)
+
+
+def reset_retry_budget() -> None:
+    """Give the next job a fresh retry budget; call at the start of a job."""
+    _get_retry_budget().reset()
+
+
+def _get_client() -> httpx.Client:
+    """
+    Get or create the pooled HTTP client singleton.
+    Lazily initializes the client on first access.
+    Thread-safe using double-checked locking.
+
+    Returns:
+        httpx.Client: Client reusing connections across requests
+    """
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            # Double-check after acquiring lock
+            if _client is None:
+                http2 = importlib.util.find_spec("h2") is not None
+                max_connections = get_max_concurrency()
+                if _is_hedging_enabled():
+                    # Room for a hedged duplicate of every request in flight
+                    max_connections *= 2
+
+                logger.debug(f"Initializing embeddings HTTP client (http2={http2}, max_connections={max_connections})")
+                _client = httpx.Client(
+                    timeout=30.0,
+                    http2=http2,
+                    limits=httpx.Limits(
+                        max_connections=max_connections,
+                        max_keepalive_connections=max_connections,
+                        keepalive_expiry=60.0,
+                    ),
+                )
+
+    return _client
+
+
+def close_client() -> None:
+    """
+    Close the pooled HTTP client and reset the request controls.
+    Useful for long-running processes and tests; the next request reopens it.
+    """
+    global _client, _retry_budget, _circuit_breaker, _latency_tracker, _hedge_executor
+
+    with _controls_lock:
+        if _hedge_executor is not None:
+            _hedge_executor.shutdown(wait=True)
+        _retry_budget = _circuit_breaker = _latency_tracker = _hedge_executor = None
+
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+def _post_batch(
+    client: httpx.Client,
+    endpoint: str,
+    headers: dict,
+    sized_batch: SizedBatch
+) -> np.ndarray:
+    """Send one attempt of a batch request and record its latency."""
+    payload = {"texts": sized_batch.items}
+    if _get_transport() == "base64":
+        payload["encoding"] = "base64"
+
+    started = time.perf_counter()
+    response = client.post(endpoint, json=payload, headers=headers)
+    response.raise_for_status()
+    latency = time.perf_counter() - started
+
+    data = response.json()
+
+    if "embeddings" not in data or not len(data["embeddings"]):
+        logger.error("No embeddings returned from API")
+        raise ValueError("No embeddings returned from API")
+
+    embeddings = _decode_embeddings(data, len(sized_batch.items))
+
+    _get_latency_tracker().record(latency)
+    get_request_batcher().record(sized_batch.tokens, latency)
+    return embeddings
+
+
+def _embed_batch(
+    client: httpx.Client,
+    endpoint: str,
+    headers: dict,
+    sized_batch: SizedBatch
+) -> np.ndarray:
+    """
+    Send a batch request to the embeddings API with retries and hedging.
+
+    See embeddings.resilience for the retry budget, hedging and circuit
+    breaker settings.
+    """
+    batch = sized_batch.items
+    logger.debug(
+        "Sending embedding request for %d texts (%d tokens) to %s",
+        len(batch), sized_batch.tokens, endpoint
+    )
+    record_value("request_texts", len(batch))
+    record_value("request_tokens", sized_batch.tokens)
+    record_value("request_bytes", sized_batch.payload_bytes)
+
+    budget = _get_retry_budget()
+    breaker = _get_circuit_breaker()
+    budget.record_request()
+
+    def attempt() -> np.ndarray:
+        return _post_batch(client, endpoint, headers, sized_batch)
+
+    max_attempts = get_max_attempts()
+    # Waiting for an open circuit sends no request, so it is bounded by a
+    # deadline rather than by the attempts and the retry budget
+    circuit_deadline = time.monotonic() + get_max_circuit_wait()
+    attempt_number = 0
+    while True:
+        try:
+            trial = breaker.before_request()
+        except CircuitOpenError as e:
+            remaining = circuit_deadline - time.monotonic()
+            if remaining <= 0:
+                logger.error(f"Embeddings API unavailable: {str(e)}")
+                raise Exception(f"Embeddings API unavailable: {str(e)}")
+            delay = min(remaining, e.retry_after)
+            logger.info(f"{str(e)}, waiting {delay:.2f}s before sending the request")
+            time.sleep(delay)
+            continue
+
+        attempt_number += 1
+        try:
+            embeddings = hedged_call(attempt, _get_hedge_executor(), _get_hedge_delay(), budget.try_acquire)
+            breaker.record_success()
+            record_value("request_attempts", attempt_number)
+            logger.debug("Successfully received %d embeddings from API", len(embeddings))
+            return embeddings
+
+        except (httpx.HTTPStatusError, httpx.RequestError) as e:
+            if is_retryable(e):
+                breaker.record_failure(trial)
+            else:
+                # The API is reachable, the request itself was rejected
+                breaker.record_success()
+
+            if attempt_number < max_attempts and is_retryable(e) and budget.try_acquire():
+                delay = backoff_delay(attempt_number, e)
+                logger.warning(
+                    f"Embeddings request failed ({_describe_error(e)}), "
+                    f"retrying in {delay:.2f}s (attempt {attempt_number + 1}/{max_attempts})"
+                )
+                time.sleep(delay)
+                continue
+
+            if isinstance(e, httpx.HTTPStatusError):
+                logger.error(f"API request failed with status {e.response.status_code}: {e.response.text}")
+                raise Exception(
+                    f"API request failed with status {e.response.status_code}: {e.response.text}"
+                )
+            logger.error(f"Failed to connect to embeddings API: {str(e)}")
+            raise Exception(f"Failed to connect to API: {str(e)}")
+
+        except Exception:
+            breaker.record_failure(trial)
+            raise
+
+
+def _describe_error(error: Exception) -> str:
+    if isinstance(error, httpx.HTTPStatusError):
+        return f"status {error.response.status_code}"
+    return f"{type(error).__name__}: {str(error)}"
+
+
+def embed_content(contents: List[str]) -> np.ndarray:
     """
     Generate embeddings for a list of text contents using the internal API.
 
+    Embeddings of previously seen texts are served from the embedding cache
+    (see embeddings.embedding_cache) and duplicate texts within the list
+    are embedded once. Only the remaining texts are sent to the API.
+
     Args:
-        contents: List of text strings to embed (max 60 per batch)
+        contents: List of text strings to embed
 
     Returns:
-        List of embedding vectors (each is a list of floats)
+        float32 matrix with one embedding per row, in input order
 
     Raises:
         ValueError: If no embeddings are returned or configuration is missing
         Exception: If the API call fails
     """
-    logger.debug(f"Generating embeddings for {len(contents)} text chunks")
-    
+    cache = get_embedding_cache()
+    if cache is None:
+        return _embed_uncached(contents)
+
+    keys = [cache.key(text) for text in contents]
+    embeddings_by_key = cache.get_many(set(keys))
+
+    # Unique texts that are not cached, in first-occurrence order
+    missing: Dict[str, str] = {}
+    for key, text in zip(keys, contents):
+        if key not in embeddings_by_key and key not in missing:
+            missing[key] = text
+
+    logger.debug(
+        "Embedding cache: %d of %d texts served without API call",
+        len(contents) - len(missing), len(contents)
+    )
+
+    if missing:
+        cache.record_misses(len(missing))
+        new_embeddings = _embed_uncached(list(missing.values()))
+        new_items = list(zip(missing.keys(), new_embeddings))
+        cache.put_many(new_items)
+        embeddings_by_key.update(new_items)
+
+    return np.stack([embeddings_by_key[key] for key in keys]) if keys else _empty_matrix()
+
+
+def get_embedding_cache_stats() -> Dict[str, int]:
+    """Embedding cache hit and miss counters since the last reset."""
+    cache = get_embedding_cache()
+    return cache.stats() if cache is not None else {}
+
+
+def reset_embedding_cache_stats() -> None:
+    """Reset the embedding cache counters, e.g. at the start of a job."""
+    cache = get_embedding_cache()
+    if cache is not None:
+        cache.reset_stats()
+
+
+def _empty_matrix() -> np.ndarray:
+    return np.empty((0, 0), dtype=np.float32)
+
+
+def _embed_uncached(contents: List[str]) -> np.ndarray:
+    """
+    Generate embeddings through the internal API without consulting the cache.
+
+    Contents are split into requests by the adaptive request batcher (see
+    embeddings.batching). Up to EMBEDDINGS_MAX_CONCURRENCY requests are sent
+    concurrently; rows are returned in input order.
+    """
+    logger.debug("Generating embeddings for %d text chunks", len(contents))
+
     api_url = os.getenv("API_URL")
     internal_secret = os.getenv("ENCRYPTION_KEY")
 
@@ -39,42 +398,36 @@ def embed_content(contents: List[str]) -> List[List[float]]:
         logger.error("ENCRYPTION_KEY environment variable not set")
         raise ValueError("INTERNAL_API_SECRET environment variable not set")
 
-    # Process contents in batches of up to 60
-    batch_size = 60
-    all_embeddings = []
-    for i in range(0, len(contents), batch_size):
-        batch = contents[i:i + batch_size]
-        logger.debug(f"Processing batch of {len(batch)} texts")
-        
-        endpoint = f"{api_url}/api/internal/embeddings/batch"
-        headers = {
-            "Content-Type": "application/json",
-            "x-internal-secret": internal_secret
-        }
-        payload = {"texts": batch}
+    endpoint = f"{api_url}/api/internal/embeddings/batch"
+    headers = {
+        "Content-Type": "application/json",
+        "x-internal-secret": internal_secret
+    }
+
+    batcher = get_request_batcher()
+    record_value("request_token_budget", batcher.token_budget)
+    batches = list(batcher.iter_batches(contents))
+    if not batches:
+        return _empty_matrix()
+    client = _get_client()
+
+    concurrency = min(get_max_concurrency(), len(batches))
+    if concurrency <= 1:
+        return np.concatenate([_embed_batch(client, endpoint, headers, batch) for batch in batches])
+
+    logger.debug("Sending %d embedding requests with concurrency %d", len(batches), concurrency)
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="embeddings") as executor:
+        futures = [
+            executor.submit(_embed_batch, client, endpoint, headers, batch)
+            for batch in batches
+        ]
 
         try:
-            logger.debug(f"Sending embedding request to {endpoint}")
-            with httpx.Client(timeout=30.0) as client:
-                response = client.post(endpoint, json=payload, headers=headers)
-                response.raise_for_status()
-
-                data = response.json()
-
-                if "embeddings" not in data or not data["embeddings"]:
-                    logger.error("No embeddings returned from API")
-                    raise ValueError("No embeddings returned from API")
-
-                logger.debug(f"Successfully received {len(data['embeddings'])} embeddings from API")
-                all_embeddings.extend(data["embeddings"])
-
-        except httpx.HTTPStatusError as e:
-            logger.error(f"API request failed with status {e.response.status_code}: {e.response.text}")
-            raise Exception(
-                f"API request failed with status {e.response.status_code}: {e.response.text}"
-            )
-        except httpx.RequestError as e:
-            logger.error(f"Failed to connect to embeddings API: {str(e)}")
-            raise Exception(f"Failed to connect to API: {str(e)}")
-    
-    return all_embeddings
+            # Collect in submission order to preserve the input order
+            matrices = [future.result() for future in futures]
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
+
+    return np.concatenate(matrices)
@@ -0,0 +1,265 @@
+"""
+Tail-latency and failure controls for embeddings API requests.
+
+- Retries: failed requests (connection errors, timeouts, 429 and 5xx) are
+  retried up to EMBEDDINGS_RETRY_MAX_ATTEMPTS times with full-jitter
+  exponential backoff (EMBEDDINGS_RETRY_BACKOFF_MS base, capped at
+  EMBEDDINGS_RETRY_BACKOFF_MAX_MS).
+- Retry budget: retries and hedges of a job are limited to
+  EMBEDDINGS_RETRY_BUDGET_MIN plus EMBEDDINGS_RETRY_BUDGET_RATIO of its
+  requests, so a degraded API is not hit with a retry storm.
+- Hedging: if a request has not completed after the
+  EMBEDDINGS_HEDGE_PERCENTILE latency of recent requests, a duplicate is
+  sent and the first successful response wins. Disable with
+  EMBEDDINGS_HEDGING_ENABLED=false.
+- Circuit breaker: after EMBEDDINGS_BREAKER_FAILURES consecutive failed
+  requests, no requests are sent for EMBEDDINGS_BREAKER_RESET_SECONDS; then
+  a single trial request decides whether the circuit closes again. Requests
+  wait for the circuit to close for up to EMBEDDINGS_BREAKER_MAX_WAIT_SECONDS
+  before failing.
+"""
+
+import os
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from typing import Callable, Deque, Optional, TypeVar
+
+import httpx
+
+from logger import setup_logger
+
+# Configure logger
+logger = setup_logger(__name__)
+
+T = TypeVar("T")
+
+# Status codes worth retrying: rate limiting and server-side failures
+_RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# Seconds between admission checks while the half-open trial request is in flight
+_TRIAL_POLL_SECONDS = 0.5
+
+
+class CircuitOpenError(Exception):
+    """Raised without sending a request while the circuit breaker is open."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        # Seconds until a request may be admitted again
+        self.retry_after = retry_after
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Check whether a failed request may succeed when sent again."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in _RETRYABLE_STATUS_CODES
+    return isinstance(error, httpx.RequestError)
+
+
+def get_max_attempts() -> int:
+    """Get the maximum number of attempts per request (including the first)."""
+    return max(1, int(os.getenv("EMBEDDINGS_RETRY_MAX_ATTEMPTS", "3")))
+
+
+def get_max_circuit_wait() -> float:
+    """Get the seconds a request waits for an open circuit before failing."""
+    return max(0.0, float(os.getenv("EMBEDDINGS_BREAKER_MAX_WAIT_SECONDS", "120")))
+
+
+def backoff_delay(attempt: int, error: Optional[BaseException] = None) -> float:
+    """
+    Full-jitter exponential backoff before the given retry (1-based).
+
+    A numeric Retry-After header of a 429/503 response is honoured, up to
+    the backoff cap.
+    """
+    base = int(os.getenv("EMBEDDINGS_RETRY_BACKOFF_MS", "200")) / 1000
+    cap = int(os.getenv("EMBEDDINGS_RETRY_BACKOFF_MAX_MS", "5000")) / 1000
+
+    if isinstance(error, httpx.HTTPStatusError):
+        retry_after = error.response.headers.get("retry-after", "")
+        if retry_after.isdigit():
+            return min(cap, float(retry_after))
+
+    return random.uniform(0, min(cap, base * (2 ** (attempt - 1))))
+
+
+class RetryBudget:
+    """Limits retries and hedges to a share of the requests of a job."""
+
+    def __init__(self, min_retries: int = 10, ratio: float = 0.2):
+        self.min_retries = max(0, min_retries)
+        self.ratio = max(0.0, ratio)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Start a new job with an unused budget."""
+        with self._lock:
+            self.requests = 0
+            self.retries = 0
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def try_acquire(self) -> bool:
+        """Take one retry (or hedge) from the budget if any is left."""
+        with self._lock:
+            if self.retries >= self.min_retries + self.ratio * self.requests:
+                return False
+            self.retries += 1
+            return True
+
+
+class LatencyTracker:
+    """Sliding window of recent request latencies."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency_seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(latency_seconds)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Latency at the percentile, or None until enough samples exist."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+        return ordered[index]
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open trial."""
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """"closed", "open" or "half-open"."""
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at < self.reset_seconds:
+                return "open"
+            return "half-open"
+
+    def before_request(self) -> bool:
+        """
+        Admit a request.
+
+        Returns:
+            True if the request is the trial of a half-open circuit; pass
+            it to record_failure() if the request fails
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with the
+                trial request already in flight
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            remaining = self.reset_seconds - (time.monotonic() - self._opened_at)
+            if remaining > 0:
+                raise CircuitOpenError(
+                    f"Embeddings API circuit open for another {remaining:.1f}s", remaining
+                )
+            if self._trial_in_flight:
+                raise CircuitOpenError(
+                    "Embeddings API circuit half-open, trial request in flight", _TRIAL_POLL_SECONDS
+                )
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        """Record a successful request; any success shows the API is reachable and closes the circuit."""
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("Embeddings API circuit closed")
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self, trial: bool = False) -> None:
+        """
+        Record a failed request.
+
+        Only the trial's own failure re-opens a half-open circuit; failures
+        of requests sent before the circuit opened leave the trial in flight.
+        """
+        with self._lock:
+            self._failures += 1
+            if trial and self._trial_in_flight:
+                logger.warning("Embeddings API circuit re-opened, trial request failed")
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+            elif self._opened_at is None and self._failures >= self.failure_threshold:
+                logger.warning(
+                    f"Embeddings API circuit opened after {self._failures} consecutive failures"
+                )
+                self._opened_at = time.monotonic()
+
+
+def hedged_call(
+    call: Callable[[], T],
+    executor: Executor,
+    hedge_after: Optional[float],
+    may_hedge: Callable[[], bool],
+) -> T:
+    """
+    Run call, sending a duplicate if it is still running after hedge_after.
+
+    The first successful result wins; the slower call finishes in the
+    background and its result is discarded. If all sent calls fail, the
+    error of the first one is raised.
+
+    Args:
+        call: Request to run
+        executor: Executor running the calls
+        hedge_after: Seconds to wait before hedging; None disables hedging
+        may_hedge: Called before hedging; False skips the duplicate (e.g.
+            when the retry budget is exhausted)
+
+    Returns:
+        Result of the first successful call
+    """
+    if hedge_after is None:
+        return call()
+
+    primary = executor.submit(call)
+    done, _ = wait([primary], timeout=hedge_after)
+    if done or not may_hedge():
+        return primary.result()
+
+    logger.debug("Request still running after %.3fs, sending hedged request", hedge_after)
+    pending = {primary, executor.submit(call)}
+    first_error: Optional[BaseException] = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in _in_submission_order(done, primary):
+            error = future.exception()
+            if error is None:
+                return future.result()
+            if first_error is None:
+                first_error = error
+
+    raise first_error
+
+
+def _in_submission_order(futures: set, primary: Future) -> list:
+    """Prefer the primary's outcome if both calls completed together."""
+    return sorted(futures, key=lambda future: future is not primary)
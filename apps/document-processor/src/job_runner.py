@@ -9,8 +9,15 @@ directly, designed for use with:
 The job receives event data via environment variables and processes
 the document synchronously until completion.
 
+Startup is kept short: the processor (and with it Docling, transformers
+and the PDF pipeline) is only imported once the job type is known, so a
+misconfigured job fails immediately and non-PDF jobs never import the PDF
+pipeline. See benchmarks/bench_startup.py for an import-time profile.
+
 Usage:
-    python -m job_runner
+    python -m job_runner            # process the task described by the environment
+    python -m job_runner --worker   # stay resident and claim tasks (see worker.py)
+    python -m job_runner --manifest files.jsonl   # process many uploads in a process pool (see bulk.py)
 
 Environment Variables Required:
     JOB_TYPE: "process-pdf" or "process-document"
@@ -27,17 +34,71 @@ Optional for PDFs:
     DO_FORMULA_ENRICHMENT: "true" or "false"
     DO_CODE_ENRICHMENT: "true" or "false"
     DO_PICTURE_DESCRIPTION: "true" or "false"
+
+Optional tuning:
+    PIPELINED_PROCESSING: "true" to overlap chunking, embedding and inserts
+    PIPELINE_QUEUE_SIZE: Batches buffered between pipeline stages (default: 2)
+    PIPELINE_SHUTDOWN_TIMEOUT: Seconds to wait for each pipeline stage to stop after a failure (default: 10)
+    EMBEDDINGS_BATCH_SIZE: Maximum texts per embeddings API request (default: 60, max: 60)
+    EMBEDDINGS_BATCH_MIN_TOKENS: Lower bound of the adaptive request token budget (default: 1024)
+    EMBEDDINGS_BATCH_MAX_TOKENS: Upper bound of the adaptive request token budget (default: 16384)
+    EMBEDDINGS_BATCH_MAX_BYTES: Maximum text payload per embeddings request (default: 1 MB)
+    EMBEDDINGS_TARGET_LATENCY_MS: Latency the request token budget adapts to (default: 3000)
+    PROCESSING_BATCH_MAX_CHUNKS: Maximum chunks per embed and insert batch (default: 240)
+    EMBEDDINGS_RETRY_MAX_ATTEMPTS: Attempts per embeddings request (default: 3)
+    EMBEDDINGS_RETRY_BACKOFF_MS: Base of the jittered retry backoff (default: 200)
+    EMBEDDINGS_RETRY_BACKOFF_MAX_MS: Cap of the retry backoff (default: 5000)
+    EMBEDDINGS_RETRY_BUDGET_MIN: Retries and hedges always allowed per job (default: 10)
+    EMBEDDINGS_RETRY_BUDGET_RATIO: Additional retries per request of the job (default: 0.2)
+    EMBEDDINGS_HEDGING_ENABLED: "false" to never send hedged duplicate requests (default: "true")
+    EMBEDDINGS_HEDGE_PERCENTILE: Latency percentile after which a request is hedged (default: 95)
+    EMBEDDINGS_BREAKER_FAILURES: Consecutive failures that open the circuit (default: 5)
+    EMBEDDINGS_BREAKER_RESET_SECONDS: Time before a trial request after opening (default: 30)
+    EMBEDDINGS_BREAKER_MAX_WAIT_SECONDS: Time a request waits for an open circuit before failing (default: 120)
+    EMBEDDINGS_MAX_CONCURRENCY: Embeddings API requests in flight (default: 4)
+    EMBEDDINGS_TRANSPORT: "base64" to receive embeddings as base64 float32 (default: "json")
+    CHUNK_INSERT_METHOD: "copy" (binary COPY, default) or "executemany"
+    RESUMABLE_INGESTION: "true" to commit and checkpoint every batch, so a re-run of a killed job resumes
+    CONVERSION_CACHE_DIR: Directory caching conversion results until the task finished or failed
+    TEXT_FAST_PATH_ENABLED: "false" to convert Markdown, text, CSV and simple HTML with Docling (default: "true")
+    TEXT_CHUNK_MAX_TOKENS: Maximum tokens per chunk of the text fast path (default: TOKENIZER_MAX_TOKENS)
+    TOKENIZER_PATH: Pre-serialized tokenizer.json of the chunkers (default: /app/.cache/tokenizer/tokenizer.json)
+    TOKENIZER_MAX_TOKENS: Maximum tokens per chunk (default: max_seq_length of the embedding model, 256)
+    TOKENIZER_CACHE_SIZE: Texts whose token counts are memoized (default: 8192)
+    PDF_CONVERSION_WORKERS: Processes converting PDF page windows (default: 1, disabled)
+    PDF_PAGE_WINDOW_SIZE: Pages per conversion window (default: 20)
+    PDF_CONVERSION_POOLS: Conversion process pools (pipeline option sets) kept alive between documents (default: 1)
+    PDF_STREAMING_CONVERSION: "true" to convert and chunk long PDFs window by window in-process
+    MAX_RSS_MB: Memory budget of the job; sizes page windows and batches to stay under it (default: 0, none)
+    MEMORY_SAMPLE_INTERVAL_MS: RSS sampling interval under a memory budget (default: 100)
+    CONVERTER_CACHE_MAX_ENTRIES: Converters kept per pipeline option set (default: 4)
+    CONVERTER_CACHE_MAX_MB: Memory budget for cached converters (default: 0, no limit)
+    EMBEDDING_CACHE_ENABLED: "false" to disable the embedding cache (default: "true")
+    EMBEDDING_CACHE_PERSISTENT: "true" to share cached embeddings through Postgres (default: "false")
+    EMBEDDINGS_MODEL: Embedding model of the API, part of the cache keys (required for the persistent tier)
+    EMBEDDING_DIMENSIONS: Embedding dimensions of the API, part of the cache keys (required for the persistent tier)
+    FILE_DEDUPLICATION_ENABLED: "false" to never reuse chunks of identical files (default: "true")
+    DOWNLOAD_TEMP_DIR: Directory for downloaded source files (default: system temp dir)
+    DOWNLOAD_CHUNK_SIZE_KB: Bytes read per storage response chunk (default: 1024)
+    DOWNLOAD_PART_SIZE_MB: Size of each ranged download request (default: 8)
+    DOWNLOAD_MAX_CONCURRENCY: Ranged download requests in flight (default: 8, 1 disables)
+    JOB_METRICS_TO_DB: "true" to also store the job metrics summary in task_metrics
+    LOG_LEVEL: Level of the service loggers (default: DEBUG in development, WARNING otherwise)
+    LOG_FORMAT: "text" (default) or "json" for one JSON object per line with task_id
+    LOG_SAMPLE_EVERY: Log only every n-th per-chunk debug record (default: 1)
+    BULK_WORKERS: Worker processes of a --manifest run (default: CPU count / OMP_NUM_THREADS)
+    BULK_DB_POOL_SIZE: Database connections per --manifest worker (default: 2)
+    BULK_MAX_ATTEMPTS: Attempts per file of a --manifest run when its worker crashes (default: 2)
+    BULK_MAX_TASKS_PER_WORKER: Files after which a --manifest worker is replaced (default: 0, never)
 """
 
 import os
 import sys
-from typing import Optional
-
-from docling.datamodel.pipeline_options import PdfPipelineOptions
+import argparse
+from typing import Callable, Optional
 
-from models.requests import DocumentUploadEvent
-from processors.process_pdf import convert_pdf
-from processors.process_document import convert_document
+from models.requests import DocumentUploadEvent, PipelineOptions
+from models.responses import ProcessingResponse
 from logger import setup_logger, configure_library_logging
 
 logger = setup_logger(__name__)
@@ -49,8 +110,8 @@ def get_env_bool(name: str, default: bool = False) -> bool:
     return value == "true"
 
 
-def get_pipeline_options() -> Optional[PdfPipelineOptions]:
-    """Build PdfPipelineOptions from environment variables if any are set."""
+def get_pipeline_options() -> Optional[PipelineOptions]:
+    """Build PipelineOptions from environment variables if any are set."""
     # Check if any pipeline option is explicitly set
     option_vars = [
         "DO_OCR", "DO_TABLE_STRUCTURE", "DO_FORMULA_ENRICHMENT",
@@ -60,14 +121,23 @@ def get_pipeline_options() -> Optional[PdfPipelineOptions]:
     if not any(os.getenv(var) for var in option_vars):
         return None
     
-    options = PdfPipelineOptions()
-    options.do_ocr = get_env_bool("DO_OCR", False)
-    options.do_table_structure = get_env_bool("DO_TABLE_STRUCTURE", False)
-    options.do_formula_enrichment = get_env_bool("DO_FORMULA_ENRICHMENT", False)
-    options.do_code_enrichment = get_env_bool("DO_CODE_ENRICHMENT", False)
-    options.do_picture_description = get_env_bool("DO_PICTURE_DESCRIPTION", False)
-    
-    return options
+    return PipelineOptions(
+        do_ocr=get_env_bool("DO_OCR", False),
+        do_table_structure=get_env_bool("DO_TABLE_STRUCTURE", False),
+        do_formula_enrichment=get_env_bool("DO_FORMULA_ENRICHMENT", False),
+        do_code_enrichment=get_env_bool("DO_CODE_ENRICHMENT", False),
+        do_picture_description=get_env_bool("DO_PICTURE_DESCRIPTION", False),
+    )
+
+
+def load_processor(job_type: str) -> Callable[[DocumentUploadEvent], ProcessingResponse]:
+    """Import the processor of a job type; only its own dependencies are loaded."""
+    if job_type == "process-pdf":
+        from processors.process_pdf import convert_pdf
+        return convert_pdf
+
+    from processors.process_document import convert_document
+    return convert_document
 
 
 def build_event_from_env() -> DocumentUploadEvent:
@@ -120,10 +190,12 @@ def run_job():
         logger.info(f"Starting {job_type} job for task_id={event.taskId}, file={event.name}")
         
         # Run the appropriate processor
-        if job_type == "process-pdf":
-            result = convert_pdf(event)
-        else:
-            result = convert_document(event)
+        result = load_processor(job_type)(event)
+
+        if not result.success:
+            # Another job or worker processes the task; not an error
+            logger.warning(f"Job skipped: {result.message}")
+            return
         
         logger.info(f"Job completed successfully: {result.message}")
         logger.info(f"Chunks processed: {result.chunks_processed}")
@@ -133,5 +205,40 @@ def run_job():
         sys.exit(1)
 
 
+def main():
+    """Parse command line arguments and run the selected mode."""
+    parser = argparse.ArgumentParser(description="Document processing job runner")
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help="Stay resident and claim scheduled tasks from the database",
+    )
+    parser.add_argument(
+        "--manifest",
+        metavar="PATH",
+        help="Process the DocumentUploadEvents of a JSONL manifest in a process pool",
+    )
+    parser.add_argument(
+        "--summary",
+        metavar="PATH",
+        help="With --manifest, also write the run summary to this JSON file",
+    )
+    args = parser.parse_args()
+
+    if args.manifest:
+        from bulk import run_bulk
+
+        configure_library_logging()
+        failed = run_bulk(args.manifest, get_pipeline_options(), args.summary)
+        sys.exit(1 if failed else 0)
+    elif args.worker:
+        from worker import run_worker
+
+        configure_library_logging()
+        run_worker(get_pipeline_options())
+    else:
+        run_job()
+
+
 if __name__ == "__main__":
-    run_job()
+    main()
@@ -1,12 +1,148 @@
 """
 Centralized logging configuration for the document processor service.
 Provides structured logging with appropriate log levels and formatting.
+
+Records are handed to a queue and written to stdout by a background
+listener thread, so logging never blocks on the output stream. Messages
+are formatted lazily (use logger.debug("... %s", value)) and only for
+records that pass the level check.
+
+Environment Variables:
+    LOG_LEVEL: Level of the service loggers, e.g. "DEBUG" (default: DEBUG in
+        development, WARNING otherwise)
+    LOG_FORMAT: "text" (default) or "json" (one JSON object per line)
+    LOG_SAMPLE_EVERY: Emit every n-th record of sampled hot-loop debug logs,
+        such as per-chunk records (default: 1, all records)
 """
 
 import os
 import sys
+import copy
+import json
+import queue
+import atexit
 import logging
-from typing import Optional
+import threading
+import logging.handlers
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+_TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Fields added to every record, e.g. the task_id of the current job
+_log_context: Dict[str, Any] = {}
+
+# Shared queue and the listener writing its records to stdout
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_listener: Optional[logging.handlers.QueueListener] = None
+_listener_lock = threading.Lock()
+
+
+def _get_default_level() -> int:
+    """Level from LOG_LEVEL, or DEBUG in development and WARNING in production."""
+    configured = os.getenv("LOG_LEVEL")
+    if configured:
+        level = logging.getLevelName(configured.upper())
+        if isinstance(level, int):
+            return level
+
+    is_dev = os.getenv("ENVIRONMENT", "production") == "development"
+    return logging.DEBUG if is_dev else logging.WARNING
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as single-line JSON objects including the log context."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, _DATE_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        task_id = getattr(record, "task_id", None)
+        if task_id:
+            entry["task_id"] = task_id
+        # Structured records (extra={"fields": {...}}) replace the message with their fields
+        fields = getattr(record, "fields", None)
+        if isinstance(fields, dict):
+            entry.pop("message")
+            entry.update(fields)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _ContextFilter(logging.Filter):
+    """Attaches the current log context to records."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in _log_context.items():
+            setattr(record, key, value)
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that renders the message in the calling thread but leaves
+    the final formatting (text or JSON) to the listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _create_output_handler() -> logging.Handler:
+    """stdout handler with the configured formatter."""
+    handler = logging.StreamHandler(sys.stdout)
+    if os.getenv("LOG_FORMAT", "text").lower() == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(_TEXT_FORMAT, datefmt=_DATE_FORMAT))
+    return handler
+
+
+def _ensure_listener() -> None:
+    """Start the background listener thread once per process."""
+    global _listener
+
+    if _listener is None:
+        with _listener_lock:
+            # Double-check after acquiring lock
+            if _listener is None:
+                _listener = logging.handlers.QueueListener(_log_queue, _create_output_handler())
+                _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener; logging restarts it on demand."""
+    global _listener
+
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def _reset_listener_after_fork() -> None:
+    """The listener thread does not survive fork(); start a new one in the child."""
+    global _listener, _listener_lock
+
+    _listener = None
+    _listener_lock = threading.Lock()
+    _ensure_listener()
+
+
+atexit.register(shutdown_logging)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_listener_after_fork)
 
 
 def setup_logger(
@@ -15,55 +151,85 @@ def setup_logger(
 ) -> logging.Logger:
     """
     Configure and return a logger instance with consistent formatting.
-    
+
     Args:
         name: Name of the logger (typically __name__ of the calling module)
-        level: Optional logging level (defaults to INFO in dev, WARNING in prod)
-    
+        level: Optional logging level (defaults to LOG_LEVEL, or DEBUG in dev and WARNING in prod)
+
     Returns:
         Configured logger instance
     """
     if level is None:
-        # Use WARNING level in production, INFO in development
-        is_dev = os.getenv("ENVIRONMENT", "production") == "development"
-        level = logging.DEBUG if is_dev else logging.WARNING
-    
+        level = _get_default_level()
+
     logger = logging.getLogger(name)
-    
+
     # Only configure if not already configured
     if not logger.handlers:
         logger.setLevel(level)
-        
+
         # Prevent propagation to root logger to avoid duplicate logs
         logger.propagate = False
-        
-        # Create console handler with formatting
-        handler = logging.StreamHandler(sys.stdout)
+
+        # Hand records to the background listener instead of writing them here
+        handler = _QueueHandler(_log_queue)
         handler.setLevel(level)
-        
-        # Create formatter with timestamp, level, module name, and message
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        handler.setFormatter(formatter)
-        
+        handler.addFilter(_ContextFilter())
+
         logger.addHandler(handler)
-    
+        _ensure_listener()
+
     return logger
 
 
+@contextmanager
+def log_context(**fields: Any) -> Iterator[None]:
+    """
+    Add fields (e.g. task_id) to every record logged inside the block.
+
+    The context is process-wide, so records from worker threads of the job
+    carry it as well.
+    """
+    previous = dict(_log_context)
+    _log_context.update(fields)
+    try:
+        yield
+    finally:
+        _log_context.clear()
+        _log_context.update(previous)
+
+
+class LogSampler:
+    """
+    Lets every n-th record of a hot loop through.
+
+    Usage:
+        sampler = LogSampler()
+        if logger.isEnabledFor(logging.DEBUG) and sampler.sample():
+            logger.debug("Created chunk %d", idx)
+    """
+
+    def __init__(self, every: Optional[int] = None):
+        self.every = max(1, every if every is not None else int(os.getenv("LOG_SAMPLE_EVERY", "1")))
+        self._count = 0
+
+    def sample(self) -> bool:
+        """True for the first record and every n-th one after it."""
+        self._count += 1
+        return (self._count - 1) % self.every == 0
+
+
 def configure_library_logging(level: Optional[int] = None) -> None:
     """
     Configure log levels for third-party libraries to reduce noise.
-    
+
     Args:
         level: Optional logging level (defaults to INFO in dev, WARNING in prod)
     """
     if level is None:
         is_dev = os.getenv("ENVIRONMENT", "production") == "development"
         level = logging.DEBUG if is_dev else logging.WARNING
-        
+
     # List of libraries to configure
     libraries = [
         "docling",
@@ -71,7 +237,7 @@ def configure_library_logging(level: Optional[int] = None) -> None:
         "RapidOCR",
         "httpx"
     ]
-    
+
     for lib_name in libraries:
         lib_logger = logging.getLogger(lib_name)
         lib_logger.setLevel(level)
@@ -2,7 +2,7 @@
 Data models for the Docling microservice
 """
 
-from .requests import DocumentUploadEvent
+from .requests import DocumentUploadEvent, PipelineOptions
 from .responses import (
     ConversionResponse,
     PdfChunkData,
@@ -15,6 +15,7 @@ from .responses import (
 __all__ = [
     # Request models
     "DocumentUploadEvent",
+    "PipelineOptions",
     # Response models
     "ConversionResponse",
     "PdfChunkData",
@@ -5,7 +5,20 @@ Request models for the Docling microservice
 from pydantic import BaseModel
 from typing import Optional
 
-from docling.datamodel.pipeline_options import PdfPipelineOptions
+
+class PipelineOptions(BaseModel):
+    """
+    PDF pipeline options of an upload.
+
+    Mirrors the do_* flags of Docling's PdfPipelineOptions without importing
+    Docling, which would load the whole PDF pipeline before the job type is
+    known. The converter applies them (see app_state.normalize_pipeline_options).
+    """
+    do_ocr: bool = False
+    do_table_structure: bool = False
+    do_formula_enrichment: bool = False
+    do_code_enrichment: bool = False
+    do_picture_description: bool = False
 
 
 class DocumentUploadEvent(BaseModel):
@@ -16,4 +29,4 @@ class DocumentUploadEvent(BaseModel):
     size: str
     contentType: str
     pageNumberOffset: int
-    pipelineOptions: Optional[PdfPipelineOptions] = None
+    pipelineOptions: Optional[PipelineOptions] = None
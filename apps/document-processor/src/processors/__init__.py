@@ -1,11 +1,24 @@
 """
 FastAPI route handlers for document processing.
+
+The processors are imported on first access, so importing a submodule
+(e.g. processors.process_document) does not load the PDF pipeline.
 """
 
-from .process_document import convert_document
-from .process_pdf import convert_pdf
+import importlib
+
+_PROCESSORS = {
+    "convert_document": "processors.process_document",
+    "convert_pdf": "processors.process_pdf",
+}
 
 __all__ = [
     "convert_document",
     "convert_pdf",
 ]
+
+
+def __getattr__(name: str):
+    if name in _PROCESSORS:
+        return getattr(importlib.import_module(_PROCESSORS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
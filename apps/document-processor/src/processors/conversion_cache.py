@@ -0,0 +1,201 @@
+"""
+Conversion Cache Module
+
+Stores conversion results of a task on disk so that a re-run of the same
+task (e.g. after the job was killed by an OOM, timeout or preemption) does
+not convert the document again:
+
+- In-process conversions store the converted DoclingDocument.
+- Parallel PDF conversions store the chunks of each page window, so only
+  windows that were not converted yet are sent to the worker processes.
+- Streaming PDF conversions store the chunks and the open headings of each
+  page window, so a re-run continues after the last converted window.
+
+Enable it by pointing CONVERSION_CACHE_DIR at a directory that survives the
+job, e.g. a mounted volume. Entries are keyed by task id and conversion
+variant (pipeline options) and are discarded once the task has finished or
+failed.
+"""
+
+import os
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from logger import setup_logger
+from models.responses import PdfChunkData
+
+# Configure logger
+logger = setup_logger(__name__)
+
+
+def get_conversion_cache_dir() -> Optional[Path]:
+    """Get the conversion cache directory, or None if caching is disabled."""
+    cache_dir = os.getenv("CONVERSION_CACHE_DIR", "")
+    return Path(cache_dir) if cache_dir else None
+
+
+def _entry_path(task_id: str, variant: str, suffix: str = "") -> Optional[Path]:
+    cache_dir = get_conversion_cache_dir()
+    if cache_dir is None:
+        return None
+    return cache_dir / f"{task_id}-{variant}{suffix}.json"
+
+
+def _write_atomically(path: Path, write) -> None:
+    """Write through a temporary file so a killed job never leaves a partial entry."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def load_document(task_id: str, variant: str):
+    """
+    Load the cached DoclingDocument of a task.
+
+    Returns:
+        The converted document, or None if it is not cached
+    """
+    path = _entry_path(task_id, variant)
+    if path is None or not path.exists():
+        return None
+
+    from docling_core.types.doc import DoclingDocument
+
+    try:
+        document = DoclingDocument.load_from_json(path)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable conversion cache entry {path}: {e}")
+        return None
+
+    logger.info(f"Reusing cached conversion of task_id={task_id}")
+    return document
+
+
+def store_document(task_id: str, variant: str, document) -> None:
+    """Cache the converted DoclingDocument of a task; failures are only logged."""
+    path = _entry_path(task_id, variant)
+    if path is None:
+        return
+
+    from docling_core.types.doc import ImageRefMode
+
+    try:
+        # Chunking does not need images
+        _write_atomically(
+            path, lambda tmp_path: document.save_as_json(tmp_path, image_mode=ImageRefMode.PLACEHOLDER)
+        )
+    except Exception as e:
+        logger.warning(f"Failed to cache conversion of task_id={task_id}: {e}")
+
+
+def load_window_chunks(task_id: str, variant: str, start: int, end: int) -> Optional[List[PdfChunkData]]:
+    """
+    Load the cached chunks of PDF pages start..end (1-based, inclusive).
+
+    Returns:
+        The window's chunks, or None if the window is not cached
+    """
+    path = _entry_path(task_id, variant, f"-p{start}-{end}")
+    if path is None or not path.exists():
+        return None
+
+    try:
+        with open(path, encoding="utf-8") as f:
+            return [PdfChunkData.model_validate(item) for item in json.load(f)]
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable conversion cache entry {path}: {e}")
+        return None
+
+
+def store_window_chunks(
+    task_id: str,
+    variant: str,
+    start: int,
+    end: int,
+    chunks: List[PdfChunkData],
+) -> None:
+    """Cache the chunks of PDF pages start..end; failures are only logged."""
+    path = _entry_path(task_id, variant, f"-p{start}-{end}")
+    if path is None:
+        return
+
+    def write(tmp_path: Path) -> None:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump([chunk.model_dump() for chunk in chunks], f)
+
+    try:
+        _write_atomically(path, write)
+    except Exception as e:
+        logger.warning(f"Failed to cache page window {start}-{end} of task_id={task_id}: {e}")
+
+
+def load_window_headings(task_id: str, variant: str, start: int, end: int) -> Optional[Dict[int, str]]:
+    """
+    Load the cached headings open at the end of PDF pages start..end.
+
+    Returns:
+        Heading text by level, or None if the window is not cached
+    """
+    path = _entry_path(task_id, variant, f"-p{start}-{end}-headings")
+    if path is None or not path.exists():
+        return None
+
+    try:
+        with open(path, encoding="utf-8") as f:
+            return {int(level): text for level, text in json.load(f).items()}
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable conversion cache entry {path}: {e}")
+        return None
+
+
+def store_window_headings(task_id: str, variant: str, start: int, end: int, headings: Dict[int, str]) -> None:
+    """Cache the headings open at the end of PDF pages start..end; failures are only logged."""
+    path = _entry_path(task_id, variant, f"-p{start}-{end}-headings")
+    if path is None:
+        return
+
+    def write(tmp_path: Path) -> None:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(headings, f)
+
+    try:
+        _write_atomically(path, write)
+    except Exception as e:
+        logger.warning(f"Failed to cache headings of page window {start}-{end} of task_id={task_id}: {e}")
+
+
+def find_window_end(task_id: str, variant: str, start: int) -> Optional[int]:
+    """
+    Find a cached streaming window starting at page start.
+
+    Returns:
+        The last page of the cached window, or None if there is none
+    """
+    prefix = f"{task_id}-{variant}-p{start}-"
+    path = _entry_path(task_id, variant, f"-p{start}-*-headings")
+    if path is None or not path.parent.is_dir():
+        return None
+
+    for entry in path.parent.glob(path.name):
+        end = entry.name[len(prefix):-len("-headings.json")]
+        if end.isdigit():
+            return int(end)
+    return None
+
+
+def discard_task_entries(task_id: str) -> None:
+    """Remove all cached conversion results of a task."""
+    cache_dir = get_conversion_cache_dir()
+    if cache_dir is None or not cache_dir.is_dir():
+        return
+
+    for path in cache_dir.glob(f"{task_id}-*.json"):
+        try:
+            path.unlink()
+        except OSError as e:
+            logger.warning(f"Failed to remove conversion cache entry {path}: {e}")
@@ -0,0 +1,293 @@
+"""
+Parallel PDF Conversion Module
+
+This module splits a PDF into page windows and converts the windows in a
+process pool. Each worker process keeps its own warm DocumentConverter and
+returns the converted window without page images. The windows are chunked
+in page order in the job process: like in the streaming path (see
+processors.streaming_pdf), the headings open at the end of a window are
+inserted at the start of the next one, so its first chunks keep their
+section context.
+
+Enable it with PDF_CONVERSION_WORKERS greater than 1. PDF_PAGE_WINDOW_SIZE
+controls the number of pages converted per window (default: 20). Documents
+that fit into a single window are converted in-process as before. With
+CONVERSION_CACHE_DIR set, converted windows are cached, so a re-run of the
+task only converts the windows that were not converted yet (windows are
+cached with their chunks and open headings).
+
+Worker processes are started once and reused by later documents: pools are
+kept per pipeline option set, at most PDF_CONVERSION_POOLS of them (default:
+1, least recently used idle pools are shut down first), and shut down when
+the process exits.
+"""
+
+import os
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import OrderedDict, deque
+from typing import TYPE_CHECKING, Deque, Dict, Generator, List, Optional, Tuple, Union
+
+from app_state import ConverterKey, normalize_pipeline_options
+from logger import setup_logger
+from models.responses import PdfChunkData
+from processors.conversion_cache import (
+    load_window_chunks,
+    load_window_headings,
+    store_window_chunks,
+    store_window_headings,
+)
+
+if TYPE_CHECKING:
+    from docling_core.transforms.chunker.hybrid_chunker import HybridChunker
+    from docling_core.types.doc import DoclingDocument
+
+# Configure logger
+logger = setup_logger(__name__)
+
+# Per-process converter, created by the pool initializer
+_worker_converter = None
+
+# Process pools shared by all documents, by normalized pipeline options,
+# and the number of documents currently converted by each
+_pools: "OrderedDict[ConverterKey, ProcessPoolExecutor]" = OrderedDict()
+_pool_users: Dict[ConverterKey, int] = {}
+_pools_lock = threading.Lock()
+
+
+def get_conversion_workers() -> int:
+    """Get the number of worker processes used for PDF conversion."""
+    return max(1, int(os.getenv("PDF_CONVERSION_WORKERS", "1")))
+
+
+def get_page_window_size() -> int:
+    """Get the number of pages converted per window."""
+    return max(1, int(os.getenv("PDF_PAGE_WINDOW_SIZE", "20")))
+
+
+def is_parallel_conversion_enabled(page_count: int) -> bool:
+    """Check whether a PDF with page_count pages should be converted in parallel."""
+    return get_conversion_workers() > 1 and page_count > get_page_window_size()
+
+
+def get_max_conversion_pools() -> int:
+    """Get the number of process pools (pipeline option sets) kept alive."""
+    return max(1, int(os.getenv("PDF_CONVERSION_POOLS", "1")))
+
+
+def _acquire_pool(key: ConverterKey, pipeline_options: Optional[object]) -> ProcessPoolExecutor:
+    """Get the pool for key, starting it on first use; release it with _release_pool."""
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            logger.info(f"Starting {get_conversion_workers()} PDF conversion processes for pipeline options {key}")
+            # Spawn instead of fork: the pool may be started while other threads
+            # (pipeline stages, HTTP clients) are running
+            pool = ProcessPoolExecutor(
+                max_workers=get_conversion_workers(),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(pipeline_options,),
+            )
+            _pools[key] = pool
+        _pools.move_to_end(key)
+        _pool_users[key] = _pool_users.get(key, 0) + 1
+        _evict_idle_pools()
+        return pool
+
+
+def _release_pool(key: ConverterKey, pool: ProcessPoolExecutor, broken: bool = False) -> None:
+    """Release a pool acquired with _acquire_pool; a broken pool is replaced on next use."""
+    with _pools_lock:
+        _pool_users[key] -= 1
+        if broken and _pools.get(key) is pool:
+            del _pools[key]
+            pool.shutdown(wait=False, cancel_futures=True)
+        if not _pool_users[key]:
+            del _pool_users[key]
+        _evict_idle_pools()
+
+
+def _evict_idle_pools() -> None:
+    """Shut down least recently used idle pools beyond PDF_CONVERSION_POOLS (lock held)."""
+    for key in list(_pools):
+        if len(_pools) <= get_max_conversion_pools():
+            return
+        if not _pool_users.get(key):
+            logger.info(f"Shutting down PDF conversion processes for pipeline options {key}")
+            _pools.pop(key).shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_conversion_pools() -> None:
+    """Shut down all conversion processes; pools are started again on demand."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def get_pdf_page_count(path: str) -> int:
+    """Read the page count of a PDF without converting it."""
+    import pypdfium2
+
+    pdf = pypdfium2.PdfDocument(path)
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def get_page_windows(page_count: int, window_size: int) -> List[Tuple[int, int]]:
+    """Split 1-based pages into inclusive (start, end) windows."""
+    return [
+        (start, min(start + window_size - 1, page_count))
+        for start in range(1, page_count + 1, window_size)
+    ]
+
+
+def get_window_page_shift(document, start: int) -> int:
+    """
+    Offset to add to the page numbers of a converted page window.
+
+    Page numbers are expected to stay absolute; this shifts them if the
+    converter numbered the window's pages from 1.
+    """
+    pages = document.pages
+    return start - min(pages) if pages else 0
+
+
+def _init_worker(pipeline_options: Optional[object]) -> None:
+    """Pool initializer: build the converter once per process."""
+    global _worker_converter
+
+    from processors.process_pdf import _create_converter_with_options
+
+    _worker_converter = _create_converter_with_options(pipeline_options)
+
+
+def _convert_window(path: str, start: int, end: int) -> "DoclingDocument":
+    """Convert pages start..end (1-based, inclusive) of a PDF, without page images."""
+    from processors.process_pdf import release_page_images
+
+    document = _worker_converter.convert(path, page_range=(start, end)).document
+    release_page_images(document)
+    return document
+
+
+def _chunk_window(
+    document: "DoclingDocument",
+    start: int,
+    headings: Dict[int, str],
+    chunker: "HybridChunker",
+) -> Tuple[List[PdfChunkData], Dict[int, str]]:
+    """
+    Chunk a converted window after the headings still open from the previous one.
+
+    Returns:
+        The window's chunks and the headings open at its end
+    """
+    from processors.process_pdf import _generate_pdf_chunks
+    from processors.streaming_pdf import _insert_open_headings, get_open_headings
+
+    _insert_open_headings(document, headings)
+    page_shift = get_window_page_shift(document, start)
+
+    chunks = []
+    for chunk in _generate_pdf_chunks(document, chunker):
+        if page_shift:
+            chunk.page_index += page_shift
+        chunks.append(chunk)
+
+    return chunks, get_open_headings(document)
+
+
+def generate_pdf_chunks_parallel(
+    path: str,
+    page_count: int,
+    pipeline_options: Optional[object] = None,
+    task_id: Optional[str] = None,
+    variant: str = "pdf",
+) -> Generator[PdfChunkData, None, None]:
+    """Generator that converts page windows in parallel and yields chunks in page order.
+
+    At most two windows per worker are in flight, so converted but not yet
+    consumed windows stay bounded for long documents.
+
+    Args:
+        path: Path to the PDF file
+        page_count: Number of pages in the PDF
+        pipeline_options: Optional pipeline options for the converters
+        task_id: Task whose converted windows are cached, if given
+        variant: Conversion variant identifying the pipeline options in cache keys
+
+    Yields:
+        PdfChunkData with chunk indexes numbered across the whole document
+    """
+    workers = get_conversion_workers()
+    windows = get_page_windows(page_count, get_page_window_size())
+    logger.info(f"Converting {page_count} pages in {len(windows)} windows using {workers} worker processes")
+
+    from docling_core.transforms.chunker.hybrid_chunker import HybridChunker
+    from utils.tokenizer import get_tokenizer
+
+    chunker = HybridChunker(tokenizer=get_tokenizer())
+    key = normalize_pipeline_options(pipeline_options)
+    executor = _acquire_pool(key, pipeline_options)
+    broken = False
+
+    # (start, end, future) of submitted windows and (start, end, (chunks,
+    # open headings)) of cached ones, in page order
+    pending: Deque[Tuple[int, int, Union[Future, Tuple[List[PdfChunkData], Dict[int, str]]]]] = deque()
+    next_window = 0
+    chunk_index = 0
+    headings: Dict[int, str] = {}
+
+    try:
+        while next_window < len(windows) or pending:
+            while next_window < len(windows) and len(pending) < workers * 2:
+                start, end = windows[next_window]
+                cached_chunks = cached_headings = None
+                if task_id:
+                    cached_chunks = load_window_chunks(task_id, variant, start, end)
+                    cached_headings = load_window_headings(task_id, variant, start, end)
+                if cached_chunks is not None and cached_headings is not None:
+                    logger.debug("Reusing cached conversion of pages %d-%d", start, end)
+                    pending.append((start, end, (cached_chunks, cached_headings)))
+                else:
+                    pending.append((start, end, executor.submit(_convert_window, path, start, end)))
+                next_window += 1
+
+            start, end, window = pending.popleft()
+            if isinstance(window, Future):
+                document = window.result()
+                window_chunks, window_headings = _chunk_window(document, start, headings, chunker)
+                del document
+                if task_id:
+                    # Cached before the chunks are renumbered below
+                    store_window_chunks(task_id, variant, start, end, window_chunks)
+                    store_window_headings(task_id, variant, start, end, window_headings)
+            else:
+                window_chunks, window_headings = window
+            headings = window_headings
+            logger.debug("Chunked pages %d-%d into %d chunks", start, end, len(window_chunks))
+
+            for chunk in window_chunks:
+                chunk.chunk_index = chunk_index
+                chunk_index += 1
+                yield chunk
+    except BrokenProcessPool:
+        broken = True
+        raise
+    finally:
+        # The pool outlives the document; drop the windows it no longer needs
+        for _, _, window in pending:
+            if isinstance(window, Future):
+                window.cancel()
+        _release_pool(key, executor, broken)
+
+
+atexit.register(shutdown_conversion_pools)
@@ -0,0 +1,283 @@
+"""
+Batch Processing Pipeline
+
+This module drives the chunk → embed → insert loop shared by the PDF and
+document processors. Two modes are supported:
+
+- Serial (default): each batch is embedded and uploaded before the next
+  chunk is pulled from the generator.
+- Pipelined: chunk generation, embedding and database insertion run in
+  separate stages connected by bounded queues, so wall-clock time approaches
+  the slowest stage instead of the sum of all three.
+
+Enable the pipelined mode with PIPELINED_PROCESSING=true. The queue depth
+(in batches) between two stages is controlled by PIPELINE_QUEUE_SIZE.
+When a stage fails, the other stages are given PIPELINE_SHUTDOWN_TIMEOUT
+seconds (default: 10) to stop; a stage still busy after that, e.g. inside
+a long conversion, is left to finish in the background.
+
+State the chunk generator produces as a side effect (e.g. the page windows
+of a streaming conversion) is captured by batch_state in the generating
+thread and handed to insert_fn together with its batch, so the insert
+stage never reads objects the generator is still mutating.
+
+Unless a fixed batch size is given, batches are sized by tokens so that
+each one fills a round of concurrent embedding requests (see
+embeddings.batching).
+"""
+
+import os
+import queue
+import threading
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from embeddings.batching import iter_processing_batches
+from logger import setup_logger
+
+# Configure logger
+logger = setup_logger(__name__)
+
+T = TypeVar("T")
+
+EmbedFn = Callable[[List[T]], Any]
+# Called with a batch, its embeddings and, if batch_state is given, its state
+InsertFn = Callable[..., None]
+
+# Marks the end of a stage's output
+_END = object()
+
+# Interval used to re-check the cancellation flag while blocked on a queue
+_POLL_INTERVAL = 0.1
+
+
+class PipelineCancelled(Exception):
+    """Raised inside a stage when the pipeline is shutting down."""
+
+
+class _StageFailure:
+    """Wraps an exception raised by an upstream stage."""
+
+    def __init__(self, stage: str, error: BaseException):
+        self.stage = stage
+        self.error = error
+
+
+def is_pipelined_processing_enabled() -> bool:
+    """Check whether the pipelined processing mode is enabled."""
+    return os.getenv("PIPELINED_PROCESSING", "").lower() == "true"
+
+
+def _get_queue_size() -> int:
+    """Get the bounded queue depth between two pipeline stages."""
+    return max(1, int(os.getenv("PIPELINE_QUEUE_SIZE", "2")))
+
+
+def _get_shutdown_timeout() -> float:
+    """Get the seconds to wait for each stage thread to stop after a failure."""
+    return max(0.0, float(os.getenv("PIPELINE_SHUTDOWN_TIMEOUT", "10")))
+
+
+def _iter_batches(chunks: Iterable[T], batch_size: int) -> Iterator[List[T]]:
+    """Group chunks into lists of at most batch_size items."""
+    batch: List[T] = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []  # Start a new list to free the previous batch
+
+    if batch:
+        yield batch
+
+
+def _chunk_text(chunk: Any) -> str:
+    return chunk.contextualized_content
+
+
+def _with_state(
+    batches: Iterator[List[T]],
+    batch_state: Optional[Callable[[], Any]],
+) -> Iterator[Tuple[List[T], Any]]:
+    """Pair each batch with the state captured right after it was generated."""
+    try:
+        for batch in batches:
+            yield batch, batch_state() if batch_state is not None else None
+    finally:
+        close = getattr(batches, "close", None)
+        if close is not None:
+            close()
+
+
+def _insert(insert_fn: InsertFn, batch: List[T], embeddings: Any, state: Any, with_state: bool) -> None:
+    if with_state:
+        insert_fn(batch, embeddings, state)
+    else:
+        insert_fn(batch, embeddings)
+
+
+def process_in_batches(
+    chunks: Iterable[T],
+    embed_fn: EmbedFn,
+    insert_fn: InsertFn,
+    batch_size: Optional[int] = None,
+    pipelined: Optional[bool] = None,
+    batch_state: Optional[Callable[[], Any]] = None,
+) -> int:
+    """Embed and insert chunks batch by batch.
+
+    Args:
+        chunks: Iterable (usually a generator) yielding chunks with a
+            contextualized_content text
+        embed_fn: Computes the embeddings for a batch of chunks
+        insert_fn: Stores a batch together with its embeddings (and its
+            state, if batch_state is given); batches are always inserted in
+            generation order
+        batch_size: Fixed number of chunks per batch; by default batches
+            are sized by token budget
+        pipelined: Force a mode; defaults to PIPELINED_PROCESSING
+        batch_state: Called in the generating thread after each batch is
+            complete; must return a value that is not mutated afterwards
+
+    Returns:
+        Total number of chunks processed
+    """
+    if pipelined is None:
+        pipelined = is_pipelined_processing_enabled()
+
+    if batch_size is not None:
+        batches = _iter_batches(chunks, batch_size)
+    else:
+        batches = iter_processing_batches(chunks, _chunk_text)
+    stateful_batches = _with_state(batches, batch_state)
+    with_state = batch_state is not None
+
+    if pipelined:
+        logger.debug("Processing batches in pipelined mode")
+        return _run_pipelined(stateful_batches, embed_fn, insert_fn, with_state)
+
+    logger.debug("Processing batches in serial mode")
+    return _run_serial(stateful_batches, embed_fn, insert_fn, with_state)
+
+
+def _run_serial(
+    batches: Iterator[Tuple[List[T], Any]],
+    embed_fn: EmbedFn,
+    insert_fn: InsertFn,
+    with_state: bool,
+) -> int:
+    """Embed and insert each batch before pulling the next one."""
+    total_chunks_processed = 0
+
+    for batch, state in batches:
+        embeddings = embed_fn(batch)
+        _insert(insert_fn, batch, embeddings, state, with_state)
+        total_chunks_processed += len(batch)
+        logger.info("Processed batch of %d chunks (total: %d)", len(batch), total_chunks_processed)
+
+    return total_chunks_processed
+
+
+def _run_pipelined(
+    batches: Iterator[Tuple[List[T], Any]],
+    embed_fn: EmbedFn,
+    insert_fn: InsertFn,
+    with_state: bool,
+) -> int:
+    """Run generation, embedding and insertion as concurrent stages.
+
+    Generation and embedding run in worker threads, insertion runs in the
+    calling thread. Bounded queues provide backpressure: a fast producer
+    blocks once the downstream queue is full. The first error raised by any
+    stage cancels the other stages and is re-raised to the caller once the
+    stages stopped, or after PIPELINE_SHUTDOWN_TIMEOUT seconds per stage.
+    """
+    queue_size = _get_queue_size()
+    embed_queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+    insert_queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+    cancelled = threading.Event()
+
+    def put(target: "queue.Queue[Any]", item: Any) -> None:
+        while True:
+            if cancelled.is_set():
+                raise PipelineCancelled()
+            try:
+                target.put(item, timeout=_POLL_INTERVAL)
+                return
+            except queue.Full:
+                continue
+
+    def get(source: "queue.Queue[Any]") -> Any:
+        while True:
+            if cancelled.is_set():
+                raise PipelineCancelled()
+            try:
+                return source.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+
+    def forward_failure(target: "queue.Queue[Any]", failure: _StageFailure) -> None:
+        try:
+            put(target, failure)
+        except PipelineCancelled:
+            pass
+
+    def generate_stage() -> None:
+        try:
+            for batch in batches:
+                put(embed_queue, batch)
+            put(embed_queue, _END)
+        except PipelineCancelled:
+            pass
+        except BaseException as error:
+            forward_failure(embed_queue, _StageFailure("generate", error))
+        finally:
+            # Closing the generator from its own thread releases the converter result
+            close = getattr(batches, "close", None)
+            if close is not None:
+                close()
+
+    def embed_stage() -> None:
+        try:
+            while True:
+                item = get(embed_queue)
+                if item is _END or isinstance(item, _StageFailure):
+                    put(insert_queue, item)
+                    return
+                batch, state = item
+                put(insert_queue, (batch, embed_fn(batch), state))
+        except PipelineCancelled:
+            pass
+        except BaseException as error:
+            forward_failure(insert_queue, _StageFailure("embed", error))
+
+    threads = [
+        threading.Thread(target=generate_stage, name="pipeline-generate", daemon=True),
+        threading.Thread(target=embed_stage, name="pipeline-embed", daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    total_chunks_processed = 0
+    try:
+        while True:
+            item = get(insert_queue)
+            if item is _END:
+                break
+            if isinstance(item, _StageFailure):
+                logger.error(f"Pipeline stage '{item.stage}' failed: {item.error}")
+                raise item.error
+
+            batch, embeddings, state = item
+            _insert(insert_fn, batch, embeddings, state, with_state)
+            total_chunks_processed += len(batch)
+            logger.info("Processed batch of %d chunks (total: %d)", len(batch), total_chunks_processed)
+    finally:
+        cancelled.set()
+        timeout = _get_shutdown_timeout()
+        for thread in threads:
+            thread.join(timeout)
+            if thread.is_alive():
+                # Daemon threads; the stage stops at its next cancellation check
+                logger.warning(f"Pipeline stage thread '{thread.name}' still running after {timeout:g}s, not waiting")
+
+    return total_chunks_processed
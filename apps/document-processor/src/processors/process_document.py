@@ -3,17 +3,23 @@ Document Processing Module
 
 This module handles non-PDF document processing with chunk extraction,
 embeddings generation, and database storage.
+
+Markdown, plain text, CSV and simple HTML files are chunked without Docling
+(see processors.text_chunker); other formats are converted with Docling and
+chunked with the HybridChunker.
 """
 
-import io
-from typing import List, Generator
+import logging
+from typing import TYPE_CHECKING, List, Generator, Optional
 
-from docling_core.types.io import DocumentStream
-from docling_core.transforms.chunker.hybrid_chunker import HybridChunker
+import numpy as np
 
-from app_state import get_converter
+from app_state import convert_document_file
 
-from utils.utils import create_embedded_chunk, handle_processing_error
+from utils.utils import handle_processing_error
+from utils.fingerprint import compute_file_fingerprint, is_file_deduplication_enabled
+from utils.instrumentation import instrument_iterable, instrumented_job, span
+from utils.tokenizer import get_max_tokens
 
 from models.requests import DocumentUploadEvent
 from models.responses import (
@@ -21,70 +27,110 @@ from models.responses import (
     ProcessingResponse
 )
 
-from access_clients import get_storage_client
-from db.postgres import (
-    upload_to_postgres_db,
-    update_status_to_processing,
-    update_status_to_finished
+from access_clients import download_to_temp_file
+from db.postgres import ChunkBatch, IngestionSession, TaskAlreadyClaimedError
+from embeddings.embeddings_client import (
+    embed_content,
+    get_embedding_cache_stats,
+    reset_embedding_cache_stats,
+    reset_retry_budget,
+)
+from processors.pipeline import process_in_batches
+from processors.conversion_cache import discard_task_entries, load_document, store_document
+from processors.text_chunker import (
+    detect_text_format,
+    generate_text_chunks,
+    get_max_chunk_tokens,
+    is_text_fast_path_enabled,
 )
-from embeddings.embeddings_client import embed_content
 
-from logger import setup_logger
+from logger import LogSampler, setup_logger
+
+if TYPE_CHECKING:
+    from docling_core.transforms.chunker.hybrid_chunker import HybridChunker
 
 # Configure logger
 logger = setup_logger(__name__)
 
 
+@instrumented_job("process-document")
 def convert_document(event: DocumentUploadEvent) -> ProcessingResponse:
     """Full document processing workflow with embeddings and database storage.
     
-    Processes chunks in batches of 30 to optimize memory usage.
-    Each batch is embedded and uploaded before moving to the next.
+    Processes chunks in token-sized batches (see embeddings.batching).
+    Batches are embedded and uploaded serially, or concurrently with chunk
+    generation when PIPELINED_PROCESSING is enabled (see processors.pipeline).
+    With RESUMABLE_INGESTION and CONVERSION_CACHE_DIR, a re-run of the task
+    skips stored chunks and the conversion (see db.postgres.IngestionSession
+    and processors.conversion_cache).
     """
     task_id = event.taskId
     course_id, shortened_filename = event.name.split("/")
     
-    batch_size = 30
-    total_chunks_processed = 0
-    is_first_batch = True
-
+    session: Optional[IngestionSession] = None
     try:
-        logger.info(f"Updating task status to 'processing' for task_id={task_id}")
-        update_status_to_processing(task_id)
-
-        logger.info(f"Converting document to chunks: {event.name}")
-        chunk_generator = _create_document_chunk_generator("files-bucket", event.name)
-
-        # Process chunks in batches of 30
-        batch: List[DocumentChunkData] = []
-        for chunk in chunk_generator:
-            batch.append(chunk)
-            
-            if len(batch) >= batch_size:
-                _process_and_upload_document_batch(
-                    batch, task_id, course_id, shortened_filename,
-                    int(event.size), event.pageNumberOffset, is_first_batch
-                )
-                total_chunks_processed += len(batch)
-                logger.info(f"Processed batch of {len(batch)} chunks (total: {total_chunks_processed})")
-                is_first_batch = False
-                batch = []  # Clear batch to free memory
-
-        # Process remaining chunks
-        if batch:
-            _process_and_upload_document_batch(
-                batch, task_id, course_id, shortened_filename,
-                int(event.size), event.pageNumberOffset, is_first_batch
-            )
-            total_chunks_processed += len(batch)
-            logger.info(f"Processed final batch of {len(batch)} chunks (total: {total_chunks_processed})")
-
-        if total_chunks_processed == 0:
-            logger.warning(f"No content chunks generated from document: {event.name}")
-            raise ValueError("No content chunks generated from document")
-
-        logger.info(f"Updating task status to 'finished' for task_id={task_id}")
-        update_status_to_finished(task_id)
+        with IngestionSession(
+            task_id, course_id, shortened_filename,
+            int(event.size), event.pageNumberOffset,
+            _get_chunking_signature()
+        ) as session:
+            try:
+                logger.info(f"Updating task status to 'processing' for task_id={task_id}")
+                with span("status"):
+                    session.start()
+                reset_embedding_cache_stats()
+                reset_retry_budget()
+
+                with download_to_temp_file("files-bucket", event.name) as downloaded:
+                    fingerprint = None
+                    if is_file_deduplication_enabled():
+                        with span("fingerprint", items=downloaded.size):
+                            fingerprint = compute_file_fingerprint(
+                                downloaded.path, _get_document_variant(downloaded.path, event.name)
+                            )
+                        with span("dedup") as dedup_span:
+                            cloned_chunks = session.reuse_duplicate_file(fingerprint)
+                            dedup_span.add_items(cloned_chunks or 0)
+                        if cloned_chunks:
+                            logger.info(f"Updating task status to 'finished' for task_id={task_id}")
+                            with span("status"):
+                                session.finish(fingerprint)
+                            return ProcessingResponse(
+                                success=True,
+                                message=f"Successfully processed document {shortened_filename} (reused identical file)",
+                                chunks_processed=cloned_chunks
+                            )
+
+                    logger.info(f"Converting document to chunks: {event.name}")
+                    chunk_generator = _create_document_chunk_generator(downloaded.path, event.name, task_id)
+
+                    chunk_generator = session.pending_chunks(chunk_generator)
+
+                    def upload_batch(batch: List[DocumentChunkData], embeddings: np.ndarray) -> None:
+                        _upload_document_batch(session, batch, embeddings)
+
+                    # Process chunks in token-sized batches
+                    total_chunks_processed = session.resumed_chunk_count + process_in_batches(
+                        instrument_iterable("chunk", chunk_generator), _embed_document_batch, upload_batch
+                    )
+
+                    if total_chunks_processed == 0:
+                        logger.warning(f"No content chunks generated from document: {event.name}")
+                        raise ValueError("No content chunks generated from document")
+
+                    logger.info(f"Updating task status to 'finished' for task_id={task_id}")
+                    with span("status"):
+                        session.finish(fingerprint)
+            except TaskAlreadyClaimedError:
+                raise
+            except Exception as error:
+                # Fail the task while the session holds its lock, so that no
+                # worker reclaims it while its source file is deleted
+                handle_processing_error("files-bucket", event, error, session)
+                raise
+
+        discard_task_entries(task_id)
+        logger.info(f"Embedding cache stats for task_id={task_id}: {get_embedding_cache_stats()}")
 
         return ProcessingResponse(
             success=True,
@@ -92,55 +138,92 @@ def convert_document(event: DocumentUploadEvent) -> ProcessingResponse:
             chunks_processed=total_chunks_processed
         )
 
+    except TaskAlreadyClaimedError as error:
+        # Another job processes the task; its source file and cache entries stay
+        logger.warning(str(error))
+        return ProcessingResponse(success=False, message=str(error), chunks_processed=0)
+
     except Exception as error:
-        handle_processing_error("files-bucket", event, error)
+        if session is None:
+            # The session could not be opened
+            handle_processing_error("files-bucket", event, error)
+        discard_task_entries(task_id)
         raise error
 
 
-def _process_and_upload_document_batch(
+def _get_chunking_signature() -> str:
+    """Settings the chunks of a document depend on, stored with resume checkpoints (see IngestionSession)."""
+    return (
+        f"document;fast_path={is_text_fast_path_enabled()};"
+        f"text_max_tokens={get_max_chunk_tokens()};max_tokens={get_max_tokens()}"
+    )
+
+
+def _get_file_extension(key: str) -> str:
+    """Get the lowercase extension of a file key."""
+    if "." in key:
+        file_extension = key.split(".")[-1].lower()
+        logger.debug(f"Detected file extension: {file_extension}")
+        return file_extension
+
+    logger.error(f"File key does not contain an extension: {key}")
+    raise ValueError("File key does not contain an extension")
+
+
+def _get_fast_path_format(file_path: str, key: str) -> Optional[str]:
+    """Get the text fast-path format of a document, or None if it is converted with Docling."""
+    file_extension = _get_file_extension(key)
+    return detect_text_format(file_path, file_extension) if is_text_fast_path_enabled() else None
+
+
+def _get_document_variant(file_path: str, key: str) -> str:
+    """Fingerprint variant of a document; the text fast path and Docling produce different chunks."""
+    return "document-text" if _get_fast_path_format(file_path, key) is not None else "document"
+
+
+def _embed_document_batch(batch: List[DocumentChunkData]) -> np.ndarray:
+    """Generate embeddings for a batch of document chunks."""
+    logger.debug("Generating embeddings for batch of %d chunks", len(batch))
+    chunk_contents = [c.contextualized_content for c in batch]
+    with span("embed", items=len(batch)):
+        return embed_content(chunk_contents)
+
+
+def _upload_document_batch(
+    session: IngestionSession,
     batch: List[DocumentChunkData],
-    task_id: str,
-    course_id: str,
-    filename: str,
-    file_size: int,
-    page_number_offset: int,
-    is_first_batch: bool
+    embeddings: np.ndarray
 ) -> None:
-    """Embed and upload a batch of document chunks to the database."""
-    logger.debug(f"Generating embeddings for batch of {len(batch)} chunks")
-    chunk_contents = [c.contextualized_content for c in batch]
-    embeddings_list = embed_content(chunk_contents)
-
-    embedded_chunks = [
-        create_embedded_chunk(chunk, embeddings_list[idx])
-        for idx, chunk in enumerate(batch)
-    ]
-
-    logger.debug(f"Uploading batch of {len(embedded_chunks)} chunks to database")
-    upload_to_postgres_db(
-        task_id, course_id, filename,
-        file_size, embedded_chunks, page_number_offset,
-        None, is_first_batch
-    )
+    """Upload a batch of embedded document chunks to the database."""
+    chunk_batch = ChunkBatch.from_chunks(batch, embeddings, session.task_id)
+
+    logger.debug("Uploading batch of %d chunks to database", len(chunk_batch))
+    with span("insert", items=len(chunk_batch)):
+        session.insert_chunks(chunk_batch)
 
 
 from typing import Generator
 
 
 def _generate_document_chunks(
-    result,
-    chunker: HybridChunker
+    document,
+    chunker: "HybridChunker"
 ) -> Generator[DocumentChunkData, None, None]:
-    """Generator that yields document chunks one at a time for memory efficiency."""
-    chunk_iter = chunker.chunk(dl_doc=result.document)
+    """Generator that yields document chunks of a DoclingDocument one at a time for memory efficiency."""
+    chunk_iter = chunker.chunk(dl_doc=document)
+    sampler = LogSampler()
 
     for idx, chunk in enumerate(chunk_iter):
         contextualized_text = chunker.contextualize(chunk=chunk)
 
-        logger.debug(f"Created chunk {idx}: {contextualized_text[:60]}... (length: {len(contextualized_text)} characters)")
+        if logger.isEnabledFor(logging.DEBUG) and sampler.sample():
+            logger.debug(
+                "Created chunk %d: %.60s... (length: %d characters)",
+                idx, contextualized_text, len(contextualized_text)
+            )
 
         if not contextualized_text.strip():
-            logger.debug(f"Skipping empty chunk at index {idx}")
+            logger.debug("Skipping empty chunk at index %d", idx)
             continue
 
         yield DocumentChunkData(
@@ -150,37 +233,35 @@ def _generate_document_chunks(
 
 
 def _create_document_chunk_generator(
-    bucket: str,
-    key: str
+    file_path: str,
+    key: str,
+    task_id: Optional[str] = None
 ) -> Generator[DocumentChunkData, None, None]:
     """Create a generator for document chunks.
     
     Returns a generator instead of a list to enable memory-efficient batch processing.
+    The document is read from file_path, which keeps the extension of the key.
+    If task_id is given, the conversion is cached (see processors.conversion_cache).
     """
-    logger.debug(f"Fetching document from storage: bucket={bucket}, key={key}")
-    storage_client = get_storage_client()
-    file_content = storage_client.get_object_bytes(bucket, key)
-    logger.debug(f"Retrieved document from storage (size: {len(file_content)} bytes)")
-
-    if "." in key:
-        file_extension = key.split(".")[-1].lower()
-        logger.debug(f"Detected file extension: {file_extension}")
-    else:
-        logger.error(f"File key does not contain an extension: {key}")
-        raise ValueError("File key does not contain an extension")
-
-    buf = io.BytesIO(file_content)
-    source = DocumentStream(name=f"document.{file_extension}", stream=buf)
-
-    logger.debug(f"Converting document using Docling converter")
-    converter = get_converter()
-    result = converter.convert(source)
+    text_format = _get_fast_path_format(file_path, key)
+    if text_format is not None:
+        logger.debug(f"Chunking {text_format} document without Docling")
+        return generate_text_chunks(file_path, text_format)
+
+    document = load_document(task_id, "document") if task_id else None
+
+    if document is None:
+        logger.debug(f"Converting document using Docling converter")
+        with span("convert", items=1):
+            document = convert_document_file(file_path).document
+        if task_id:
+            store_document(task_id, "document", document)
     logger.debug(f"Document conversion completed")
 
+    from docling_core.transforms.chunker.hybrid_chunker import HybridChunker
+    from utils.tokenizer import get_tokenizer
+
     logger.debug(f"Initializing chunker and creating chunk generator")
-    # The following code may raise the error
-    # 'Token indices sequence length is longer than the specified maximum sequence length for this model (531 > 512)'
-    # According to https://docling-project.github.io/docling/examples/hybrid_chunking/#basic-usage, this is a false alarm
-    chunker = HybridChunker()
+    chunker = HybridChunker(tokenizer=get_tokenizer())
 
-    return _generate_document_chunks(result, chunker)
+    return _generate_document_chunks(document, chunker)
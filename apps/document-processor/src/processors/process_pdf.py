@@ -5,21 +5,24 @@ This module handles PDF document processing with chunk extraction,
 embeddings generation, and database storage.
 """
 
-import io
+import logging
 from typing import Optional, List, Tuple, Generator
 
-from docling_core.types.io import DocumentStream
+import numpy as np
+
 from docling_core.transforms.chunker.hierarchical_chunker import DocChunk
 from docling_core.transforms.chunker.hybrid_chunker import HybridChunker
 from docling_core.types.doc.base import BoundingBox
 
-from docling.datamodel.base_models import InputFormat
-from docling.datamodel.pipeline_options import PdfPipelineOptions
-from docling.document_converter import DocumentConverter, PdfFormatOption
+from docling.document_converter import DocumentConverter
 
-from app_state import get_converter
+from app_state import get_converter, get_converter_for_options, normalize_pipeline_options
 
-from utils.utils import create_embedded_chunk, handle_processing_error
+from utils.utils import handle_processing_error
+from utils.tokenizer import get_max_tokens, get_tokenizer
+from utils.fingerprint import compute_file_fingerprint, is_file_deduplication_enabled
+from utils.instrumentation import instrument_iterable, instrumented_job, span
+from utils.memory import get_memory_budget_bytes
 
 from models.requests import DocumentUploadEvent
 from models.responses import (
@@ -27,101 +30,134 @@ from models.responses import (
     ProcessingResponse
 )
 
-from access_clients import get_storage_client
-from db.postgres import (
-    upload_to_postgres_db,
-    update_status_to_processing,
-    update_status_to_finished
+from access_clients import download_to_temp_file
+from db.postgres import ChunkBatch, IngestionSession, TaskAlreadyClaimedError
+from embeddings.embeddings_client import (
+    embed_content,
+    get_embedding_cache_stats,
+    reset_embedding_cache_stats,
+    reset_retry_budget,
+)
+from processors.pipeline import process_in_batches
+from processors.conversion_cache import discard_task_entries, load_document, store_document
+from processors.parallel_pdf import (
+    generate_pdf_chunks_parallel,
+    get_conversion_workers,
+    get_page_window_size,
+    get_pdf_page_count,
+    is_parallel_conversion_enabled,
+)
+from processors.streaming_pdf import (
+    generate_pdf_chunks_streaming,
+    get_min_streaming_pages,
+    is_streaming_conversion_enabled,
 )
-from embeddings.embeddings_client import embed_content
 
-from logger import setup_logger
+from logger import LogSampler, setup_logger
 
 # Configure logger
 logger = setup_logger(__name__)
 
 
 def _create_converter_with_options(pipeline_options: Optional[object]) -> DocumentConverter:
-    """Create a DocumentConverter with custom pipeline options if provided."""
+    """Get a cached DocumentConverter for the custom pipeline options if provided."""
     if not pipeline_options:
         logger.debug("Using default PDF converter (no custom pipeline options)")
         return get_converter()
-    
-    logger.info(f"Creating PDF converter with custom pipeline options: {pipeline_options}")
-
-    custom_options = PdfPipelineOptions()
-    option_attrs = ("do_ocr", "do_formula_enrichment", "do_code_enrichment",
-                    "do_table_structure", "do_picture_description")
-
-    for attr in option_attrs:
-        if hasattr(pipeline_options, attr):
-            value = getattr(pipeline_options, attr)
-            setattr(custom_options, attr, value)
-            logger.debug(f"Pipeline option {attr}={value}")
-        else:
-            setattr(custom_options, attr, False)
-            logger.debug(f"Pipeline option {attr}=False (default)")
-
-    return DocumentConverter(
-        format_options={InputFormat.PDF: PdfFormatOption(
-            pipeline_options=custom_options)}
-    )
+
+    logger.debug("Using PDF converter with custom pipeline options: %s", pipeline_options)
+    return get_converter_for_options(pipeline_options)
 
 
+@instrumented_job("process-pdf")
 def convert_pdf(event: DocumentUploadEvent) -> ProcessingResponse:
     """Full PDF processing workflow with embeddings and database storage.
     
-    Processes chunks in batches of 30 to optimize memory usage.
-    Each batch is embedded and uploaded before moving to the next.
+    Processes chunks in token-sized batches (see embeddings.batching).
+    Batches are embedded and uploaded serially, or concurrently with chunk
+    generation when PIPELINED_PROCESSING is enabled (see processors.pipeline).
+    With PDF_STREAMING_CONVERSION or a memory budget (MAX_RSS_MB), PDFs are
+    converted and chunked page window by page window (see
+    processors.streaming_pdf).
+    With RESUMABLE_INGESTION and CONVERSION_CACHE_DIR, a re-run of the task
+    skips stored chunks and converted pages (see db.postgres.IngestionSession
+    and processors.conversion_cache).
     """
     task_id = event.taskId
     course_id, shortened_filename = event.name.split("/")
 
-    batch_size = 30
-    total_chunks_processed = 0
-    is_first_batch = True
-
+    session: Optional[IngestionSession] = None
     try:
-        logger.info(f"Updating task status to 'processing' for task_id={task_id}")
-        update_status_to_processing(task_id)
-
-        logger.info(f"Converting PDF to chunks: {event.name}")
-        chunk_generator, page_count = _create_pdf_chunk_generator(
-            "files-bucket", event.name, event.pipelineOptions
-        )
-
-        # Process chunks in batches of 30
-        batch: List[PdfChunkData] = []
-        for chunk in chunk_generator:
-            batch.append(chunk)
-            
-            if len(batch) >= batch_size:
-                _process_and_upload_pdf_batch(
-                    batch, task_id, course_id, shortened_filename,
-                    int(event.size), event.pageNumberOffset, page_count,
-                    is_first_batch
-                )
-                total_chunks_processed += len(batch)
-                logger.info(f"Processed batch of {len(batch)} chunks (total: {total_chunks_processed})")
-                is_first_batch = False
-                batch = []  # Clear batch to free memory
-
-        # Process remaining chunks
-        if batch:
-            _process_and_upload_pdf_batch(
-                batch, task_id, course_id, shortened_filename,
-                int(event.size), event.pageNumberOffset, page_count,
-                is_first_batch
-            )
-            total_chunks_processed += len(batch)
-            logger.info(f"Processed final batch of {len(batch)} chunks (total: {total_chunks_processed})")
-
-        if total_chunks_processed == 0:
-            logger.warning(f"No content chunks generated from PDF: {event.name}")
-            raise ValueError("No content chunks generated from PDF")
-
-        logger.info(f"Updating task status to 'finished' for task_id={task_id}")
-        update_status_to_finished(task_id)
+        with IngestionSession(
+            task_id, course_id, shortened_filename,
+            int(event.size), event.pageNumberOffset,
+            _get_chunking_signature(_get_pdf_variant(event.pipelineOptions))
+        ) as session:
+            try:
+                logger.info(f"Updating task status to 'processing' for task_id={task_id}")
+                with span("status"):
+                    session.start()
+                reset_embedding_cache_stats()
+                reset_retry_budget()
+
+                with download_to_temp_file("files-bucket", event.name) as downloaded:
+                    fingerprint = None
+                    if is_file_deduplication_enabled():
+                        with span("fingerprint", items=downloaded.size):
+                            fingerprint = compute_file_fingerprint(
+                                downloaded.path, _get_pdf_variant(event.pipelineOptions)
+                            )
+                        with span("dedup") as dedup_span:
+                            cloned_chunks = session.reuse_duplicate_file(fingerprint)
+                            dedup_span.add_items(cloned_chunks or 0)
+                        if cloned_chunks:
+                            logger.info(f"Updating task status to 'finished' for task_id={task_id}")
+                            with span("status"):
+                                session.finish(fingerprint)
+                            return ProcessingResponse(
+                                success=True,
+                                message=f"Successfully processed PDF {shortened_filename} (reused identical file)",
+                                chunks_processed=cloned_chunks
+                            )
+
+                    logger.info(f"Converting PDF to chunks: {event.name}")
+                    # Appended to by the chunk generator, in the generating thread
+                    window_ends = list(session.window_ends)
+                    chunk_generator, page_count = _create_pdf_chunk_generator(
+                        downloaded.path, event.pipelineOptions, task_id, window_ends
+                    )
+
+                    chunk_generator = session.pending_chunks(chunk_generator)
+
+                    def upload_batch(
+                        batch: List[PdfChunkData], embeddings: np.ndarray, batch_window_ends: List[int]
+                    ) -> None:
+                        _upload_pdf_batch(session, batch, embeddings, page_count, batch_window_ends)
+
+                    # Process chunks in token-sized batches; each batch is stored
+                    # with the page windows converted up to its last chunk
+                    total_chunks_processed = session.resumed_chunk_count + process_in_batches(
+                        instrument_iterable("chunk", chunk_generator), _embed_pdf_batch, upload_batch,
+                        batch_state=lambda: list(window_ends)
+                    )
+
+                    if total_chunks_processed == 0:
+                        logger.warning(f"No content chunks generated from PDF: {event.name}")
+                        raise ValueError("No content chunks generated from PDF")
+
+                    logger.info(f"Updating task status to 'finished' for task_id={task_id}")
+                    with span("status"):
+                        session.finish(fingerprint)
+            except TaskAlreadyClaimedError:
+                raise
+            except Exception as error:
+                # Fail the task while the session holds its lock, so that no
+                # worker reclaims it while its source file is deleted
+                handle_processing_error("files-bucket", event, error, session)
+                raise
+
+        discard_task_entries(task_id)
+        logger.info(f"Embedding cache stats for task_id={task_id}: {get_embedding_cache_stats()}")
 
         return ProcessingResponse(
             success=True,
@@ -129,37 +165,40 @@ def convert_pdf(event: DocumentUploadEvent) -> ProcessingResponse:
             chunks_processed=total_chunks_processed
         )
 
+    except TaskAlreadyClaimedError as error:
+        # Another job processes the task; its source file and cache entries stay
+        logger.warning(str(error))
+        return ProcessingResponse(success=False, message=str(error), chunks_processed=0)
+
     except Exception as error:
-        handle_processing_error("files-bucket", event, error)
+        if session is None:
+            # The session could not be opened
+            handle_processing_error("files-bucket", event, error)
+        discard_task_entries(task_id)
         raise error
 
 
-def _process_and_upload_pdf_batch(
+def _embed_pdf_batch(batch: List[PdfChunkData]) -> np.ndarray:
+    """Generate embeddings for a batch of PDF chunks."""
+    logger.debug("Generating embeddings for batch of %d chunks", len(batch))
+    chunk_contents = [c.contextualized_content for c in batch]
+    with span("embed", items=len(batch)):
+        return embed_content(chunk_contents)
+
+
+def _upload_pdf_batch(
+    session: IngestionSession,
     batch: List[PdfChunkData],
-    task_id: str,
-    course_id: str,
-    filename: str,
-    file_size: int,
-    page_number_offset: int,
+    embeddings: np.ndarray,
     page_count: int,
-    is_first_batch: bool
+    window_ends: Optional[List[int]] = None
 ) -> None:
-    """Embed and upload a batch of PDF chunks to the database."""
-    logger.debug(f"Generating embeddings for batch of {len(batch)} chunks")
-    chunk_contents = [c.contextualized_content for c in batch]
-    embeddings_list = embed_content(chunk_contents)
-
-    embedded_chunks = [
-        create_embedded_chunk(chunk, embeddings_list[idx])
-        for idx, chunk in enumerate(batch)
-    ]
-
-    logger.debug(f"Uploading batch of {len(embedded_chunks)} chunks to database")
-    upload_to_postgres_db(
-        task_id, course_id, filename,
-        file_size, embedded_chunks, page_number_offset,
-        page_count, is_first_batch
-    )
+    """Upload a batch of embedded PDF chunks to the database."""
+    chunk_batch = ChunkBatch.from_chunks(batch, embeddings, session.task_id)
+
+    logger.debug("Uploading batch of %d chunks to database", len(chunk_batch))
+    with span("insert", items=len(chunk_batch)):
+        session.insert_chunks(chunk_batch, page_count, window_ends)
 
 
 from typing import Generator
@@ -180,12 +219,24 @@ def _extract_chunk_metadata(doc_chunk: DocChunk) -> tuple[int, Optional[tuple[fl
     return page_index, bbox_tuple
 
 
+def release_page_images(document) -> None:
+    """Drop the page, picture and table images of a converted document; chunking only needs text."""
+    from docling_core.types.doc import ContentLayer, FloatingItem
+
+    for page in document.pages.values():
+        page.image = None
+    for item, _ in document.iterate_items(included_content_layers=set(ContentLayer)):
+        if isinstance(item, FloatingItem):
+            item.image = None
+
+
 def _generate_pdf_chunks(
-    result,
+    document,
     chunker: HybridChunker
 ) -> Generator[PdfChunkData, None, None]:
-    """Generator that yields PDF chunks one at a time for memory efficiency."""
-    chunk_iter = chunker.chunk(dl_doc=result.document)
+    """Generator that yields PDF chunks of a DoclingDocument one at a time for memory efficiency."""
+    chunk_iter = chunker.chunk(dl_doc=document)
+    sampler = LogSampler()
 
     for idx, chunk in enumerate(chunk_iter):
         contextualized_text = chunker.contextualize(chunk=chunk)
@@ -193,10 +244,14 @@ def _generate_pdf_chunks(
         doc_chunk = DocChunk.model_validate(chunk)
         page_index, bbox_tuple = _extract_chunk_metadata(doc_chunk)
 
-        logger.debug(f"Created chunk {idx}: {contextualized_text[:60]}... (length: {len(contextualized_text)} characters)")
+        if logger.isEnabledFor(logging.DEBUG) and sampler.sample():
+            logger.debug(
+                "Created chunk %d: %.60s... (length: %d characters)",
+                idx, contextualized_text, len(contextualized_text)
+            )
 
         if not contextualized_text.strip():
-            logger.debug(f"Skipping empty chunk at index {idx}")
+            logger.debug("Skipping empty chunk at index %d", idx)
             continue
 
         yield PdfChunkData(
@@ -207,30 +262,113 @@ def _generate_pdf_chunks(
         )
 
 
+def _get_pdf_variant(pipeline_options: Optional[object] = None) -> str:
+    """Fingerprint variant identifying the pipeline options, e.g. "pdf-10100"."""
+    flags = "".join("1" if enabled else "0" for enabled in normalize_pipeline_options(pipeline_options))
+    return f"pdf-{flags}"
+
+
+def _get_chunking_signature(variant: str) -> str:
+    """Settings the chunks of a PDF depend on, stored with resume checkpoints (see IngestionSession)."""
+    budget = get_memory_budget_bytes() > 0
+    parallel = get_conversion_workers() > 1 and not budget
+    return (
+        f"{variant};window={get_page_window_size()};parallel={parallel};"
+        f"streaming={is_streaming_conversion_enabled()};budget={budget};max_tokens={get_max_tokens()}"
+    )
+
+
 def _create_pdf_chunk_generator(
-    bucket: str,
-    key: str,
-    pipeline_options: Optional[object] = None
+    pdf_path: str,
+    pipeline_options: Optional[object] = None,
+    task_id: Optional[str] = None,
+    window_ends: Optional[List[int]] = None
 ) -> Tuple[Generator[PdfChunkData, None, None], int]:
     """Create a generator for PDF chunks and return page count.
     
     Returns a generator instead of a list to enable memory-efficient batch processing.
+    The PDF is read from pdf_path, which must exist until the generator is exhausted.
+    If task_id is given, conversion results are cached (see processors.conversion_cache).
+    Streaming conversions replay and record their page windows in window_ends
+    (see processors.streaming_pdf).
     """
-    logger.debug(f"Fetching PDF from storage: bucket={bucket}, key={key}")
-    storage_client = get_storage_client()
-    file_content = storage_client.get_object_bytes(bucket, key)
-    logger.debug(f"Retrieved PDF from storage (size: {len(file_content)} bytes)")
-
-    buf = io.BytesIO(file_content)
-    source = DocumentStream(name="document.pdf", stream=buf)
-
-    logger.debug(f"Converting PDF using Docling converter")
-    doc_converter = _create_converter_with_options(pipeline_options)
-    result = doc_converter.convert(source)
-    page_count = result.document.num_pages()
+    # Under a memory budget, conversion stays in-process: worker processes
+    # would each hold a window outside of the job's RSS
+    if get_conversion_workers() > 1 and not get_memory_budget_bytes():
+        parallel_generator = _create_parallel_pdf_chunk_generator(pdf_path, pipeline_options, task_id)
+        if parallel_generator is not None:
+            return parallel_generator
+    elif is_streaming_conversion_enabled():
+        streaming_generator = _create_streaming_pdf_chunk_generator(
+            pdf_path, pipeline_options, task_id, window_ends
+        )
+        if streaming_generator is not None:
+            return streaming_generator
+
+    variant = _get_pdf_variant(pipeline_options)
+    document = load_document(task_id, variant) if task_id else None
+
+    if document is None:
+        logger.debug(f"Converting PDF using Docling converter")
+        doc_converter = _create_converter_with_options(pipeline_options)
+        with span("convert") as convert_span:
+            document = doc_converter.convert(pdf_path).document
+            convert_span.add_items(document.num_pages())
+        release_page_images(document)
+        if task_id:
+            store_document(task_id, variant, document)
+
+    page_count = document.num_pages()
     logger.debug(f"PDF conversion completed ({page_count} pages)")
 
     logger.debug(f"Initializing chunker and creating chunk generator")
-    chunker = HybridChunker()
+    chunker = HybridChunker(tokenizer=get_tokenizer())
+
+    return _generate_pdf_chunks(document, chunker), page_count
+
+
+def _create_parallel_pdf_chunk_generator(
+    pdf_path: str,
+    pipeline_options: Optional[object] = None,
+    task_id: Optional[str] = None
+) -> Optional[Tuple[Generator[PdfChunkData, None, None], int]]:
+    """Create a generator converting page windows in a process pool.
 
-    return _generate_pdf_chunks(result, chunker), page_count
+    The worker processes read the downloaded PDF from pdf_path.
+    Returns None if the document is too short to be split into windows.
+    """
+    page_count = get_pdf_page_count(pdf_path)
+
+    if not is_parallel_conversion_enabled(page_count):
+        logger.debug(f"PDF has {page_count} pages, converting in-process")
+        return None
+
+    generator = generate_pdf_chunks_parallel(
+        pdf_path, page_count, pipeline_options, task_id, _get_pdf_variant(pipeline_options)
+    )
+    return generator, page_count
+
+
+def _create_streaming_pdf_chunk_generator(
+    pdf_path: str,
+    pipeline_options: Optional[object] = None,
+    task_id: Optional[str] = None,
+    window_ends: Optional[List[int]] = None
+) -> Optional[Tuple[Generator[PdfChunkData, None, None], int]]:
+    """Create a generator converting and chunking page windows one after another.
+
+    Returns None if the document is too short to be split into windows.
+    """
+    page_count = get_pdf_page_count(pdf_path)
+
+    if page_count <= get_min_streaming_pages():
+        logger.debug(f"PDF has {page_count} pages, converting it as a whole")
+        return None
+
+    generator = generate_pdf_chunks_streaming(
+        pdf_path, page_count,
+        _create_converter_with_options(pipeline_options),
+        HybridChunker(tokenizer=get_tokenizer()),
+        task_id, _get_pdf_variant(pipeline_options), window_ends
+    )
+    return generator, page_count
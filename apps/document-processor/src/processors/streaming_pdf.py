@@ -0,0 +1,263 @@
+"""
+Streaming PDF Conversion Module
+
+This module converts and chunks a PDF page window by page window in the job
+process, instead of converting the whole document before the first chunk:
+
+- Chunks of a window are yielded as soon as the window is converted, so the
+  first embeddings are requested after PDF_PAGE_WINDOW_SIZE pages (smaller
+  windows start sooner) rather than after the whole document.
+- Only one window is held at a time; its conversion result, including page
+  images and layout data, is released before the next window is converted,
+  so memory stays flat for long documents.
+- Under a memory budget (MAX_RSS_MB, see utils.memory), windows are sized
+  so the next conversion fits into the RSS headroom: the first window has
+  two pages, later windows are sized by the highest memory a page took so
+  far, up to PDF_PAGE_WINDOW_SIZE pages.
+- Sections stay open across windows: the headings open at the end of a
+  window are inserted at the start of the next one, so its first chunks
+  keep their heading context. Chunks never span two windows.
+- Chunk indexes depend on the window boundaries, which under a memory
+  budget depend on the RSS at runtime. The ends of converted windows are
+  appended to the list passed as window_ends, in the thread consuming the
+  generator; the caller stores a copy with the checkpoint of each batch of
+  a resumable ingestion (see db.postgres.IngestionSession and
+  processors.pipeline); a re-run replays them, so its chunk indexes match
+  the stored chunks.
+
+Enable it with PDF_STREAMING_CONVERSION=true. It applies to PDFs with more
+pages than one window that are converted in-process (PDF_CONVERSION_WORKERS
+of 1). With MAX_RSS_MB set, all PDFs of more than one page are streamed,
+also when PDF_CONVERSION_WORKERS is greater than 1. With
+CONVERSION_CACHE_DIR set, converted windows and their open headings are
+cached, so a re-run of the task continues after the last converted window.
+"""
+
+import os
+import gc
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Generator, Iterator, List, Optional
+
+from logger import setup_logger
+from models.responses import PdfChunkData
+from processors.conversion_cache import (
+    find_window_end,
+    load_window_chunks,
+    load_window_headings,
+    store_window_chunks,
+    store_window_headings,
+)
+from processors.parallel_pdf import get_page_window_size, get_window_page_shift
+from utils.instrumentation import record_value, span
+from utils.memory import get_memory_budget_bytes, get_rss_monitor
+
+if TYPE_CHECKING:
+    from docling.document_converter import DocumentConverter
+    from docling_core.transforms.chunker.hybrid_chunker import HybridChunker
+    from docling_core.types.doc import DoclingDocument
+
+# Configure logger
+logger = setup_logger(__name__)
+
+# Pages of the first window under a memory budget, before the cost of a page is known
+_INITIAL_BUDGET_WINDOW_PAGES = 2
+
+# Fraction of MAX_RSS_MB that window conversions are planned to stay under
+_BUDGET_TARGET = 0.8
+
+
+def is_streaming_conversion_enabled() -> bool:
+    """Check whether PDFs are converted window by window (PDF_STREAMING_CONVERSION or MAX_RSS_MB)."""
+    requested = os.getenv("PDF_STREAMING_CONVERSION", "false").lower() == "true"
+    return requested or get_memory_budget_bytes() > 0
+
+
+def get_min_streaming_pages() -> int:
+    """Get the page count above which a PDF is streamed rather than converted as a whole."""
+    if get_memory_budget_bytes():
+        return 1
+    return get_page_window_size()
+
+
+class PageWindowSizer:
+    """
+    Sizes page windows to fit into the memory budget.
+
+    The cost of a page is the RSS growth while its window was converted,
+    divided by the window's pages; the highest cost seen so far is used, as
+    scanned pages cost much more than born-digital ones. Without a budget,
+    every window has max_pages pages.
+    """
+
+    def __init__(self, max_pages: int, budget_bytes: int):
+        self.max_pages = max(1, max_pages)
+        self.budget_bytes = budget_bytes
+        self._bytes_per_page: Optional[float] = None
+        self._collect = True
+
+    def next_size(self) -> int:
+        """Pages of the next window."""
+        if not self.budget_bytes:
+            return self.max_pages
+        if self._bytes_per_page is None:
+            return min(self.max_pages, _INITIAL_BUDGET_WINDOW_PAGES)
+
+        target = self.budget_bytes * _BUDGET_TARGET
+        rss = get_rss_monitor().sample()
+        if rss > target and self._collect:
+            # Released documents may still be waiting for the cycle collector;
+            # stop collecting while it frees less than a page
+            gc.collect()
+            collected_rss = get_rss_monitor().sample()
+            self._collect = rss - collected_rss >= (self._bytes_per_page or 0)
+            rss = collected_rss
+        elif rss <= target:
+            self._collect = True
+
+        if not self._bytes_per_page:
+            return self.max_pages
+        pages = int(max(0, target - rss) // self._bytes_per_page)
+        return max(1, min(self.max_pages, pages))
+
+    @contextmanager
+    def measure(self, pages: int) -> Iterator[None]:
+        """Measure the memory a window of pages takes while it is converted and chunked."""
+        if not self.budget_bytes:
+            yield
+            return
+
+        monitor = get_rss_monitor()
+        rss_before = monitor.sample()
+        with monitor.track() as tracker:
+            yield
+        page_cost = max(0, tracker.peak_bytes - rss_before) / pages
+        self._bytes_per_page = max(self._bytes_per_page or 0.0, page_cost)
+
+
+def get_open_headings(document: "DoclingDocument") -> Dict[int, str]:
+    """
+    Get the headings in scope at the end of a document, by level.
+
+    Follows the HierarchicalChunker: the title is level 0, and a heading
+    closes the headings of deeper levels.
+    """
+    from docling_core.types.doc import SectionHeaderItem, TitleItem
+
+    headings: Dict[int, str] = {}
+    for item, _ in document.iterate_items():
+        if isinstance(item, (TitleItem, SectionHeaderItem)):
+            level = item.level if isinstance(item, SectionHeaderItem) else 0
+            headings = {lvl: text for lvl, text in headings.items() if lvl < level}
+            headings[level] = item.text
+    return headings
+
+
+def _insert_open_headings(document: "DoclingDocument", headings: Dict[int, str]) -> None:
+    """Insert headings carried over from the previous window before the document's first item."""
+    if not headings or not document.body.children:
+        return
+
+    first_item = document.body.children[0].resolve(document)
+    for level in sorted(headings):
+        # Inserting before the same sibling keeps the headings in order
+        if level == 0:
+            document.insert_title(sibling=first_item, text=headings[level], after=False)
+        else:
+            document.insert_heading(sibling=first_item, text=headings[level], level=level, after=False)
+
+
+def generate_pdf_chunks_streaming(
+    path: str,
+    page_count: int,
+    converter: "DocumentConverter",
+    chunker: "HybridChunker",
+    task_id: Optional[str] = None,
+    variant: str = "pdf",
+    window_ends: Optional[List[int]] = None,
+) -> Generator[PdfChunkData, None, None]:
+    """Generator that converts page windows one after another and yields their chunks.
+
+    Args:
+        path: Path to the PDF file
+        page_count: Number of pages in the PDF
+        converter: Converter of the job's pipeline options
+        chunker: Chunker of the job
+        task_id: Task whose converted windows are cached, if given
+        variant: Conversion variant identifying the pipeline options in cache keys
+        window_ends: Last pages of the windows of an earlier run, which are
+            replayed; the ends of further windows are appended once they
+            are converted
+
+    Yields:
+        PdfChunkData with chunk indexes numbered across the whole document
+    """
+    from processors.process_pdf import _generate_pdf_chunks, release_page_images
+
+    max_pages = get_page_window_size()
+    sizer = PageWindowSizer(max_pages, get_memory_budget_bytes())
+    logger.info(f"Streaming conversion of {page_count} pages in windows of up to {max_pages} pages")
+
+    if window_ends is None:
+        window_ends = []
+    elif window_ends:
+        logger.info(f"Replaying {len(window_ends)} page windows of an earlier run")
+
+    headings: Dict[int, str] = {}
+    chunk_index = 0
+    window_index = 0
+    start = 1
+
+    while start <= page_count:
+        window_chunks = window_headings = None
+        replayed_end = min(page_count, window_ends[window_index]) if window_index < len(window_ends) else None
+        cached_end = find_window_end(task_id, variant, start) if task_id else None
+        if replayed_end is not None and cached_end != replayed_end:
+            cached_end = None
+        if cached_end is not None:
+            end = cached_end
+            window_chunks = load_window_chunks(task_id, variant, start, end)
+            window_headings = load_window_headings(task_id, variant, start, end)
+
+        if window_chunks is not None and window_headings is not None:
+            logger.debug("Reusing cached conversion of pages %d-%d", start, end)
+        else:
+            if replayed_end is not None:
+                end = replayed_end
+            else:
+                end = min(page_count, start + sizer.next_size() - 1)
+            record_value("window_pages", end - start + 1)
+
+            with sizer.measure(end - start + 1):
+                with span("convert", items=end - start + 1):
+                    # Keep only the document; the conversion result holds the
+                    # page images and backends of the window
+                    document = converter.convert(path, page_range=(start, end)).document
+                release_page_images(document)
+
+                _insert_open_headings(document, headings)
+                page_shift = get_window_page_shift(document, start)
+
+                window_chunks = []
+                for chunk in _generate_pdf_chunks(document, chunker):
+                    chunk.page_index += page_shift
+                    window_chunks.append(chunk)
+                window_headings = get_open_headings(document)
+                del document
+
+            if task_id:
+                # Cached before the chunks are renumbered below
+                store_window_chunks(task_id, variant, start, end, window_chunks)
+                store_window_headings(task_id, variant, start, end, window_headings)
+
+        logger.debug("Chunked pages %d-%d into %d chunks", start, end, len(window_chunks))
+        if replayed_end is None:
+            # Recorded once converted: a window that ran out of memory is not replayed
+            window_ends.append(end)
+        window_index += 1
+        headings = window_headings
+        start = end + 1
+
+        for chunk in window_chunks:
+            chunk.chunk_index = chunk_index
+            chunk_index += 1
+            yield chunk
@@ -0,0 +1,501 @@
+"""
+Text Chunker Module
+
+Fast path for plain-text formats that need no layout analysis: Markdown,
+plain text, CSV and simple HTML (without tables). Files are parsed while
+they are read and turned into chunks directly, without Docling, a
+DoclingDocument or the HybridChunker, so such uploads neither load the
+Docling stack nor pay for a conversion.
+
+Chunks follow the HybridChunker contract of the Docling path:
+- Blocks (paragraphs, list items, code blocks, table rows) are merged into
+  chunks of at most TEXT_CHUNK_MAX_TOKENS tokens (default: the limit of the
+  shared tokenizer, see utils.tokenizer). Blocks are counted with the shared
+  tokenizer in batches (see embeddings.batching.count_tokens_batch).
+  Oversized blocks are split at sentence, then word boundaries.
+- A chunk never spans a heading change, and its contextualized content is
+  the enclosing headings followed by the chunk text, one per line.
+- Table rows are serialized as "<row header>, <column> = <value>" triplets;
+  Markdown tables may omit the leading and trailing pipes.
+- Markdown thematic breaks (---, ***, ___) end the current block and are
+  dropped.
+- Markdown inline syntax is stripped like Docling does: emphasis and code
+  span markers are removed, links are replaced by their text and images
+  are dropped.
+
+Disable the fast path with TEXT_FAST_PATH_ENABLED=false.
+"""
+
+import os
+import re
+import csv
+from html.parser import HTMLParser
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from embeddings.batching import count_tokens, count_tokens_batch
+from logger import setup_logger
+from models.responses import DocumentChunkData
+from utils.tokenizer import get_max_tokens
+
+# Configure logger
+logger = setup_logger(__name__)
+
+# Formats handled by the fast path, by file extension
+TEXT_FORMATS = {
+    "md": "markdown",
+    "markdown": "markdown",
+    "txt": "text",
+    "csv": "csv",
+    "html": "html",
+    "htm": "html",
+}
+
+# HTML elements that need Docling's structure (tables become triplets there)
+_COMPLEX_HTML_PATTERN = re.compile(rb"<\s*(table|frameset|iframe|math|svg)\b", re.IGNORECASE)
+
+_SENTENCE_END_PATTERN = re.compile(r"(?<=[.!?])\s+")
+_ATX_HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_SETEXT_PATTERN = re.compile(r"^(=+|-+)\s*$")
+_THEMATIC_BREAK_PATTERN = re.compile(r"^ {0,3}([-*_])(?:[ \t]*\1){2,}[ \t]*$")
+_LIST_ITEM_PATTERN = re.compile(r"^\s*([-*+]|\d+[.)])\s+(.*)$")
+_FENCE_PATTERN = re.compile(r"^\s*(```|~~~)")
+_TABLE_SEPARATOR_PATTERN = re.compile(r"^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$")
+
+# Markdown inline syntax, see _strip_inline_markdown
+_CODE_SPAN_PATTERN = re.compile(r"(`+)(.+?)\1")
+_IMAGE_PATTERN = re.compile(r"!\[[^\]]*\](\([^)]*\)|\[[^\]]*\])")
+_LINK_PATTERN = re.compile(r"\[([^\]]*)\](\([^)]*\)|\[[^\]]*\])")
+_AUTOLINK_PATTERN = re.compile(r"<((?:https?|ftp|mailto):[^>\s]+)>")
+_STRONG_PATTERN = re.compile(r"(\*\*|__)(?=\S)(.+?)(?<=\S)\1")
+_EMPHASIS_PATTERN = re.compile(r"\*(?=\S)(.+?)(?<=\S)\*|(?<!\w)_(?=\S)(.+?)(?<=\S)_(?!\w)")
+_STRIKETHROUGH_PATTERN = re.compile(r"~~(?=\S)(.+?)(?<=\S)~~")
+_ESCAPE_PATTERN = re.compile(r"\\([\\`*_{}\[\]()#+\-.!|~<>])")
+# Escaped characters are masked as private-use code points while the syntax is stripped
+_ESCAPE_MASK_OFFSET = 0xF0000
+_MASKED_PATTERN = re.compile("[\U000F0000-\U000F007F]")
+
+# Smallest text budget left for a chunk under very long headings
+_MIN_TEXT_TOKENS = 16
+
+# Blocks whose tokens are counted in one tokenizer call
+_COUNT_BATCH_SIZE = 64
+
+
+def is_text_fast_path_enabled() -> bool:
+    """Check whether plain-text formats bypass Docling (TEXT_FAST_PATH_ENABLED)."""
+    return os.getenv("TEXT_FAST_PATH_ENABLED", "true").lower() == "true"
+
+
+def get_max_chunk_tokens() -> int:
+    """Get the maximum tokens of a contextualized chunk."""
+    max_tokens = os.getenv("TEXT_CHUNK_MAX_TOKENS")
+    return max(_MIN_TEXT_TOKENS * 2, int(max_tokens) if max_tokens else get_max_tokens())
+
+
+def detect_text_format(file_path: str, extension: str) -> Optional[str]:
+    """
+    Get the fast-path format of a file, or None if it needs Docling.
+
+    HTML only qualifies if it has no tables or embedded frames and graphics.
+    """
+    text_format = TEXT_FORMATS.get(extension.lower())
+    if text_format == "html" and _has_complex_html(file_path):
+        return None
+    return text_format
+
+
+def _has_complex_html(file_path: str, block_size: int = 1024 * 1024) -> bool:
+    """Scan an HTML file for elements that need Docling, block by block."""
+    overlap = b""
+    with open(file_path, "rb") as f:
+        while block := f.read(block_size):
+            if _COMPLEX_HTML_PATTERN.search(overlap + block):
+                return True
+            overlap = block[-16:]
+    return False
+
+
+class _ChunkBuilder:
+    """Merges blocks into heading-aware chunks of at most max_tokens tokens."""
+
+    def __init__(self, max_tokens: int):
+        self.max_tokens = max_tokens
+        self._headings: Dict[int, str] = {}
+        self._heading_tokens = 0
+        self._queued: List[str] = []
+        self._pending: List[str] = []
+        self._pending_tokens = 0
+        self._chunk_index = 0
+
+    def add_heading(self, level: int, text: str) -> Iterator[DocumentChunkData]:
+        """Start a section; headings of the same or a deeper level go out of scope."""
+        text = " ".join(text.split())
+        if not text:
+            return
+        yield from self.flush()
+        self._headings = {lvl: heading for lvl, heading in self._headings.items() if lvl < level}
+        self._headings[level] = text
+        self._heading_tokens = count_tokens("\n".join(self._headings.values()))
+
+    def add_block(self, text: str) -> Iterator[DocumentChunkData]:
+        """Add a block of text; blocks are counted and merged _COUNT_BATCH_SIZE at a time."""
+        text = text.strip()
+        if not text:
+            return
+
+        self._queued.append(text)
+        if len(self._queued) >= _COUNT_BATCH_SIZE:
+            yield from self._merge_queued()
+
+    def _merge_queued(self) -> Iterator[DocumentChunkData]:
+        """Merge the queued blocks into chunks, splitting those that do not fit into one."""
+        queued, self._queued = self._queued, []
+        if not queued:
+            return
+
+        budget = max(_MIN_TEXT_TOKENS, self.max_tokens - self._heading_tokens)
+        for text, text_tokens in zip(queued, count_tokens_batch(queued)):
+            for piece, tokens in _split_to_budget(text, text_tokens, budget):
+                if self._pending and self._pending_tokens + tokens > budget:
+                    yield from self._emit()
+                self._pending.append(piece)
+                self._pending_tokens += tokens
+
+    def flush(self) -> Iterator[DocumentChunkData]:
+        """Emit the queued and pending blocks as chunks."""
+        yield from self._merge_queued()
+        yield from self._emit()
+
+    def _emit(self) -> Iterator[DocumentChunkData]:
+        """Emit the pending blocks as a chunk."""
+        if not self._pending:
+            return
+
+        text = "\n".join(self._pending)
+        self._pending = []
+        self._pending_tokens = 0
+
+        yield DocumentChunkData(
+            contextualized_content="\n".join([*self._headings.values(), text]),
+            chunk_index=self._chunk_index,
+        )
+        self._chunk_index += 1
+
+
+def _split_to_budget(text: str, tokens: int, budget: int) -> List[tuple]:
+    """Split text into (piece, tokens) of at most budget tokens at sentence, then word boundaries."""
+    if tokens <= budget:
+        return [(text, tokens)]
+
+    sentences = _SENTENCE_END_PATTERN.split(text)
+    if len(sentences) == 1:
+        words = text.split()
+        if len(words) == 1:
+            # A single unbreakable token sequence, e.g. a long URL
+            return [(text, tokens)]
+        parts = -(-tokens // budget)  # ceil
+        size = -(-len(words) // parts)
+        sentences = [" ".join(words[start:start + size]) for start in range(0, len(words), size)]
+
+    pieces: List[tuple] = []
+    current: List[str] = []
+    current_tokens = 0
+    for sentence, sentence_tokens in zip(sentences, count_tokens_batch(sentences)):
+        for piece, piece_tokens in _split_to_budget(sentence, sentence_tokens, budget):
+            if current and current_tokens + piece_tokens > budget:
+                pieces.append((" ".join(current), current_tokens))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        pieces.append((" ".join(current), current_tokens))
+    return pieces
+
+
+def _table_row_text(header: List[str], row: List[str]) -> str:
+    """Serialize a table row as triplets, like Docling's chunking table serializer."""
+    if len(header) < 2:
+        return " ".join(cell.strip() for cell in row)
+
+    row_header = row[0].strip() if row else ""
+    return ". ".join(
+        f"{row_header}, {column.strip()} = {value.strip()}"
+        for column, value in zip(header[1:], row[1:])
+    )
+
+
+def _split_table_line(line: str) -> List[str]:
+    return [_strip_inline_markdown(cell.strip()) for cell in line.strip().strip("|").split("|")]
+
+
+def _strip_inline_markdown(text: str) -> str:
+    """Reduce Markdown inline syntax to its text; code spans are kept verbatim without their backticks."""
+    parts = _CODE_SPAN_PATTERN.split(text)
+    # split() yields text, backticks, code, text, ... for the groups of the pattern
+    stripped = []
+    for index in range(0, len(parts), 3):
+        stripped.append(_strip_inline_formatting(parts[index]))
+        if index + 2 < len(parts):
+            stripped.append(parts[index + 2].strip())
+    return " ".join("".join(stripped).split())
+
+
+def _strip_inline_formatting(text: str) -> str:
+    text = _ESCAPE_PATTERN.sub(lambda match: chr(_ESCAPE_MASK_OFFSET + ord(match.group(1))), text)
+    text = _IMAGE_PATTERN.sub("", text)
+    text = _LINK_PATTERN.sub(r"\1", text)
+    text = _AUTOLINK_PATTERN.sub(r"\1", text)
+    text = _STRONG_PATTERN.sub(r"\2", text)
+    text = _EMPHASIS_PATTERN.sub(lambda match: match.group(1) or match.group(2), text)
+    text = _STRIKETHROUGH_PATTERN.sub(r"\1", text)
+    return _MASKED_PATTERN.sub(lambda match: chr(ord(match.group()) - _ESCAPE_MASK_OFFSET), text)
+
+
+def _iter_lines(file_path: str) -> Iterator[str]:
+    with open(file_path, "r", encoding="utf-8", errors="replace", newline=None) as f:
+        for line in f:
+            yield line.rstrip("\n")
+
+
+def _generate_markdown_chunks(lines: Iterable[str], builder: _ChunkBuilder) -> Iterator[DocumentChunkData]:
+    paragraph: List[str] = []
+    code: Optional[List[str]] = None
+    table_header: Optional[List[str]] = None
+    list_item: Optional[List[str]] = None
+
+    def end_blocks() -> Iterator[DocumentChunkData]:
+        nonlocal paragraph, list_item, table_header
+        if paragraph:
+            yield from builder.add_block(_strip_inline_markdown(" ".join(paragraph)))
+            paragraph = []
+        if list_item:
+            yield from builder.add_block(f"- {_strip_inline_markdown(' '.join(list_item))}")
+            list_item = None
+        table_header = None
+
+    for line in lines:
+        if code is not None:
+            if _FENCE_PATTERN.match(line):
+                yield from builder.add_block("\n".join(code))
+                code = None
+            else:
+                code.append(line)
+            continue
+
+        if _FENCE_PATTERN.match(line):
+            yield from end_blocks()
+            code = []
+            continue
+
+        stripped = line.strip()
+        if not stripped:
+            yield from end_blocks()
+            continue
+
+        heading = _ATX_HEADING_PATTERN.match(stripped)
+        if heading:
+            yield from end_blocks()
+            yield from builder.add_heading(len(heading.group(1)), _strip_inline_markdown(heading.group(2)))
+            continue
+
+        if len(paragraph) == 1 and _SETEXT_PATTERN.match(stripped):
+            level = 1 if stripped.startswith("=") else 2
+            text = _strip_inline_markdown(paragraph[0])
+            paragraph = []
+            yield from builder.add_heading(level, text)
+            continue
+
+        if _THEMATIC_BREAK_PATTERN.match(line):
+            yield from end_blocks()
+            continue
+
+        if (
+            table_header is None
+            and paragraph
+            and "|" in stripped
+            and "|" in paragraph[-1]
+            and _TABLE_SEPARATOR_PATTERN.match(stripped)
+        ):
+            # Header row of a table without leading and trailing pipes, known
+            # once its separator row follows
+            header = paragraph.pop()
+            yield from end_blocks()
+            table_header = _split_table_line(header)
+            continue
+
+        if stripped.startswith("|") or (table_header is not None and "|" in stripped):
+            if table_header is None:
+                yield from end_blocks()
+                table_header = _split_table_line(stripped)
+            elif not _TABLE_SEPARATOR_PATTERN.match(stripped):
+                yield from builder.add_block(_table_row_text(table_header, _split_table_line(stripped)))
+            continue
+
+        item = _LIST_ITEM_PATTERN.match(line)
+        if item:
+            yield from end_blocks()
+            list_item = [item.group(2).strip()]
+            continue
+
+        if list_item is not None and line.startswith((" ", "\t")):
+            list_item.append(stripped)
+            continue
+
+        if list_item is not None or table_header is not None:
+            yield from end_blocks()
+        paragraph.append(stripped)
+
+    if code:
+        yield from builder.add_block("\n".join(code))
+    yield from end_blocks()
+
+
+def _generate_text_chunks(lines: Iterable[str], builder: _ChunkBuilder) -> Iterator[DocumentChunkData]:
+    paragraph: List[str] = []
+    for line in lines:
+        if line.strip():
+            paragraph.append(line.strip())
+        elif paragraph:
+            yield from builder.add_block(" ".join(paragraph))
+            paragraph = []
+    if paragraph:
+        yield from builder.add_block(" ".join(paragraph))
+
+
+def _generate_csv_chunks(file_path: str, builder: _ChunkBuilder) -> Iterator[DocumentChunkData]:
+    with open(file_path, "r", encoding="utf-8", errors="replace", newline="") as f:
+        sample = f.read(64 * 1024)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+        except csv.Error:
+            dialect = csv.excel
+
+        reader = csv.reader(f, dialect)
+        header = next(reader, None)
+        if header is None:
+            return
+        for row in reader:
+            if any(cell.strip() for cell in row):
+                yield from builder.add_block(_table_row_text(header, row))
+
+
+class _SimpleHtmlParser(HTMLParser):
+    """Collects headings and text blocks of simple HTML as builder output."""
+
+    _BLOCK_TAGS = {
+        "p", "div", "li", "pre", "blockquote", "section", "article", "main", "header",
+        "footer", "aside", "dd", "dt", "figcaption", "address", "br", "hr", "ul", "ol", "dl",
+    }
+    _LIST_TAGS = {"ul", "ol", "dl"}
+    _SKIPPED_TAGS = {"script", "style", "noscript", "template", "head"}
+    _HEADING_LEVELS = {"title": 0, "h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+
+    def __init__(self, builder: _ChunkBuilder):
+        super().__init__(convert_charrefs=True)
+        self.builder = builder
+        self.chunks: List[DocumentChunkData] = []
+        self._text: List[str] = []
+        self._skip_depth = 0
+        self._pre_depth = 0
+        self._heading_level: Optional[int] = None
+        # Open <ul>/<ol>/<dl> elements, and the list depth of each open <li>
+        self._list_depth = 0
+        self._open_items: List[int] = []
+
+    def _end_block(self) -> None:
+        if self._pre_depth:
+            text = "".join(self._text)
+        else:
+            text = " ".join("".join(self._text).split())
+        self._text = []
+        if text and self._open_items:
+            text = f"- {text}"
+        self.chunks.extend(self.builder.add_block(text))
+
+    def handle_starttag(self, tag, attrs) -> None:
+        if tag in self._HEADING_LEVELS:
+            self._end_block()
+            self._heading_level = self._HEADING_LEVELS[tag]
+        elif tag in self._SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag in self._BLOCK_TAGS:
+            self._end_block()
+            if tag in self._LIST_TAGS:
+                self._list_depth += 1
+            elif tag == "li":
+                # A <li> implicitly closes the previous item of its list
+                if self._open_items and self._open_items[-1] == self._list_depth:
+                    self._open_items.pop()
+                self._open_items.append(self._list_depth)
+            elif tag == "pre":
+                self._pre_depth += 1
+
+    def handle_endtag(self, tag) -> None:
+        if tag in self._HEADING_LEVELS:
+            if self._heading_level is not None:
+                text = "".join(self._text)
+                self._text = []
+                self.chunks.extend(self.builder.add_heading(self._heading_level, text))
+                self._heading_level = None
+        elif tag in self._SKIPPED_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in self._BLOCK_TAGS:
+            self._end_block()
+            if tag in self._LIST_TAGS:
+                # Closing a list closes its items, even without </li>
+                while self._open_items and self._open_items[-1] >= self._list_depth:
+                    self._open_items.pop()
+                self._list_depth = max(0, self._list_depth - 1)
+            elif tag == "li":
+                if self._open_items:
+                    self._open_items.pop()
+            elif tag == "pre":
+                self._pre_depth = max(0, self._pre_depth - 1)
+
+    def handle_data(self, data) -> None:
+        # The title is inside <head>, which is skipped otherwise
+        if not self._skip_depth or self._heading_level == 0:
+            self._text.append(data)
+
+    def close(self) -> None:
+        super().close()
+        self._end_block()
+
+
+def _generate_html_chunks(file_path: str, builder: _ChunkBuilder) -> Iterator[DocumentChunkData]:
+    parser = _SimpleHtmlParser(builder)
+    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+        while block := f.read(256 * 1024):
+            parser.feed(block)
+            yield from parser.chunks
+            parser.chunks = []
+    parser.close()
+    yield from parser.chunks
+
+
+def generate_text_chunks(file_path: str, text_format: str) -> Iterator[DocumentChunkData]:
+    """
+    Generator that yields the chunks of a plain-text file while it is read.
+
+    Args:
+        file_path: Path to the file
+        text_format: Format returned by detect_text_format
+
+    Yields:
+        DocumentChunkData numbered in document order
+    """
+    builder = _ChunkBuilder(get_max_chunk_tokens())
+
+    if text_format == "markdown":
+        yield from _generate_markdown_chunks(_iter_lines(file_path), builder)
+    elif text_format == "text":
+        yield from _generate_text_chunks(_iter_lines(file_path), builder)
+    elif text_format == "csv":
+        yield from _generate_csv_chunks(file_path, builder)
+    elif text_format == "html":
+        yield from _generate_html_chunks(file_path, builder)
+    else:
+        raise ValueError(f"Unsupported text format: {text_format}")
+
+    yield from builder.flush()
@@ -1,12 +1,27 @@
 """
 Utility functions and helpers for document processing.
+
+Helpers are imported on first access: the tokenizer pulls in the tokenizers
+library and the error handler the storage clients, which lightweight
+submodules such as utils.instrumentation must not pay for.
 """
 
-from .utils import create_embedded_chunk, handle_processing_error
-from .tokenizer import get_tokenizer
+import importlib
+
+_HELPERS = {
+    "handle_processing_error": "utils.utils",
+    "get_tokenizer": "utils.tokenizer",
+    "get_fast_tokenizer": "utils.tokenizer",
+}
 
 __all__ = [
-    "create_embedded_chunk",
     "handle_processing_error",
     "get_tokenizer",
+    "get_fast_tokenizer",
 ]
+
+
+def __getattr__(name: str):
+    if name in _HELPERS:
+        return getattr(importlib.import_module(_HELPERS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,38 @@
+"""
+HybridChunker adapter of the shared tokenizer.
+
+Kept apart from utils.tokenizer because docling_core is only imported by
+jobs that chunk with Docling.
+"""
+
+from typing import Callable
+
+from docling_core.transforms.chunker.tokenizer.base import BaseTokenizer
+from pydantic import ConfigDict
+
+from utils.tokenizer import FastTokenizer
+
+
+class ChunkerTokenizer(BaseTokenizer):
+    """Docling tokenizer backed by the shared, memoizing FastTokenizer."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    tokenizer: FastTokenizer
+
+    def count_tokens(self, text: str) -> int:
+        """Get number of tokens for given text."""
+        return self.tokenizer.count_tokens(text)
+
+    def get_max_tokens(self) -> int:
+        """Get maximum number of tokens allowed."""
+        return self.tokenizer.max_tokens
+
+    def get_tokenizer(self) -> Callable[[str], int]:
+        """
+        Get the token counter used to split oversized chunks.
+
+        The HybridChunker hands it to semchunk, which accepts a counter;
+        returning the memoized counter keeps those counts cached as well.
+        """
+        return self.tokenizer.count_tokens
@@ -0,0 +1,34 @@
+"""
+File fingerprints for whole-file deduplication.
+
+A fingerprint identifies the source bytes of an upload together with the
+processing variant that produced its chunks (e.g. the PDF pipeline
+options), so a file is only reused when it would be chunked identically.
+Set FILE_DEDUPLICATION_ENABLED=false to always process uploads from scratch.
+"""
+
+import os
+import hashlib
+
+
+def is_file_deduplication_enabled() -> bool:
+    """Check if chunks of identical, already processed files are reused."""
+    return os.getenv("FILE_DEDUPLICATION_ENABLED", "true").lower() == "true"
+
+
+def compute_file_fingerprint(file_path: str, variant: str) -> str:
+    """
+    Compute the fingerprint of a file, reading it in 1 MB blocks.
+
+    Args:
+        file_path: Path of the downloaded source file
+        variant: Processing variant, e.g. "pdf-10100" for the PDF pipeline options
+
+    Returns:
+        Fingerprint of the form "sha256:<hex digest>:<variant>" (at most 128 characters)
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return f"sha256:{digest.hexdigest()}:{variant}"[:128]
@@ -0,0 +1,304 @@
+"""
+Stage-level instrumentation for processing jobs.
+
+A job records nestable spans (fetch, convert, chunk, embed, insert, status,
+...) with wall time, CPU time, item counts and the RSS seen at span exit.
+Spans with the same name under the same parent are aggregated, so per-batch
+spans roll up into one entry with a count. At the end of the job a single
+JSON summary line is logged, keyed by task id, and optionally stored in the
+task_metrics table (JOB_METRICS_TO_DB=true).
+
+Values such as chosen batch sizes can be recorded with record_value() and
+are summarized (count, avg, min, max) under "values" of the job.
+
+With a memory budget (MAX_RSS_MB, see utils.memory), the peak RSS sampled
+during the job is reported against the budget under "memory_budget", and a
+warning is logged if the job exceeded it.
+
+Spans are attached to the active job of the process; outside of a job they
+are no-ops, so instrumented helpers can be used anywhere. CPU time of a
+span is the CPU time of the thread that ran it; the job total is the CPU
+time of the whole process (work done in conversion worker processes is not
+included).
+
+Usage:
+    @instrumented_job("process-pdf")
+    def convert_pdf(event): ...
+
+    with job_metrics(task_id, "process-pdf") as metrics:
+        with span("fetch") as fetch_span:
+            fetch_span.add_items(size)
+        for chunk in instrument_iterable("chunk", chunks):
+            ...
+"""
+
+import os
+import json
+import time
+import functools
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+from utils.memory import get_memory_budget_bytes, get_peak_rss_bytes, get_rss_bytes, get_rss_monitor
+from logger import log_context, setup_logger
+
+# Configure logger
+logger = setup_logger(__name__)
+
+# Summaries are emitted regardless of the service log level
+_metrics_logger = setup_logger("job_metrics", level=20)  # logging.INFO
+
+T = TypeVar("T")
+
+_MB = 1024 * 1024
+
+
+class SpanStats:
+    """Aggregated measurements of all spans with the same name and parent."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.wall_seconds = 0.0
+        self.max_wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.items = 0
+        self.max_rss_bytes = 0
+        self.children: Dict[str, "SpanStats"] = {}
+        self.values: Dict[str, List[float]] = {}  # name -> [count, total, min, max]
+        self._lock = threading.Lock()
+
+    def child(self, name: str) -> "SpanStats":
+        """Get or create the aggregate of a nested span."""
+        with self._lock:
+            stats = self.children.get(name)
+            if stats is None:
+                stats = self.children[name] = SpanStats(name)
+            return stats
+
+    def record(self, wall_seconds: float, cpu_seconds: float, items: int, rss_bytes: int) -> None:
+        with self._lock:
+            self.count += 1
+            self.wall_seconds += wall_seconds
+            self.max_wall_seconds = max(self.max_wall_seconds, wall_seconds)
+            self.cpu_seconds += cpu_seconds
+            self.items += items
+            self.max_rss_bytes = max(self.max_rss_bytes, rss_bytes)
+
+    def record_value(self, name: str, value: float) -> None:
+        """Aggregate an observed value, e.g. a chosen batch size."""
+        with self._lock:
+            stats = self.values.get(name)
+            if stats is None:
+                self.values[name] = [1, value, value, value]
+            else:
+                stats[0] += 1
+                stats[1] += value
+                stats[2] = min(stats[2], value)
+                stats[3] = max(stats[3], value)
+
+    def values_to_dict(self) -> dict:
+        with self._lock:
+            return {
+                name: {"count": count, "avg": round(total / count, 2), "min": low, "max": high}
+                for name, (count, total, low, high) in self.values.items()
+            }
+
+    def to_dict(self) -> dict:
+        summary = {
+            "count": self.count,
+            "wall_s": round(self.wall_seconds, 4),
+            "max_wall_s": round(self.max_wall_seconds, 4),
+            "cpu_s": round(self.cpu_seconds, 4),
+            "items": self.items,
+            "max_rss_mb": round(self.max_rss_bytes / _MB, 1),
+        }
+        if self.values:
+            summary["values"] = self.values_to_dict()
+        if self.children:
+            summary["stages"] = {name: child.to_dict() for name, child in self.children.items()}
+        return summary
+
+
+class Span:
+    """A running span; add_items() counts the items it processed."""
+
+    def __init__(self, stats: SpanStats):
+        self.stats = stats
+        self.items = 0
+
+    def add_items(self, count: int) -> None:
+        self.items += count
+
+
+class JobMetrics:
+    """Spans and resource usage of a single processing job."""
+
+    def __init__(self, task_id: str, job_type: str):
+        self.task_id = task_id
+        self.job_type = job_type
+        self.root = SpanStats(job_type)
+        self.status = "running"
+        self._local = threading.local()
+        self._started = time.perf_counter()
+        self._cpu_started = time.process_time()
+        self.memory_budget_bytes = get_memory_budget_bytes()
+        self._memory_tracker = get_rss_monitor().start_tracking() if self.memory_budget_bytes else None
+
+    def _stack(self) -> List[SpanStats]:
+        """Open spans of the current thread; spans of other threads nest under the job."""
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = [self.root]
+        return stack
+
+    @contextmanager
+    def span(self, name: str, items: int = 0) -> Iterator[Span]:
+        """Measure a block as a span nested in the current thread's open span."""
+        stack = self._stack()
+        stats = stack[-1].child(name)
+        current = Span(stats)
+        current.add_items(items)
+
+        stack.append(stats)
+        started = time.perf_counter()
+        cpu_started = time.thread_time()
+        try:
+            yield current
+        finally:
+            stack.pop()
+            stats.record(
+                time.perf_counter() - started,
+                time.thread_time() - cpu_started,
+                current.items,
+                get_rss_bytes(),
+            )
+
+    def summary(self) -> dict:
+        """Structured summary of the job."""
+        summary = {
+            "event": "job_metrics",
+            "task_id": self.task_id,
+            "job_type": self.job_type,
+            "status": self.status,
+            "wall_s": round(time.perf_counter() - self._started, 4),
+            "cpu_s": round(time.process_time() - self._cpu_started, 4),
+            "peak_rss_mb": round(get_peak_rss_bytes() / _MB, 1),
+            "stages": {name: child.to_dict() for name, child in self.root.children.items()},
+        }
+        if self.root.values:
+            summary["values"] = self.root.values_to_dict()
+        if self._memory_tracker is not None:
+            peak = self._memory_tracker.peak_bytes
+            summary["memory_budget"] = {
+                "max_rss_mb": round(self.memory_budget_bytes / _MB, 1),
+                "peak_rss_mb": round(peak / _MB, 1),
+                "peak_pct": round(100 * peak / self.memory_budget_bytes, 1),
+            }
+        return summary
+
+    def emit(self) -> dict:
+        """Log the summary as one JSON line and optionally store it."""
+        if self._memory_tracker is not None:
+            get_rss_monitor().stop_tracking(self._memory_tracker)
+        summary = self.summary()
+        _metrics_logger.info(json.dumps(summary), extra={"fields": summary})
+
+        budget = summary.get("memory_budget")
+        if budget and budget["peak_pct"] > 100:
+            logger.warning(
+                f"Job task_id={self.task_id} exceeded its memory budget: "
+                f"peak RSS {budget['peak_rss_mb']} MB of {budget['max_rss_mb']} MB"
+            )
+
+        if os.getenv("JOB_METRICS_TO_DB", "false").lower() == "true":
+            try:
+                from db.postgres import insert_task_metrics
+                insert_task_metrics(self.task_id, summary)
+            except Exception as e:
+                logger.error(f"Failed to store metrics for task_id={self.task_id}: {str(e)}")
+
+        return summary
+
+
+# Job of this process that spans are attached to
+_active_job: Optional[JobMetrics] = None
+
+
+def get_active_job() -> Optional[JobMetrics]:
+    """The job currently being measured, if any."""
+    return _active_job
+
+
+@contextmanager
+def job_metrics(task_id: str, job_type: str) -> Iterator[JobMetrics]:
+    """
+    Measure a job and emit its summary on exit.
+
+    The job becomes the active job of the process and its task_id is added
+    to all log records; the status is "finished" if the block completes and
+    "failed" if it raises.
+    """
+    global _active_job
+
+    metrics = JobMetrics(task_id, job_type)
+    previous, _active_job = _active_job, metrics
+    with log_context(task_id=task_id):
+        try:
+            yield metrics
+            metrics.status = "finished"
+        except BaseException:
+            metrics.status = "failed"
+            raise
+        finally:
+            _active_job = previous
+            metrics.emit()
+
+
+def instrumented_job(job_type: str) -> Callable:
+    """Decorator measuring a processor that takes a DocumentUploadEvent as a job."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(event, *args, **kwargs):
+            with job_metrics(event.taskId, job_type):
+                return func(event, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def span(name: str, items: int = 0) -> Iterator[Span]:
+    """Measure a block as a span of the active job; a no-op without one."""
+    job = _active_job
+    if job is None:
+        yield Span(SpanStats(name))
+        return
+
+    with job.span(name, items) as current:
+        yield current
+
+
+def record_value(name: str, value: float) -> None:
+    """Record a value (e.g. a batch size) in the job summary; a no-op without a job."""
+    job = _active_job
+    if job is not None:
+        job.root.record_value(name, value)
+
+
+def instrument_iterable(name: str, iterable: Iterable[T]) -> Iterator[T]:
+    """
+    Measure the time spent producing the items of a lazy iterable.
+
+    Every next() call is recorded in one span; work done by the consumer
+    between items is not included.
+    """
+    iterator = iter(iterable)
+    while True:
+        with span(name) as current:
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            current.add_items(1)
+        yield item
@@ -0,0 +1,152 @@
+"""
+Process memory helpers.
+
+A job can be given a memory budget with MAX_RSS_MB. The budget is enforced
+by the processors, which size their work by the memory pressure (RSS
+relative to the budget):
+- PDFs are converted page window by page window, with windows sized by the
+  memory a page took so far (see processors.streaming_pdf)
+- Embed and insert batches shrink as the RSS approaches the budget (see
+  embeddings.batching)
+
+While a budget is set, an RssMonitor samples the RSS every
+MEMORY_SAMPLE_INTERVAL_MS (default: 100) in a daemon thread, so peaks
+between explicit measurements are seen as well. The peak of a job is
+reported against the budget in its metrics (see utils.instrumentation).
+"""
+
+import os
+import sys
+import time
+import resource
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+_MB = 1024 * 1024
+
+
+def get_rss_bytes() -> int:
+    """
+    Get the current resident set size of this process in bytes.
+
+    Reads /proc/self/statm on Linux and falls back to the peak RSS reported
+    by getrusage on other platforms.
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return get_peak_rss_bytes()
+
+
+def get_peak_rss_bytes() -> int:
+    """Get the peak resident set size of this process in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def get_memory_budget_bytes() -> int:
+    """Get the RSS budget of a job (MAX_RSS_MB), or 0 if there is none."""
+    return max(0, int(os.getenv("MAX_RSS_MB", "0"))) * _MB
+
+
+class PeakTracker:
+    """Highest RSS sampled while the tracker is registered with an RssMonitor."""
+
+    def __init__(self, rss_bytes: int):
+        self.peak_bytes = rss_bytes
+
+    def observe(self, rss_bytes: int) -> None:
+        if rss_bytes > self.peak_bytes:
+            self.peak_bytes = rss_bytes
+
+
+class RssMonitor:
+    """
+    Samples the RSS of the process in a daemon thread.
+
+    Registered PeakTrackers receive every sample, so nested measurements
+    (a job, a page window) each see their own peak. Thread-safe.
+    """
+
+    def __init__(self, interval_seconds: float = 0.1):
+        self.interval_seconds = interval_seconds
+        self._trackers: List[PeakTracker] = []
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="rss-monitor", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self.sample()
+            time.sleep(self.interval_seconds)
+
+    def sample(self) -> int:
+        """Read the RSS now and pass it to the registered trackers."""
+        rss = get_rss_bytes()
+        with self._lock:
+            for tracker in self._trackers:
+                tracker.observe(rss)
+        return rss
+
+    def start_tracking(self) -> PeakTracker:
+        """Register a tracker starting at the current RSS."""
+        tracker = PeakTracker(get_rss_bytes())
+        with self._lock:
+            self._trackers.append(tracker)
+        return tracker
+
+    def stop_tracking(self, tracker: PeakTracker) -> None:
+        """Unregister a tracker after a final sample."""
+        self.sample()
+        with self._lock:
+            if tracker in self._trackers:
+                self._trackers.remove(tracker)
+
+    @contextmanager
+    def track(self) -> Iterator[PeakTracker]:
+        """Track the peak RSS of a block."""
+        tracker = self.start_tracking()
+        try:
+            yield tracker
+        finally:
+            self.stop_tracking(tracker)
+
+
+# Singleton monitor and lock for thread-safe initialization
+_rss_monitor: Optional[RssMonitor] = None
+_rss_monitor_lock = threading.Lock()
+
+
+def get_rss_monitor() -> RssMonitor:
+    """
+    Get or create the running RSS monitor singleton.
+    Thread-safe using double-checked locking.
+
+    Returns:
+        RssMonitor sampling every MEMORY_SAMPLE_INTERVAL_MS
+    """
+    global _rss_monitor
+
+    if _rss_monitor is None:
+        with _rss_monitor_lock:
+            # Double-check after acquiring lock
+            if _rss_monitor is None:
+                monitor = RssMonitor(int(os.getenv("MEMORY_SAMPLE_INTERVAL_MS", "100")) / 1000)
+                monitor.start()
+                _rss_monitor = monitor
+
+    return _rss_monitor
+
+
+def get_memory_pressure() -> float:
+    """Get the current RSS as a fraction of the memory budget, or 0.0 without a budget."""
+    budget = get_memory_budget_bytes()
+    if not budget:
+        return 0.0
+    return get_rss_monitor().sample() / budget
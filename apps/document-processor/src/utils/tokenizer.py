@@ -1,38 +1,214 @@
 """
-Singleton tokenizer for Docling microservice.
-Ensures only one instance of the tokenizer is created.
+Shared tokenizer for Docling microservice.
+
+One fast (Rust) tokenizer of the embedding model is loaded per process and
+shared by the HybridChunker of both processors, the text fast path and the
+token-budget batching of embedding requests:
+
+- The tokenizer is loaded with the tokenizers library from a pre-serialized
+  tokenizer.json (TOKENIZER_PATH, baked into the image), so neither
+  transformers nor the Hugging Face Hub are needed at runtime. If the file
+  does not exist, it is fetched from the Hub.
+- Token counts are memoized in an LRU cache of TOKENIZER_CACHE_SIZE texts
+  (default: 8192); the HybridChunker counts the same texts repeatedly while
+  it splits and merges chunks.
+- count_tokens_batch encodes the texts missing from the cache in one
+  batch call, which the tokenizer parallelizes.
+
+The token limit of chunks is TOKENIZER_MAX_TOKENS, by default the
+max_seq_length of the sentence_bert_config.json next to tokenizer.json
+(256 for all-MiniLM-L6-v2).
 """
 
+import os
+import json
 import threading
-from docling_core.transforms.chunker.tokenizer.huggingface import HuggingFaceTokenizer
-from transformers import AutoTokenizer
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+
+from logger import setup_logger
+
+if TYPE_CHECKING:
+    from tokenizers import Tokenizer
+    from utils.chunker_tokenizer import ChunkerTokenizer
+
+# Configure logger
+logger = setup_logger(__name__)
 
 # Model ID for the tokenizer
 EMBED_MODEL_ID = "sentence-transformers/all-MiniLM-L6-v2"
 
-# Singleton instance and lock for thread-safe initialization
-_tokenizer_instance = None
+# max_seq_length of EMBED_MODEL_ID
+DEFAULT_MAX_TOKENS = 256
+
+# Singleton instances and lock for thread-safe initialization
+_fast_tokenizer: Optional["FastTokenizer"] = None
+_tokenizer_instance: Optional["ChunkerTokenizer"] = None
 _tokenizer_lock = threading.Lock()
 
 
-def get_tokenizer() -> HuggingFaceTokenizer:
+def get_tokenizer_path() -> Path:
+    """Get the path of the pre-serialized tokenizer.json."""
+    return Path(os.getenv("TOKENIZER_PATH", "/app/.cache/tokenizer/tokenizer.json"))
+
+
+def get_max_tokens() -> int:
+    """
+    Get the maximum number of tokens of a chunk.
+
+    Read from TOKENIZER_MAX_TOKENS, else from the sentence_bert_config.json
+    stored next to tokenizer.json, else DEFAULT_MAX_TOKENS.
+    """
+    max_tokens = os.getenv("TOKENIZER_MAX_TOKENS")
+    if max_tokens:
+        return int(max_tokens)
+
+    config_path = get_tokenizer_path().with_name("sentence_bert_config.json")
+    try:
+        with open(config_path, encoding="utf-8") as f:
+            return int(json.load(f)["max_seq_length"])
+    except FileNotFoundError:
+        return DEFAULT_MAX_TOKENS
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable {config_path}: {str(e)}")
+        return DEFAULT_MAX_TOKENS
+
+
+class FastTokenizer:
+    """
+    Counts tokens with a tokenizers.Tokenizer and memoizes the counts.
+
+    Special tokens are not counted, like HuggingFaceTokenizer.count_tokens.
+    Thread-safe.
+    """
+
+    def __init__(self, tokenizer: "Tokenizer", max_tokens: int, cache_size: int = 8192):
+        # Counts must cover the whole text
+        tokenizer.no_truncation()
+        tokenizer.no_padding()
+
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.cache_size = max(0, cache_size)
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def _lookup(self, text: str) -> Optional[int]:
+        with self._lock:
+            tokens = self._cache.get(text)
+            if tokens is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+                self._cache.move_to_end(text)
+            return tokens
+
+    def _store(self, text: str, tokens: int) -> None:
+        if not self.cache_size:
+            return
+        with self._lock:
+            self._cache[text] = tokens
+            self._cache.move_to_end(text)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def count_tokens(self, text: str) -> int:
+        """Count the tokens of a text."""
+        tokens = self._lookup(text)
+        if tokens is None:
+            tokens = len(self.tokenizer.encode(text, add_special_tokens=False))
+            self._store(text, tokens)
+        return tokens
+
+    def count_tokens_batch(self, texts: Sequence[str]) -> List[int]:
+        """Count the tokens of several texts, encoding the uncached ones in one batch."""
+        counts = [self._lookup(text) for text in texts]
+        missing = [i for i, tokens in enumerate(counts) if tokens is None]
+
+        if missing:
+            encodings = self.tokenizer.encode_batch(
+                [texts[i] for i in missing], add_special_tokens=False
+            )
+            for i, encoding in zip(missing, encodings):
+                counts[i] = len(encoding)
+                self._store(texts[i], counts[i])
+
+        return counts
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Hits, misses and size of the token-count cache."""
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses, "size": len(self._cache)}
+
+
+def load_fast_tokenizer(path: Optional[Path] = None) -> FastTokenizer:
+    """
+    Load a FastTokenizer from tokenizer.json, or from the Hub if the file does not exist.
+
+    Args:
+        path: Path of tokenizer.json; TOKENIZER_PATH by default
+
+    Returns:
+        A new FastTokenizer
+    """
+    from tokenizers import Tokenizer
+
+    path = path or get_tokenizer_path()
+    if path.exists():
+        tokenizer = Tokenizer.from_file(str(path))
+    else:
+        logger.warning(f"{path} not found, loading the {EMBED_MODEL_ID} tokenizer from the Hugging Face Hub")
+        tokenizer = Tokenizer.from_pretrained(EMBED_MODEL_ID)
+
+    return FastTokenizer(
+        tokenizer,
+        max_tokens=get_max_tokens(),
+        cache_size=int(os.getenv("TOKENIZER_CACHE_SIZE", "8192")),
+    )
+
+
+def get_fast_tokenizer() -> FastTokenizer:
     """
-    Get the singleton HuggingFace tokenizer instance.
+    Get the shared FastTokenizer singleton.
 
-    Thread-safe lazy initialization of the tokenizer using the
-    sentence-transformers/all-MiniLM-L6-v2 model.
+    Thread-safe lazy initialization; Docling is not imported.
 
     Returns:
-        HuggingFaceTokenizer instance
+        FastTokenizer instance
+    """
+    global _fast_tokenizer
+
+    if _fast_tokenizer is None:
+        with _tokenizer_lock:
+            # Double-check pattern to avoid unnecessary locking
+            if _fast_tokenizer is None:
+                _fast_tokenizer = load_fast_tokenizer()
+
+    return _fast_tokenizer
+
+
+def get_tokenizer() -> "ChunkerTokenizer":
+    """
+    Get the shared tokenizer in the form the HybridChunker expects.
+
+    Pass it as HybridChunker(tokenizer=get_tokenizer()); it wraps the shared
+    FastTokenizer, so all chunkers of the process use the same memo cache.
+
+    Returns:
+        ChunkerTokenizer instance
     """
     global _tokenizer_instance
 
     if _tokenizer_instance is None:
+        fast_tokenizer = get_fast_tokenizer()
         with _tokenizer_lock:
             # Double-check pattern to avoid unnecessary locking
             if _tokenizer_instance is None:
-                _tokenizer_instance = HuggingFaceTokenizer(
-                    tokenizer=AutoTokenizer.from_pretrained(EMBED_MODEL_ID),
-                )
+                from utils.chunker_tokenizer import ChunkerTokenizer
+
+                _tokenizer_instance = ChunkerTokenizer(tokenizer=fast_tokenizer)
 
     return _tokenizer_instance
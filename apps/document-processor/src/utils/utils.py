@@ -1,11 +1,9 @@
-from typing import List, Union
-from uuid import uuid4
+from typing import Optional
 
-from models.responses import PdfChunkData, DocumentChunkData
-from db.postgres import EmbeddedChunk
 from access_clients import get_storage_client
-from db.postgres import update_status_to_failed
+from db.postgres import IngestionSession, update_status_to_failed
 from models.requests import DocumentUploadEvent
+from utils.instrumentation import span
 
 from logger import setup_logger
 
@@ -13,26 +11,38 @@ from logger import setup_logger
 logger = setup_logger(__name__)
 
 
-def create_embedded_chunk(
-    chunk: Union[PdfChunkData, DocumentChunkData],
-    embedding: List[float]
-) -> EmbeddedChunk:
-    """Create an EmbeddedChunk from a chunk (PDF or Document) and its embedding."""
-    page_index = chunk.page_index if hasattr(chunk, 'page_index') else 0
+def handle_processing_error(
+    bucket: str,
+    event: DocumentUploadEvent,
+    error: Exception,
+    session: Optional[IngestionSession] = None,
+):
+    """
+    Handle errors during document/PDF processing with cleanup.
+
+    The task is marked as failed, then its source file is deleted. Both only
+    happen if the task is still 'processing': a task left by a job that died
+    may be reclaimed by a worker, which needs the file. Pass the session of
+    the job to fail the task while the session holds the task lock.
+    """
+    logger.error(f"Processing error for file '{event.name}' (task_id={event.taskId}): {error}", exc_info=True)
 
-    return EmbeddedChunk(
-        page_id=str(uuid4()),
-        page_index=page_index,
-        embedding=embedding,
-        content=chunk.contextualized_content,
-        bbox=chunk.bbox if hasattr(chunk, 'bbox') else None
-    )
+    try:
+        logger.info(f"Updating task status to failed for task_id={event.taskId}")
+        with span("status"):
+            if session is not None:
+                failed = session.fail(event.bucketId, str(error))
+            else:
+                failed = update_status_to_failed(event.taskId, event.bucketId, str(error), only_processing=True)
+    except Exception as e:
+        logger.error(f"Failed to update task status to failed for task_id={event.taskId}: {e}", exc_info=True)
+        return
 
+    if not failed:
+        logger.warning(f"Task {event.taskId} is no longer processed by this job, keeping source file: {event.name}")
+        return
+    logger.info(f"Successfully updated task status to failed for task_id={event.taskId}")
 
-def handle_processing_error(bucket: str, event: DocumentUploadEvent, error: Exception):
-    """Handle errors during document/PDF processing with cleanup."""
-    logger.error(f"Processing error for file '{event.name}' (task_id={event.taskId}): {error}", exc_info=True)
-    
     try:
         logger.info(f"Attempting to clean up source file: {event.name}")
         storage_client = get_storage_client()
@@ -40,10 +50,3 @@ def handle_processing_error(bucket: str, event: DocumentUploadEvent, error: Exce
         logger.info(f"Successfully deleted source file: {event.name}")
     except Exception as e:
         logger.error(f"Failed to clean up source file '{event.name}': {e}", exc_info=True)
-
-    try:
-        logger.info(f"Updating task status to failed for task_id={event.taskId}")
-        update_status_to_failed(event.taskId, event.bucketId, str(error))
-        logger.info(f"Successfully updated task status to failed for task_id={event.taskId}")
-    except Exception as e:
-        logger.error(f"Failed to update task status to failed for task_id={event.taskId}: {e}", exc_info=True)
@@ -0,0 +1,177 @@
+"""
+Long-lived Worker for Document Processing
+
+Instead of processing a single task from environment variables and exiting,
+the worker stays resident and claims scheduled tasks directly from the
+tasks table (FOR UPDATE SKIP LOCKED), so several workers can run side by
+side. Models are loaded once and stay warm across tasks.
+
+The content type, page number offset and pipeline options of an upload
+are stored on its task by the API. Tasks without pipeline options use the
+pipeline options configured for the worker (DO_OCR, ... environment
+variables), like jobs do; tasks created before these columns existed get
+their content type from the file extension.
+
+A task is processed by one job only: the processor claims it when it
+starts (see db.postgres.IngestionSession), so a worker skips a task that a
+cloud job picked up first. Deploy workers with USE_DOCUMENT_WORKERS=true on
+the API, so it does not dispatch cloud jobs for new tasks.
+
+Usage:
+    python -m job_runner --worker
+
+Environment Variables:
+    WORKER_POLL_INTERVAL_SECONDS: Sleep between polls when idle (default: 5)
+    WORKER_IDLE_TIMEOUT_SECONDS: Exit after being idle this long (default: 0, never)
+    WORKER_CLAIM_DELAY_SECONDS: Delay after task creation before it is claimed,
+        matching the API's upload grace period (default: 70)
+    WORKER_MAX_TASKS: Exit after processing this many tasks (default: 0, unlimited)
+    WORKER_MAX_ATTEMPTS: Claims of a task whose job died (e.g. a file that
+        crashes the worker) before the task is failed (default: 3)
+
+SIGTERM and SIGINT drain the worker: the current task is completed and no
+new task is claimed.
+"""
+
+import os
+import signal
+import threading
+import time
+import mimetypes
+from typing import Optional
+
+from db.postgres import ClaimedTask, claim_next_task, fail_abandoned_tasks
+from models.requests import DocumentUploadEvent, PipelineOptions
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class Worker:
+    """Claims and processes scheduled tasks until drained or idle."""
+
+    def __init__(self, pipeline_options: Optional[object] = None):
+        self.pipeline_options = pipeline_options
+        self.poll_interval = float(os.getenv("WORKER_POLL_INTERVAL_SECONDS", "5"))
+        self.idle_timeout = float(os.getenv("WORKER_IDLE_TIMEOUT_SECONDS", "0"))
+        self.claim_delay = int(os.getenv("WORKER_CLAIM_DELAY_SECONDS", "70"))
+        self.max_tasks = int(os.getenv("WORKER_MAX_TASKS", "0"))
+        self.max_attempts = max(1, int(os.getenv("WORKER_MAX_ATTEMPTS", "3")))
+
+        self._draining = threading.Event()
+        self.tasks_processed = 0
+        self.tasks_failed = 0
+
+    def drain(self, signum: Optional[int] = None, frame=None) -> None:
+        """Stop claiming new tasks; the current task is completed."""
+        if not self._draining.is_set():
+            logger.warning(f"Draining worker (signal={signum}), finishing current task")
+        self._draining.set()
+
+    def install_signal_handlers(self) -> None:
+        """Drain the worker on SIGTERM and SIGINT."""
+        signal.signal(signal.SIGTERM, self.drain)
+        signal.signal(signal.SIGINT, self.drain)
+
+    def warm_up(self) -> None:
+        """Load the conversion models before the first task is claimed."""
+        from docling.datamodel.base_models import InputFormat
+        from processors.process_pdf import _create_converter_with_options
+
+        logger.info("Warming up document converter")
+        converter = _create_converter_with_options(self.pipeline_options)
+        converter.initialize_pipeline(InputFormat.PDF)
+
+    def build_event(self, task: ClaimedTask) -> DocumentUploadEvent:
+        """Build the processing event for a claimed task from the upload data stored on it."""
+        content_type = task.content_type or mimetypes.guess_type(task.name)[0]
+        pipeline_options = self.pipeline_options
+        if task.pipeline_options:
+            pipeline_options = PipelineOptions.model_validate(task.pipeline_options)
+
+        return DocumentUploadEvent(
+            taskId=task.task_id,
+            bucketId=task.bucket_id,
+            name=f"{task.course_id}/{task.name}",
+            size=str(task.file_size),
+            contentType=content_type or "application/octet-stream",
+            pageNumberOffset=task.page_number_offset,
+            pipelineOptions=pipeline_options,
+        )
+
+    def process(self, task: ClaimedTask) -> None:
+        """Process a claimed task; failures are recorded on the task and logged."""
+        from processors.process_pdf import convert_pdf
+        from processors.process_document import convert_document
+
+        event = self.build_event(task)
+        # Same job type as the API dispatches to cloud jobs
+        is_pdf = event.contentType == "application/pdf"
+        logger.info(f"Processing task_id={task.task_id}, file={event.name}, attempt={task.attempts}")
+
+        try:
+            result = convert_pdf(event) if is_pdf else convert_document(event)
+            if not result.success:
+                logger.info(f"Task {task.task_id} skipped: {result.message}")
+                return
+            self.tasks_processed += 1
+            logger.info(f"Task {task.task_id} completed: {result.chunks_processed} chunks processed")
+        except Exception as e:
+            # The processor already marked the task as failed
+            self.tasks_failed += 1
+            logger.error(f"Task {task.task_id} failed: {str(e)}")
+
+    def fail_abandoned(self) -> None:
+        """Fail tasks whose jobs died max_attempts times and delete their source files."""
+        from access_clients import get_storage_client
+
+        tasks = fail_abandoned_tasks(
+            self.max_attempts,
+            f"Processing was interrupted {self.max_attempts} times",
+        )
+        for task in tasks:
+            name = f"{task.course_id}/{task.name}"
+            logger.error(f"Task {task.task_id} failed after {task.attempts} attempts, deleting {name}")
+            try:
+                get_storage_client().delete_file("files-bucket", name)
+            except Exception as e:
+                logger.error(f"Failed to clean up source file '{name}': {e}")
+
+    def run(self) -> None:
+        """Claim and process tasks until drained, idle or the task limit is reached."""
+        self.install_signal_handlers()
+        self.warm_up()
+
+        logger.info("Worker started, waiting for tasks")
+        idle_since = time.monotonic()
+
+        while not self._draining.is_set():
+            if self.max_tasks and self.tasks_processed + self.tasks_failed >= self.max_tasks:
+                logger.info(f"Reached WORKER_MAX_TASKS={self.max_tasks}")
+                break
+
+            try:
+                self.fail_abandoned()
+                task = claim_next_task(self.claim_delay, self.max_attempts)
+            except Exception as e:
+                logger.error(f"Failed to claim task: {str(e)}")
+                task = None
+
+            if task is not None:
+                self.process(task)
+                idle_since = time.monotonic()
+                continue
+
+            if self.idle_timeout and time.monotonic() - idle_since >= self.idle_timeout:
+                logger.info(f"Worker idle for {self.idle_timeout:.0f}s, shutting down")
+                break
+
+            # Sleep until the next poll, waking up early when drained
+            self._draining.wait(self.poll_interval)
+
+        logger.info(f"Worker stopped: {self.tasks_processed} tasks processed, {self.tasks_failed} failed")
+
+
+def run_worker(pipeline_options: Optional[object] = None) -> None:
+    """Run a long-lived worker in the current process."""
+    Worker(pipeline_options).run()
@@ -0,0 +1,105 @@
+"""Tests for token-budget batching (embeddings.batching)."""
+
+import pytest
+
+from embeddings import batching
+from embeddings.batching import AdaptiveBatcher, iter_token_batches, payload_bytes
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    """Count one token per word instead of loading the tokenizer."""
+    monkeypatch.setattr(batching, "count_tokens_batch", lambda texts: [len(text.split()) for text in texts])
+
+
+def _batches(texts, max_items=100, budget=10, max_bytes=None):
+    return list(iter_token_batches(texts, lambda text: text, max_items, lambda: budget, max_bytes))
+
+
+def test_batches_stay_within_token_budget():
+    texts = ["a b c", "d e f", "g h i", "j"]
+
+    batches = _batches(texts, budget=6)
+
+    assert [batch.items for batch in batches] == [["a b c", "d e f"], ["g h i", "j"]]
+    assert [batch.tokens for batch in batches] == [6, 4]
+
+
+def test_batches_stay_within_item_limit():
+    batches = _batches(["a"] * 5, max_items=2)
+
+    assert [len(batch.items) for batch in batches] == [2, 2, 1]
+
+
+def test_batches_stay_within_payload_size():
+    texts = ["x" * 10, "y" * 10, "z" * 10]
+
+    batches = _batches(texts, max_bytes=2 * payload_bytes("x" * 10))
+
+    assert [len(batch.items) for batch in batches] == [2, 1]
+    assert batches[0].payload_bytes == 2 * payload_bytes("x" * 10)
+
+
+def test_oversized_item_is_sent_alone():
+    texts = ["a", " ".join(["w"] * 20), "b"]
+
+    batches = _batches(texts, budget=5)
+
+    assert [batch.items for batch in batches] == [["a"], [texts[1]], ["b"]]
+
+
+def test_limits_are_read_when_a_batch_is_started():
+    limits = iter([1, 3, 3])
+
+    batches = list(iter_token_batches(["a"] * 4, lambda text: text, lambda: next(limits), lambda: 100))
+
+    assert [len(batch.items) for batch in batches] == [1, 3]
+
+
+def test_items_are_consumed_lazily():
+    consumed = []
+
+    def items():
+        for index in range(1000):
+            consumed.append(index)
+            yield "a"
+
+    first = next(iter_token_batches(items(), lambda text: text, 2, lambda: 100))
+
+    assert len(first.items) == 2
+    assert len(consumed) == batching.TOKEN_COUNT_LOOKAHEAD
+
+
+def test_adaptive_budget_follows_throughput():
+    batcher = AdaptiveBatcher(min_tokens=100, max_tokens=10000, target_latency_seconds=1.0)
+    assert batcher.token_budget == 5000
+
+    # 1000 tokens per second and a one second target
+    batcher.record(1000, 1.0)
+
+    assert batcher.token_budget == 1000
+
+
+def test_adaptive_budget_growth_is_limited_and_clamped():
+    batcher = AdaptiveBatcher(min_tokens=100, max_tokens=10000, target_latency_seconds=1.0)
+    batcher.record(1000, 1.0)
+
+    batcher.record(100000, 1.0)
+    assert batcher.token_budget == 2000
+
+    for _ in range(20):
+        batcher.record(100000, 1.0)
+    assert batcher.token_budget == 10000
+
+    slow = AdaptiveBatcher(min_tokens=100, max_tokens=10000, target_latency_seconds=1.0)
+    slow.record(10, 10.0)
+    assert slow.token_budget == 100
+
+
+def test_adaptive_budget_ignores_empty_observations():
+    batcher = AdaptiveBatcher(min_tokens=100, max_tokens=10000)
+
+    batcher.record(0, 1.0)
+    batcher.record(100, 0.0)
+
+    assert batcher.token_budget == 5000
@@ -0,0 +1,86 @@
+"""Tests for the columnar chunk batch and its database encodings (db.postgres)."""
+
+import json
+import struct
+from uuid import UUID
+
+import numpy as np
+
+from db.postgres import (
+    ChunkBatch,
+    _build_chunk_copy_rows,
+    _build_chunk_rows,
+    chunk_id_array,
+    encode_vector_binary,
+)
+from models.responses import DocumentChunkData, PdfChunkData
+
+TASK_ID = "7d0f2f4e-4c1b-4b53-9d55-7a1e7d0b6f11"
+COURSE_ID = "0c7a1d35-4ef0-4d7c-8a8c-2f5f3c4b1e22"
+
+
+def _pdf_batch():
+    chunks = [
+        PdfChunkData(contextualized_content="first", chunk_index=3, page_index=0, bbox=(1.0, 2.0, 3.0, 4.0)),
+        PdfChunkData(contextualized_content="second", chunk_index=4, page_index=5),
+    ]
+    embeddings = np.array([[0.5, -1.0, 2.0], [0.0, 1.5, -0.25]], dtype=np.float32)
+    return ChunkBatch.from_chunks(chunks, embeddings, TASK_ID)
+
+
+def test_chunk_ids_are_deterministic_version_5_uuids():
+    batch = _pdf_batch()
+    again = _pdf_batch()
+
+    ids = [UUID(value) for value in batch.id_strings()]
+    assert batch.id_strings() == again.id_strings()
+    assert all(value.version == 5 for value in ids)
+    assert len(set(ids)) == 2
+    assert chunk_id_array(TASK_ID, np.array([4], dtype=np.int32)).tobytes() == ids[1].bytes
+
+
+def test_chunk_ids_depend_on_the_task():
+    other = chunk_id_array("b1f1c3a2-0000-4000-8000-000000000000", np.array([3], dtype=np.int32))
+
+    assert other.tobytes() != _pdf_batch().id_bytes()[0]
+
+
+def test_random_ids_without_task_are_version_4():
+    chunks = [DocumentChunkData(contextualized_content="text", chunk_index=0)]
+    batch = ChunkBatch.from_chunks(chunks, np.zeros((1, 3), dtype=np.float32))
+
+    assert UUID(batch.id_strings()[0]).version == 4
+
+
+def test_encoded_embeddings_match_the_pgvector_binary_format():
+    batch = _pdf_batch()
+
+    encoded = batch.encoded_embeddings()
+
+    assert encoded == [encode_vector_binary(row) for row in batch.embeddings]
+    dimensions, unused = struct.unpack(">HH", encoded[0][:4])
+    assert (dimensions, unused) == (3, 0)
+    assert np.frombuffer(encoded[0][4:], dtype=">f4").tolist() == [0.5, -1.0, 2.0]
+
+
+def test_page_numbers_and_bboxes():
+    batch = _pdf_batch()
+
+    assert batch.page_numbers(0).tolist() == [1, 6]
+    assert batch.page_numbers(3).tolist() == [0, 3]
+    assert batch.bbox_lists() == [[1.0, 2.0, 3.0, 4.0], None]
+
+
+def test_copy_and_insert_rows_hold_the_same_values():
+    batch = _pdf_batch()
+
+    copy_rows = _build_chunk_copy_rows(TASK_ID, COURSE_ID, "Course", "file.pdf", batch, 1)
+    insert_rows = _build_chunk_rows(TASK_ID, COURSE_ID, "Course", "file.pdf", batch, 1)
+
+    for copy_row, insert_row in zip(copy_rows, insert_rows):
+        assert str(UUID(bytes=copy_row[0])) == insert_row[0]
+        assert UUID(bytes=copy_row[1]) == UUID(insert_row[1])
+        assert UUID(bytes=copy_row[3]) == UUID(insert_row[3])
+        assert copy_row[5] == encode_vector_binary(insert_row[5])
+        assert copy_row[6:9] == insert_row[6:9]
+        assert copy_row[9] == (json.loads(insert_row[9]) if insert_row[9] else None)
@@ -0,0 +1,51 @@
+"""Tests for the embedding cache (embeddings.embedding_cache)."""
+
+import numpy as np
+
+from embeddings.embedding_cache import EmbeddingCache
+
+
+class _FakeStore:
+    def __init__(self):
+        self.rows = {}
+
+    def get_many(self, keys):
+        return [(key, self.rows[key]) for key in keys if key in self.rows]
+
+    def put_many(self, rows):
+        self.rows.update(rows)
+
+
+def test_only_embeddings_of_another_dimension_are_skipped():
+    cache = EmbeddingCache(dimensions=3)
+
+    cache.put_many([("a", [1.0, 2.0, 3.0]), ("b", [1.0, 2.0]), ("c", [4.0, 5.0, 6.0])])
+
+    found = cache.get_many(["a", "b", "c"])
+    assert sorted(found) == ["a", "c"]
+    np.testing.assert_array_equal(found["c"], np.array([4.0, 5.0, 6.0], dtype=np.float32))
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = EmbeddingCache(max_entries=2)
+
+    cache.put_many([("a", [1.0]), ("b", [2.0])])
+    cache.get_many(["a"])
+    cache.put_many([("c", [3.0])])
+
+    assert sorted(cache.get_many(["a", "b", "c"])) == ["a", "c"]
+    assert cache.stats()["memory_hits"] == 3
+
+
+def test_persistent_tier_is_shared_through_one_store():
+    store = _FakeStore()
+    writer = EmbeddingCache(persistent=True)
+    writer._store = store
+    reader = EmbeddingCache(persistent=True)
+    reader._store = store
+
+    writer.put_many([(writer.key("text"), [0.5, 1.5])])
+    found = reader.get_many([reader.key("text")])
+
+    np.testing.assert_array_equal(found[reader.key("text")], np.array([0.5, 1.5], dtype=np.float32))
+    assert reader.stats()["shared_hits"] == 1
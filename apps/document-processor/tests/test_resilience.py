@@ -0,0 +1,188 @@
+"""Tests for the embeddings request controls (embeddings.resilience)."""
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from embeddings import resilience
+from embeddings.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryBudget,
+    backoff_delay,
+    hedged_call,
+    is_retryable,
+)
+
+
+def _status_error(status_code, headers=None):
+    request = httpx.Request("POST", "http://api/internal/embeddings/batch")
+    response = httpx.Response(status_code, headers=headers, request=request)
+    return httpx.HTTPStatusError("failed", request=request, response=response)
+
+
+@pytest.mark.parametrize("status_code, retryable", [(429, True), (503, True), (400, False), (404, False)])
+def test_status_codes_are_retried_selectively(status_code, retryable):
+    assert is_retryable(_status_error(status_code)) is retryable
+
+
+def test_connection_errors_are_retryable():
+    assert is_retryable(httpx.ConnectError("refused"))
+    assert not is_retryable(ValueError("bad response"))
+
+
+def test_backoff_honours_retry_after_up_to_the_cap(monkeypatch):
+    monkeypatch.setenv("EMBEDDINGS_RETRY_BACKOFF_MAX_MS", "5000")
+
+    assert backoff_delay(1, _status_error(429, {"retry-after": "2"})) == 2
+    assert backoff_delay(1, _status_error(429, {"retry-after": "60"})) == 5
+
+
+def test_backoff_is_jittered_below_the_exponential_bound(monkeypatch):
+    monkeypatch.setenv("EMBEDDINGS_RETRY_BACKOFF_MS", "100")
+    monkeypatch.setenv("EMBEDDINGS_RETRY_BACKOFF_MAX_MS", "250")
+
+    for attempt in range(1, 6):
+        assert 0 <= backoff_delay(attempt) <= min(0.25, 0.1 * 2 ** (attempt - 1))
+
+
+def test_retry_budget_grows_with_requests():
+    budget = RetryBudget(min_retries=1, ratio=0.5)
+
+    assert budget.try_acquire()
+    assert not budget.try_acquire()
+
+    budget.record_request()
+    budget.record_request()
+    assert budget.try_acquire()
+    assert not budget.try_acquire()
+
+    budget.reset()
+    assert budget.try_acquire()
+
+
+def test_circuit_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+
+    breaker.before_request()
+    breaker.record_failure()
+    breaker.before_request()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError) as raised:
+        breaker.before_request()
+    assert 0 < raised.value.retry_after <= 60
+
+
+def test_half_open_circuit_admits_a_single_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.state == "half-open"
+
+    breaker.before_request()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_request()
+
+
+def test_failed_trial_reopens_the_circuit():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+
+    trial = breaker.before_request()
+    assert trial
+    breaker.record_failure(trial)
+
+    assert breaker.state == "open"
+
+
+def test_late_failure_does_not_end_the_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.01)
+    assert not breaker.before_request()
+    breaker.record_failure()
+    time.sleep(0.02)
+
+    trial = breaker.before_request()
+    # A request sent before the circuit opened fails while the trial runs
+    breaker.record_failure()
+
+    assert breaker.state == "half-open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_max_circuit_wait_is_read_from_the_environment(monkeypatch):
+    monkeypatch.setenv("EMBEDDINGS_BREAKER_MAX_WAIT_SECONDS", "7")
+
+    assert resilience.get_max_circuit_wait() == 7
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        yield pool
+
+
+def test_hedged_call_without_hedging_runs_once(executor):
+    calls = []
+
+    assert hedged_call(lambda: calls.append(1) or "ok", executor, None, lambda: True) == "ok"
+    assert calls == [1]
+
+
+def test_slow_call_is_hedged_and_the_first_result_wins(executor):
+    calls = []
+    lock = threading.Lock()
+
+    def call():
+        with lock:
+            calls.append(len(calls))
+            first = len(calls) == 1
+        if first:
+            time.sleep(0.5)
+            return "slow"
+        return "hedge"
+
+    assert hedged_call(call, executor, 0.05, lambda: True) == "hedge"
+    assert len(calls) == 2
+
+
+def test_no_hedge_without_budget(executor):
+    calls = []
+
+    def call():
+        calls.append(1)
+        time.sleep(0.1)
+        return "ok"
+
+    assert hedged_call(call, executor, 0.01, lambda: False) == "ok"
+    assert calls == [1]
+
+
+def test_first_error_is_raised_if_all_calls_fail(executor):
+    calls = []
+
+    def call():
+        calls.append(1)
+        number = len(calls)
+        time.sleep(0.1 if number == 1 else 0.3)
+        raise RuntimeError(f"call {number}")
+
+    with pytest.raises(RuntimeError, match="call 1"):
+        hedged_call(call, executor, 0.01, lambda: True)
+    assert len(calls) == 2
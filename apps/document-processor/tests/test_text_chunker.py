@@ -0,0 +1,126 @@
+"""Tests for the plain-text fast path (processors.text_chunker)."""
+
+import pytest
+
+from processors import text_chunker
+from processors.text_chunker import detect_text_format, generate_text_chunks
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    """Count one token per word instead of loading the tokenizer."""
+    monkeypatch.setattr(text_chunker, "count_tokens", lambda text: len(text.split()))
+    monkeypatch.setattr(text_chunker, "count_tokens_batch", lambda texts: [len(text.split()) for text in texts])
+    monkeypatch.setenv("TEXT_CHUNK_MAX_TOKENS", "256")
+
+
+def _chunks(tmp_path, content, text_format, extension=None):
+    path = tmp_path / f"file.{extension or text_format}"
+    path.write_text(content, encoding="utf-8")
+    return [chunk.contextualized_content for chunk in generate_text_chunks(str(path), text_format)]
+
+
+def test_chunks_are_numbered_in_order(tmp_path, monkeypatch):
+    monkeypatch.setenv("TEXT_CHUNK_MAX_TOKENS", "32")
+    content = "\n\n".join(" ".join(["word"] * 20) for _ in range(4))
+    path = tmp_path / "file.txt"
+    path.write_text(content, encoding="utf-8")
+
+    chunks = list(generate_text_chunks(str(path), "text"))
+
+    assert [chunk.chunk_index for chunk in chunks] == list(range(len(chunks)))
+    assert len(chunks) == 4
+
+
+def test_markdown_headings_give_context(tmp_path):
+    content = "# Guide\n\nIntro text.\n\n## Setup\n\nInstall it.\n\n# Other\n\nMore."
+
+    assert _chunks(tmp_path, content, "markdown", "md") == [
+        "Guide\nIntro text.",
+        "Guide\nSetup\nInstall it.",
+        "Other\nMore.",
+    ]
+
+
+def test_markdown_inline_syntax_is_stripped(tmp_path):
+    content = "Some *text* with [link](http://x).\n\n![diagram](img.png) uses `a*b*c` and \\*stars\\*"
+
+    assert _chunks(tmp_path, content, "markdown", "md") == [
+        "Some text with link.\nuses a*b*c and *stars*"
+    ]
+
+
+def test_markdown_lists_code_and_tables(tmp_path):
+    content = (
+        "- first **item**\n"
+        "  continued\n"
+        "- second\n"
+        "\n"
+        "```\n"
+        "code  *kept*\n"
+        "```\n"
+        "\n"
+        "| Name | Age |\n"
+        "|------|-----|\n"
+        "| Ann  | 30  |\n"
+    )
+
+    assert _chunks(tmp_path, content, "markdown", "md") == [
+        "- first item continued\n- second\ncode  *kept*\nAnn, Age = 30"
+    ]
+
+
+def test_markdown_thematic_breaks_are_dropped(tmp_path):
+    content = "Before\n\n---\n\n* * *\n___\nAfter"
+
+    assert _chunks(tmp_path, content, "markdown", "md") == ["Before\nAfter"]
+
+
+def test_markdown_tables_without_outer_pipes(tmp_path):
+    content = "Intro\nName | Age\n--- | ---\nAnn | 30\nBob | 41\nOutro"
+
+    assert _chunks(tmp_path, content, "markdown", "md") == [
+        "Intro\nAnn, Age = 30\nBob, Age = 41\nOutro"
+    ]
+
+
+def test_csv_rows_become_triplets(tmp_path):
+    content = "Name,Age,City\nAnn,30,Oslo\nBob,41,Rome\n"
+
+    assert _chunks(tmp_path, content, "csv") == ["Ann, Age = 30. Ann, City = Oslo\nBob, Age = 41. Bob, City = Rome"]
+
+
+def test_html_blocks_headings_and_nested_list_paragraphs(tmp_path):
+    content = (
+        "<html><head><title>Doc</title><style>p {}</style></head><body>"
+        "<h1>Intro</h1><p>Hello <b>world</b></p>"
+        "<ul><li><p>Item one</p></li><li>Item two<li>Item three</ul>"
+        "<p>After</p></body></html>"
+    )
+
+    assert _chunks(tmp_path, content, "html") == [
+        "Doc\nIntro\nHello world\n- Item one\n- Item two\n- Item three\nAfter"
+    ]
+
+
+def test_oversized_blocks_are_split_at_sentences(tmp_path, monkeypatch):
+    monkeypatch.setenv("TEXT_CHUNK_MAX_TOKENS", "32")
+    sentence = " ".join(["word"] * 9) + "."
+    content = " ".join([sentence] * 6)
+
+    chunks = _chunks(tmp_path, content, "text", "txt")
+
+    assert len(chunks) > 1
+    assert all(len(chunk.split()) <= 32 for chunk in chunks)
+    assert " ".join(chunks) == content
+
+
+def test_html_with_tables_needs_docling(tmp_path):
+    simple = tmp_path / "simple.html"
+    simple.write_text("<p>text</p>", encoding="utf-8")
+    complex_html = tmp_path / "complex.html"
+    complex_html.write_text("<p>text</p><TABLE><tr><td>1</td></tr></TABLE>", encoding="utf-8")
+
+    assert detect_text_format(str(simple), "html") == "html"
+    assert detect_text_format(str(complex_html), "HTM") is None
+    assert detect_text_format(str(simple), "docx") is None
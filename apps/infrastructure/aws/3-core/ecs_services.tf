@@ -337,6 +337,15 @@ resource "aws_ecs_task_definition" "document_processor" {
         {
           name  = "AWS_REGION"
           value = var.aws_region
+        },
+        # Embedding model of the API, namespaces the embedding cache
+        {
+          name  = "EMBEDDINGS_MODEL"
+          value = var.embeddings_model
+        },
+        {
+          name  = "EMBEDDING_DIMENSIONS"
+          value = tostring(data.terraform_remote_state.db_storage.outputs.embedding_dimensions)
         }
       ],
       var.use_cloudflare_r2 ? [
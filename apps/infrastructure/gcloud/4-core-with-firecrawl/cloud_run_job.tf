@@ -54,6 +54,15 @@ resource "google_cloud_run_v2_job" "document_processor" {
           name  = "GOOGLE_VERTEX_LOCATION"
           value = var.google_vertex_location
         }
+        # Embedding model of the API, namespaces the embedding cache
+        env {
+          name  = "EMBEDDINGS_MODEL"
+          value = var.embeddings_model
+        }
+        env {
+          name  = "EMBEDDING_DIMENSIONS"
+          value = tostring(data.terraform_remote_state.db_storage.outputs.embedding_dimensions)
+        }
 
         # Sensitive secrets from Secret Manager
         env {
@@ -26,12 +26,18 @@ export async function addTask({
   filename,
   fileSize,
   pubDate,
+  contentType,
+  pageNumberOffset,
+  pipelineOptions,
 }: {
   id: string;
   courseId: string;
   filename: string;
   fileSize: number;
   pubDate?: Date;
+  contentType?: string;
+  pageNumberOffset?: number;
+  pipelineOptions?: Record<string, boolean>;
 }) {
   return await db.transaction(async (tx) => {
     // Get the bucket ID for the course
@@ -54,6 +60,10 @@ export async function addTask({
       fileSize,
       name: filename,
       pubDate,
+      // Read by the document processor workers (see WorkerTasksClient)
+      contentType,
+      pageNumberOffset,
+      pipelineOptions,
     });
 
     // Update the bucket size
@@ -49,7 +49,7 @@ const app = new Hono()
       return parsed.data;
     }),
     async (c) => {
-      const { texts } = c.req.valid("json");
+      const { texts, encoding } = c.req.valid("json");
 
       const { model, providerOptions } = await getEmbeddingModel();
 
@@ -65,6 +65,21 @@ const app = new Hono()
         });
       }
 
+      if (encoding === "base64") {
+        // Row-major float32 matrix, about a fifth of the size of the JSON arrays
+        const dimensions = embeddings[0].length;
+        const matrix = new Float32Array(embeddings.length * dimensions);
+        embeddings.forEach((embedding, index) => {
+          matrix.set(embedding, index * dimensions);
+        });
+
+        return c.json({
+          encoding,
+          dimensions,
+          embeddings: Buffer.from(matrix.buffer).toString("base64"),
+        });
+      }
+
       return c.json({
         embeddings,
       });
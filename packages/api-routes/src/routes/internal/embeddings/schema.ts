@@ -20,6 +20,8 @@ export const batchEmbeddingSchema = z
       )
       .min(1, { message: "At least one text is required" })
       .max(100, { message: "Maximum 100 texts per batch" }),
+    // "base64": embeddings as one base64 string of little-endian float32 values
+    encoding: z.enum(["float", "base64"]).optional(),
   })
   .strict();
 
@@ -87,6 +87,9 @@ const app = new Hono().post(
       filename,
       fileSize,
       pubDate: processingDate ? new Date(processingDate) : undefined,
+      contentType: fileType,
+      pageNumberOffset,
+      pipelineOptions: pdfPipelineOptions,
     });
 
     const scheduleTime = processingDate
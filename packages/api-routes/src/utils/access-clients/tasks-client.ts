@@ -3,6 +3,7 @@ import { ITasksClient } from "./interfaces/tasks-client.interface.js";
 import { AwsTasksClient } from "./tasks/aws-tasks-client.js";
 import { GoogleTasksClient } from "./tasks/google-tasks-client.js";
 import { LocalTasksClient } from "./tasks/local-tasks-client.js";
+import { WorkerTasksClient } from "./tasks/worker-tasks-client.js";
 
 const logger = createLogger("tasks-client");
 
@@ -16,6 +17,13 @@ export function getTasksClient(): ITasksClient {
     return tasksClientInstance;
   }
 
+  // Document processor workers claim tasks from the database themselves
+  if (process.env.USE_DOCUMENT_WORKERS === "true") {
+    logger.info("Using document processor workers, no jobs are dispatched");
+    tasksClientInstance = new WorkerTasksClient();
+    return tasksClientInstance;
+  }
+
   // Check for local tasks client
   const isLocal = process.env.USE_LOCAL_TASKS_CLIENT === "true";
 
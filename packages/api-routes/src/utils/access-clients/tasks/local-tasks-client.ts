@@ -115,6 +115,8 @@ export class LocalTasksClient implements ITasksClient {
       "GOOGLE_VERTEX_LOCATION",
       "AWS_PROJECT_NAME",
       "AWS_REGION",
+      "EMBEDDINGS_MODEL",
+      "EMBEDDING_DIMENSIONS",
       "SQL_LOG_FILE",
     ];
 
@@ -0,0 +1,32 @@
+import { createLogger } from "@workspace/server/logger.js";
+import {
+  CancelTaskParams,
+  ITasksClient,
+  ScheduleProcessingTaskParams,
+} from "../interfaces/tasks-client.interface.js";
+
+const logger = createLogger("worker-tasks-client");
+
+/**
+ * Tasks client for deployments with long-lived document processor workers
+ * Workers claim scheduled tasks from the tasks table (python -m job_runner --worker),
+ * so no job is dispatched; the upload data is stored on the task by addTask
+ */
+export class WorkerTasksClient implements ITasksClient {
+  async scheduleProcessingTask(
+    params: ScheduleProcessingTaskParams
+  ): Promise<void> {
+    const { taskId, jobType, scheduleTime } = params;
+
+    logger.debug(
+      `Task ${taskId} (${jobType}) left to the workers, due at ${scheduleTime.toISOString()}`
+    );
+  }
+
+  async cancelTask(params: CancelTaskParams): Promise<boolean> {
+    // Workers only claim tasks that are still in the tasks table, which the
+    // caller deletes after canceling
+    logger.info(`Canceling task: ${params.taskId}`);
+    return true;
+  }
+}
@@ -0,0 +1,2 @@
+ALTER TABLE "files" ADD COLUMN "fingerprint" varchar(128);--> statement-breakpoint
+CREATE INDEX "idx_files_fingerprint" ON "files" USING btree ("fingerprint");
\ No newline at end of file
@@ -0,0 +1,7 @@
+CREATE TABLE "task_metrics" (
+	"task_id" uuid PRIMARY KEY NOT NULL,
+	"summary" json NOT NULL,
+	"created_at" timestamp DEFAULT now() NOT NULL
+);
+--> statement-breakpoint
+ALTER TABLE "task_metrics" ADD CONSTRAINT "task_metrics_task_id_tasks_id_fk" FOREIGN KEY ("task_id") REFERENCES "public"."tasks"("id") ON DELETE cascade ON UPDATE no action;
\ No newline at end of file
@@ -0,0 +1,8 @@
+CREATE TABLE "task_checkpoints" (
+	"task_id" uuid PRIMARY KEY NOT NULL,
+	"last_chunk_index" integer NOT NULL,
+	"chunk_count" integer NOT NULL,
+	"updated_at" timestamp DEFAULT now() NOT NULL
+);
+--> statement-breakpoint
+ALTER TABLE "task_checkpoints" ADD CONSTRAINT "task_checkpoints_task_id_tasks_id_fk" FOREIGN KEY ("task_id") REFERENCES "public"."tasks"("id") ON DELETE cascade ON UPDATE no action;
\ No newline at end of file
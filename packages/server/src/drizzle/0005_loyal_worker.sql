@@ -0,0 +1,3 @@
+ALTER TABLE "tasks" ADD COLUMN "content_type" varchar(255);--> statement-breakpoint
+ALTER TABLE "tasks" ADD COLUMN "page_number_offset" integer DEFAULT 0 NOT NULL;--> statement-breakpoint
+ALTER TABLE "tasks" ADD COLUMN "pipeline_options" json;
\ No newline at end of file
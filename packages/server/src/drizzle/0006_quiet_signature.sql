@@ -0,0 +1 @@
+ALTER TABLE "task_checkpoints" ADD COLUMN "chunking_signature" text;
\ No newline at end of file
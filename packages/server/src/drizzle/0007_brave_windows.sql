@@ -0,0 +1 @@
+ALTER TABLE "task_checkpoints" ADD COLUMN "window_ends" integer[];
\ No newline at end of file
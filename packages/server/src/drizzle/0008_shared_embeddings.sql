@@ -0,0 +1,5 @@
+CREATE TABLE "embedding_cache" (
+	"key" varchar(64) PRIMARY KEY NOT NULL,
+	"embedding" "bytea" NOT NULL,
+	"created_at" timestamp DEFAULT now() NOT NULL
+);
\ No newline at end of file
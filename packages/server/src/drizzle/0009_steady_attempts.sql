@@ -0,0 +1 @@
+ALTER TABLE "tasks" ADD COLUMN "attempts" integer DEFAULT 0 NOT NULL;
\ No newline at end of file
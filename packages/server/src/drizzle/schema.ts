@@ -324,8 +324,13 @@ export const files = pgTable(
     size: integer("size").notNull(),
     pageCount: smallint("page_count"),
     createdAt: timestamp("created_at").notNull().defaultNow(),
+    // Content hash and processing options of the source file, set once processed
+    fingerprint: varchar("fingerprint", { length: 128 }),
   },
-  (table) => [unique().on(table.courseId, table.name)]
+  (table) => [
+    unique().on(table.courseId, table.name),
+    index("idx_files_fingerprint").on(table.fingerprint),
+  ]
 );
 
 export type File = InferSelectModel<typeof files>;
@@ -454,10 +459,62 @@ export const tasks = pgTable("tasks", {
   errorMessage: text("error_message").notNull().default(""),
   createdAt: timestamp("created_at").notNull().defaultNow(),
   pubDate: timestamp("pub_date"),
+  // Upload data read by the document processor workers
+  contentType: varchar("content_type", { length: 255 }),
+  pageNumberOffset: integer("page_number_offset").notNull().default(0),
+  pipelineOptions: json("pipeline_options"),
+  // Claims by document processor workers, to give up on files that crash them
+  attempts: integer("attempts").notNull().default(0),
 });
 
 export type Task = InferSelectModel<typeof tasks>;
 
+// Task metrics table, stage timings written by the document processor
+export const taskMetrics = pgTable("task_metrics", {
+  taskId: uuid("task_id")
+    .primaryKey()
+    .notNull()
+    .references(() => tasks.id, { onDelete: "cascade" }),
+  summary: json("summary").notNull(),
+  createdAt: timestamp("created_at").notNull().defaultNow(),
+});
+
+export type TaskMetrics = InferSelectModel<typeof taskMetrics>;
+
+// Task checkpoints table, last committed chunk of a resumable ingestion
+export const taskCheckpoints = pgTable("task_checkpoints", {
+  taskId: uuid("task_id")
+    .primaryKey()
+    .notNull()
+    .references(() => tasks.id, { onDelete: "cascade" }),
+  lastChunkIndex: integer("last_chunk_index").notNull(),
+  chunkCount: integer("chunk_count").notNull(),
+  // Variant and settings the chunks were produced with
+  chunkingSignature: text("chunking_signature"),
+  // Last pages of the converted PDF page windows, replayed on resume
+  windowEnds: integer("window_ends").array(),
+  updatedAt: timestamp("updated_at").notNull().defaultNow(),
+});
+
+export type TaskCheckpoint = InferSelectModel<typeof taskCheckpoints>;
+
+export const bytea = customType<{
+  data: Buffer;
+}>({
+  dataType() {
+    return `bytea`;
+  },
+});
+
+// Embedding cache table, float32 vectors keyed by hash of model and text
+export const embeddingCache = pgTable("embedding_cache", {
+  key: varchar("key", { length: 64 }).primaryKey().notNull(),
+  embedding: bytea("embedding").notNull(),
+  createdAt: timestamp("created_at").notNull().defaultNow(),
+});
+
+export type EmbeddingCacheEntry = InferSelectModel<typeof embeddingCache>;
+
 // Prompts table
 export const prompts = pgTable("prompts", {
   id: uuid("id").primaryKey().notNull().defaultRandom(),